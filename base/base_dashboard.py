@@ -550,7 +550,7 @@ class BaseDashboard(QWidget):
         if not self.current_user:
             return
         user_id = self.current_user.get('user_id')
-        notifications = self.notification_manager.get_user_notifications(user_id)
+        notifications = self.notification_manager.get_inbox(user_id, limit=None)
         if not notifications:
             from PyQt5.QtWidgets import QMessageBox
             QMessageBox.information(self, 'Thông báo', 'Bạn không có thông báo nào!')
@@ -567,7 +567,7 @@ class BaseDashboard(QWidget):
         scroll.setWidgetResizable(True)
         content = QWidget()
         vbox = QVBoxLayout(content)
-        for n in sorted(notifications, key=lambda x: x.get('created_at', ''), reverse=True):
+        for n in notifications:
             label = QLabel(f"<b>{n.get('title')}</b><br>{n.get('content')}<br><span style='color:gray;font-size:12px'>{n.get('created_at')}</span>")
             label.setWordWrap(True)
             vbox.addWidget(label)
@@ -1,17 +1,101 @@
 import os
-from utils.file_helper import load_json, save_json, generate_id, get_current_datetime
+import datetime
+import logging
+from utils.file_helper import save_json, generate_id, get_current_datetime, get_config_value
+from data_manager.repository import create_repository, JsonRepository
+from data_manager.audit_sink import AuditSink
+
+logger = logging.getLogger(__name__)
 
 class AuditLogManager:
-    def __init__(self, file_path='login_history.json'):
+    # Một sink cho mỗi file nhật ký, dùng chung giữa các AuditLogManager (main.py, AdminDashboard)
+    _shared_sinks = {}
+    # Giá trị mặc định của bộ lọc get_logs_page/count_logs: không lọc theo trường đó
+    ALL = object()
+
+    def __init__(self, file_path='login_history.json', retention_months=None, async_writes=None):
+        """Khởi tạo quản lý nhật ký
+        
+        Args:
+            file_path: File JSON của nhật ký; với lưu trữ phân vùng (audit.storage = 'partitioned'),
+                các phân vùng tháng nằm trong thư mục cùng tên và file này chỉ là nguồn nhập lần đầu
+            retention_months: Số tháng nhật ký được giữ lại (kể cả tháng hiện tại), mặc định lấy
+                từ config.json (audit.retention_months); 0 hoặc None là giữ tất cả
+            async_writes: Ghi nhật ký ở luồng nền theo nhóm (xem AuditSink), mặc định lấy từ
+                config.json (audit.async_writes)
+        """
         base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
         data_dir = os.path.join(base_dir, 'data')
         os.makedirs(data_dir, exist_ok=True)
         self.file_path = os.path.join(data_dir, file_path)
-        if not os.path.exists(self.file_path):
+        self.repository = create_repository('audit_logs', self.file_path)
+        if isinstance(self.repository, JsonRepository) and not os.path.exists(self.file_path):
             save_json(self.file_path, [])
+        if async_writes is None:
+            async_writes = get_config_value('audit', 'async_writes', True)
+        self.sink = self._get_sink() if async_writes else None
+        if retention_months is None:
+            retention_months = get_config_value('audit', 'retention_months', 0)
+        self.retention_months = int(retention_months or 0)
+        if self.retention_months > 0:
+            self.apply_retention()
+
+    def _get_sink(self):
+        sink = self._shared_sinks.get(self.file_path)
+        if sink is None or sink._closed:
+            sink = AuditSink(self.repository,
+                             flush_interval_ms=int(get_config_value('audit', 'flush_interval_ms', 200)),
+                             batch_size=int(get_config_value('audit', 'batch_size', 100)),
+                             queue_size=int(get_config_value('audit', 'queue_size', 10000)))
+            self._shared_sinks[self.file_path] = sink
+        return sink
+
+    def flush(self, timeout=5.0):
+        """Ghi ngay các nhật ký đang chờ trong hàng đợi"""
+        return self.sink.flush(timeout) if self.sink else True
+
+    def close(self, timeout=5.0):
+        """Ghi hết và dừng luồng ghi nhật ký (gọi khi thoát ứng dụng)"""
+        if self.sink:
+            self.sink.close(timeout)
+            self._shared_sinks.pop(self.file_path, None)
+            self.sink = None
+
+    def get_write_metrics(self):
+        """Số liệu ghi nhật ký: độ dài hàng đợi, thời gian mỗi lần ghi... (xem AuditSink.metrics)"""
+        return self.sink.metrics() if self.sink else {}
+
+    def apply_retention(self, months=None, today=None):
+        """Xóa nhật ký cũ hơn số tháng được giữ lại
+        
+        Với lưu trữ phân vùng, cả phân vùng tháng cũ bị xóa một lần, không phải ghi lại dữ liệu.
+        
+        Args:
+            months: Số tháng giữ lại (kể cả tháng hiện tại), mặc định self.retention_months
+            today: Ngày tính mốc (mặc định hôm nay)
+            
+        Returns:
+            int: Số phân vùng (hoặc bản ghi, với kiểu lưu trữ khác) đã xóa
+        """
+        months = self.retention_months if months is None else months
+        if not months or months <= 0:
+            return 0
+        self.flush()
+        today = today or datetime.date.today()
+        month_index = today.year * 12 + today.month - 1 - (months - 1)
+        cutoff = f"{month_index // 12:04d}-{month_index % 12 + 1:02d}"
+        if hasattr(self.repository, 'drop_partitions_before'):
+            return len(self.repository.drop_partitions_before(cutoff))
+        logs = self.get_all_logs()
+        kept = [log for log in logs if not log.get('timestamp') or log['timestamp'] >= cutoff]
+        if len(kept) < len(logs):
+            self.repository.save_all(kept)
+            logger.info(f"Đã xóa {len(logs) - len(kept)} nhật ký cũ hơn {cutoff}")
+        return len(logs) - len(kept)
 
     def get_all_logs(self):
-        return load_json(self.file_path)
+        self.flush() # Đọc được cả các nhật ký vừa gửi vào hàng đợi
+        return self.repository.load_all()
 
     def get_logs_by_date_range(self, start_date, end_date):
         """
@@ -24,12 +108,16 @@ class AuditLogManager:
         Returns:
             list: Danh sách logs trong khoảng thời gian
         """
-        logs = self.get_all_logs()
-        filtered = []
-        
         # Đảm bảo end_date kết thúc vào cuối ngày
         if end_date and len(end_date) == 10:  # Chỉ có ngày (YYYY-MM-DD)
             end_date = f"{end_date}T23:59:59"
+
+        if self.repository.supports_queries:
+            self.flush()
+            return self.repository.find(range_column='timestamp', start=start_date or None, end=end_date or None)
+
+        logs = self.get_all_logs()
+        filtered = []
             
         for log in logs:
             timestamp = log.get('timestamp', '')
@@ -50,13 +138,70 @@ class AuditLogManager:
             
         return filtered
 
+    @staticmethod
+    def _time_bounds(start_date, end_date):
+        """Chuyển ngày YYYY-MM-DD thành giới hạn so sánh với timestamp (cuối ngày cho end_date)"""
+        if end_date and len(end_date) == 10:
+            end_date = f"{end_date}T23:59:59.999999"
+        return start_date or None, end_date or None
+
+    @staticmethod
+    def _query_filters(user_id=None, action=None):
+        """Điều kiện bằng cho repository; ALL (mặc định) là không lọc"""
+        equals = {}
+        if user_id is not AuditLogManager.ALL:
+            equals['user_id'] = user_id
+        if action is not AuditLogManager.ALL:
+            equals['action'] = action
+        return equals
+
+    def get_logs_page(self, offset=0, limit=100, user_id=ALL, action=ALL, start_date=None, end_date=None):
+        """Lấy một trang nhật ký, mới nhất trước
+        
+        Args:
+            offset, limit: Vị trí và số bản ghi của trang
+            user_id, action: Lọc đúng giá trị (None là lọc các bản ghi không có user_id); bỏ qua để không lọc
+            start_date, end_date: Khoảng thời gian (YYYY-MM-DD hoặc ISO), None để bỏ qua
+            
+        Returns:
+            list: Các nhật ký của trang
+        """
+        self.flush()
+        start, end = self._time_bounds(start_date, end_date)
+        equals = self._query_filters(user_id, action)
+        if self.repository.supports_queries:
+            return self.repository.find(equals=equals, range_column='timestamp', start=start, end=end,
+                                        order_by='timestamp', descending=True, limit=limit, offset=offset)
+        logs = self._filter_logs(self.repository.load_all(), equals, start, end)
+        logs.sort(key=lambda log: log.get('timestamp') or '', reverse=True)
+        return logs[offset:offset + limit]
+
+    def count_logs(self, user_id=ALL, action=ALL, start_date=None, end_date=None):
+        """Đếm số nhật ký thỏa điều kiện như get_logs_page"""
+        self.flush()
+        start, end = self._time_bounds(start_date, end_date)
+        equals = self._query_filters(user_id, action)
+        if self.repository.supports_queries:
+            return self.repository.count(equals=equals, range_column='timestamp', start=start, end=end)
+        return len(self._filter_logs(self.repository.load_all(), equals, start, end))
+
+    @staticmethod
+    def _filter_logs(logs, equals, start, end):
+        bounded = start is not None or end is not None
+        return [log for log in logs
+                if all(log.get(k) == v for k, v in equals.items()) and
+                (not bounded or (log.get('timestamp') and (start is None or log['timestamp'] >= start) and
+                                 (end is None or log['timestamp'] <= end)))]
+
     def add_log(self, user_id, action):
-        logs = self.get_all_logs()
+        """Ghi một nhật ký; với ghi bất đồng bộ, hàm trả về ngay sau khi đưa vào hàng đợi"""
         log = {
             'user_id': user_id,
             'action': action,
             'timestamp': get_current_datetime()
         }
-        logs.append(log)
-        save_json(self.file_path, logs)
+        if self.sink:
+            self.sink.submit(log)
+        else:
+            self.repository.insert(log)
         return log
@@ -0,0 +1,211 @@
+"""
+Audit Sink
+==========
+
+Ghi nhật ký (đăng nhập/đăng xuất, thao tác của admin) ở luồng nền để luồng giao diện
+không phải chờ ghi file. Các bản ghi được đưa vào một hàng đợi có giới hạn và được
+ghi theo nhóm (group commit): một lần ghi cho tối đa batch_size bản ghi, hoặc sau
+flush_interval_ms kể từ bản ghi đầu tiên của nhóm.
+
+Các thành phần chính:
+- AuditSink: Hàng đợi + luồng ghi; submit() / flush() / close() / metrics()
+- close_all_sinks: Ghi hết và dừng mọi sink (được đăng ký với atexit)
+
+Khi hàng đợi đầy, bản ghi được ghi đồng bộ ngay trên luồng gọi (không bao giờ bỏ nhật ký);
+số lần như vậy được đếm trong metrics()['overflow'].
+"""
+
+import atexit
+import logging
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Tín hiệu điều khiển luồng ghi (không phải bản ghi)
+_FLUSH = object()
+_STOP = object()
+
+# Mọi sink đang chạy, để ghi hết khi thoát chương trình
+_sinks = []
+_sinks_lock = threading.Lock()
+
+
+class AuditSink:
+    """Ghi bản ghi vào repository theo nhóm trên một luồng nền
+
+    Args:
+        repository: Repository đích; dùng insert_many() nếu có, nếu không thì insert() từng bản ghi
+        flush_interval_ms: Thời gian tối đa một bản ghi chờ trong nhóm
+        batch_size: Số bản ghi tối đa mỗi lần ghi
+        queue_size: Số bản ghi tối đa chờ trong hàng đợi
+    """
+
+    def __init__(self, repository, flush_interval_ms=200, batch_size=100, queue_size=10000, name='audit'):
+        self.repository = repository
+        self.flush_interval = max(0, flush_interval_ms) / 1000
+        self.batch_size = max(1, batch_size)
+        self.queue_size = max(1, queue_size)
+        self.name = name
+        self._queue = queue.Queue(maxsize=self.queue_size)
+        self._write_lock = threading.Lock()
+        self._cond = threading.Condition()
+        self._submitted = 0
+        self._completed = 0
+        self._retry = []
+        self._closed = False
+        self._metrics = {'written': 0, 'batches': 0, 'overflow': 0, 'errors': 0, 'max_queue_depth': 0,
+                         'last_flush_ms': 0.0, 'max_flush_ms': 0.0, 'total_flush_ms': 0.0}
+        self._thread = threading.Thread(target=self._run, name=f"{name}-sink", daemon=True)
+        self._thread.start()
+        with _sinks_lock:
+            _sinks.append(self)
+
+    def submit(self, record):
+        """Đưa một bản ghi vào hàng đợi (không chặn, trừ khi hàng đợi đầy)
+
+        Returns:
+            bool: True nếu bản ghi đã được nhận (hoặc đã ghi đồng bộ khi hàng đợi đầy)
+        """
+        if self._closed:
+            return self._write([record])
+        with self._cond:
+            self._submitted += 1
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            # Hàng đợi đầy: ghi ngay trên luồng gọi thay vì bỏ nhật ký
+            self._metrics['overflow'] += 1
+            logger.warning(f"Hàng đợi nhật ký {self.name} đầy ({self.queue_size}), ghi đồng bộ")
+            self._write([record])
+            self._complete(1)
+            return True
+        depth = self._queue.qsize()
+        if depth > self._metrics['max_queue_depth']:
+            self._metrics['max_queue_depth'] = depth
+        return True
+
+    def flush(self, timeout=5.0):
+        """Ghi ngay các bản ghi đang chờ và đợi tới khi ghi xong
+
+        Returns:
+            bool: True nếu mọi bản ghi đã gửi trước lời gọi này đã được ghi
+        """
+        with self._cond:
+            target = self._submitted
+            if self._completed >= target:
+                return True
+        if not self._closed:
+            try:
+                self._queue.put(_FLUSH, timeout=timeout)
+            except queue.Full:
+                return False
+        with self._cond:
+            return self._cond.wait_for(lambda: self._completed >= target, timeout)
+
+    def close(self, timeout=5.0):
+        """Ghi hết hàng đợi và dừng luồng ghi"""
+        if self._closed:
+            return True
+        flushed = self.flush(timeout)
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        with _sinks_lock:
+            if self in _sinks:
+                _sinks.remove(self)
+        metrics = self.metrics()
+        logger.info(f"Đã dừng sink {self.name}: {metrics['written']} bản ghi, {metrics['batches']} lần ghi, "
+                    f"trung bình {metrics['avg_flush_ms']:.1f}ms/lần")
+        return flushed
+
+    def metrics(self):
+        """Số liệu của sink
+
+        Returns:
+            dict: queue_depth, max_queue_depth, written, batches, overflow (lần ghi đồng bộ do
+                hàng đợi đầy), errors (bản ghi ghi lỗi), last_flush_ms, max_flush_ms, avg_flush_ms
+        """
+        metrics = dict(self._metrics)
+        total = metrics.pop('total_flush_ms')
+        metrics['queue_depth'] = self._queue.qsize()
+        metrics['avg_flush_ms'] = total / metrics['batches'] if metrics['batches'] else 0.0
+        return metrics
+
+    def _complete(self, count):
+        with self._cond:
+            self._completed += count
+            self._cond.notify_all()
+
+    def _write(self, records):
+        """Ghi một nhóm bản ghi và cập nhật số liệu thời gian ghi"""
+        started = time.perf_counter()
+        with self._write_lock:
+            try:
+                if hasattr(self.repository, 'insert_many'):
+                    ok = self.repository.insert_many(records)
+                else:
+                    ok = all([self.repository.insert(record) for record in records])
+            except Exception as e:
+                logger.error(f"Lỗi khi ghi {len(records)} nhật ký ({self.name}): {e}")
+                ok = False
+        elapsed = (time.perf_counter() - started) * 1000
+        metrics = self._metrics
+        metrics['batches'] += 1
+        metrics['last_flush_ms'] = elapsed
+        metrics['max_flush_ms'] = max(metrics['max_flush_ms'], elapsed)
+        metrics['total_flush_ms'] += elapsed
+        if ok:
+            metrics['written'] += len(records)
+        else:
+            metrics['errors'] += len(records)
+        return ok
+
+    def _commit(self, batch):
+        """Ghi nhóm hiện tại (kèm các bản ghi lỗi lần trước); giữ lại để thử lại nếu lỗi"""
+        records = self._retry + batch
+        if not records:
+            return
+        self._retry = []
+        if not self._write(records):
+            if len(records) <= self.queue_size:
+                self._retry = records
+            else:
+                logger.error(f"Bỏ {len(records)} nhật ký sau nhiều lần ghi lỗi ({self.name})")
+        # Bản ghi lỗi vẫn được tính là đã xử lý để flush() không chờ mãi
+        self._complete(len(batch))
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                self._commit([])
+                return
+            batch = [] if item is _FLUSH else [item]
+            deadline = time.monotonic() + self.flush_interval
+            while item is not _FLUSH and len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    self._commit(batch)
+                    return
+                if item is not _FLUSH:
+                    batch.append(item)
+            self._commit(batch)
+
+
+def close_all_sinks(timeout=5.0):
+    """Ghi hết và dừng mọi sink đang chạy (gọi khi thoát ứng dụng)"""
+    with _sinks_lock:
+        sinks = list(_sinks)
+    for sink in sinks:
+        sink.close(timeout)
+
+
+atexit.register(close_all_sinks)
@@ -1,5 +1,6 @@
 import os
-from utils.file_helper import load_json, save_json, generate_id
+from utils.file_helper import save_json, generate_id
+from data_manager.repository import create_repository
 
 class BudgetChangeHistoryManager:
     def __init__(self, file_path='budget_change_history.json'):
@@ -9,9 +10,10 @@ class BudgetChangeHistoryManager:
         self.file_path = os.path.join(data_dir, file_path)
         if not os.path.exists(self.file_path):
             save_json(self.file_path, [])
+        self.repository = create_repository('budget_change_history', self.file_path)
 
     def get_all_changes(self):
-        return load_json(self.file_path)
+        return self.repository.load_all()
 
     def get_changes_by_user(self, user_id):
         return [c for c in self.get_all_changes() if c.get('user_id') == user_id]
@@ -20,5 +22,5 @@ class BudgetChangeHistoryManager:
         changes = self.get_all_changes()
         change['id'] = generate_id('chg', changes)
         changes.append(change)
-        save_json(self.file_path, changes)
+        self.repository.save_all(changes)
         return change
@@ -1,26 +1,34 @@
 import os
 import logging
-from utils.file_helper import load_json, save_json, generate_id
+from utils.file_helper import save_json, generate_id
+from data_manager.repository import create_repository
+from data_manager.change_events import event_bus, INSERTED, UPDATED, DELETED
 import datetime # Added for created_at/updated_at in add_or_update_budget
 
 # Cấu hình logging
 logger = logging.getLogger(__name__)
 
 class BudgetManager:
-    def __init__(self, file_path='budgets.json', notification_manager=None, category_manager=None, user_manager=None, transaction_manager=None): # Added transaction_manager
+    def __init__(self, file_path='budgets.json', notification_manager=None, category_manager=None, user_manager=None, transaction_manager=None, events=None): # Added transaction_manager
         base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
         data_dir = os.path.join(base_dir, 'data')
         os.makedirs(data_dir, exist_ok=True)
         self.file_path = os.path.join(data_dir, file_path)
         if not os.path.exists(self.file_path):
             save_json(self.file_path, [])
+        self.repository = create_repository('budgets', self.file_path)
         self.notification_manager = notification_manager
         self.category_manager = category_manager
         self.user_manager = user_manager # sử dụng user_manager để lấy thông tin người dùng
         self.transaction_manager = transaction_manager # sử dụng transaction_manager để lấy thông tin giao dịch
+        self.events = events or event_bus # phát ChangeEvent('budget', ...) sau mỗi lần ghi
+        # Chỉ mục (user_id, category_id, year, month) -> vị trí trong get_all_budgets(),
+        # dựng lại khi dữ liệu lưu trữ thay đổi từ nơi khác (xem _get_key_index)
+        self._key_index = None
+        self._index_signature = None
 
     def get_all_budgets(self):
-        return load_json(self.file_path)
+        return self.repository.load_all()
 
     def get_budgets_by_user(self, user_id):
         return [b for b in self.get_all_budgets() if b.get('user_id') == user_id]
@@ -36,7 +44,8 @@ class BudgetManager:
         budget.setdefault('updated_at', now_iso)
         budget.setdefault('current_amount', budget.get('limit', 0))# Giả sử current_amount ban đầu là limit
         budgets.append(budget)
-        save_json(self.file_path, budgets)
+        self._save_budgets(budgets, inserted=[len(budgets) - 1])
+        self.events.publish('budget', INSERTED, record=budget)
         return budget
         
     def get_budgets_by_month(self, year, month, user_id=None):# Lấy ngân sách theo tháng và năm, có thể lọc theo user_id
@@ -59,6 +68,7 @@ class BudgetManager:
         budgets = self.get_all_budgets()
         for i, budget in enumerate(budgets):
             if budget.get('id') == budget_id:# Tìm ngân sách theo ID
+                old_budget = dict(budget)
                 original_user_id = budget.get('user_id')
                 original_id = budget.get('id')
                 
@@ -90,16 +100,19 @@ class BudgetManager:
                 # Nếu 'limit' không có trong updated_data, current_amount sẽ giữ nguyên giá trị cũ hoặc từ updated_data
 
                 budgets[i]['updated_at'] = datetime.datetime.now().isoformat()
-                save_json(self.file_path, budgets)
+                self._save_budgets(budgets, updated=[(i, self._budget_key(old_budget))])
+                self.events.publish('budget', UPDATED, record=budgets[i], old=old_budget)
                 return True
         return False
 
     def delete_budget(self, budget_id):
         budgets = self.get_all_budgets()
-        original_length = len(budgets)
+        removed = [b for b in budgets if b.get('id') == budget_id]
         budgets = [b for b in budgets if b.get('id') != budget_id]
-        if len(budgets) < original_length:
-            save_json(self.file_path, budgets)
+        if removed:
+            self._save_budgets(budgets, rebuild=True)
+            for budget in removed:
+                self.events.publish('budget', DELETED, old=budget)
             return True
         return False
 
@@ -114,14 +127,7 @@ class BudgetManager:
         year = budget_data.get('year')
         new_limit = budget_data.get('limit', 0)
 
-        existing_budget_index = -1
-        for i, b in enumerate(budgets):
-            if (b.get('user_id') == user_id and
-                b.get('category_id') == category_id and 
-                b.get('month') == month and
-                b.get('year') == year):
-                existing_budget_index = i
-                break
+        existing_budget_index = self._get_key_index(budgets).get((user_id, category_id, year, month), -1)
         
         now_iso = datetime.datetime.now().isoformat()
 
@@ -136,11 +142,13 @@ class BudgetManager:
 
         if existing_budget_index != -1: 
             target_budget = budgets[existing_budget_index]
+            old_budget = dict(target_budget)
             target_budget.update(budget_data) 
             target_budget['current_amount'] = new_remaining  # Cập nhật current_amount dựa trên limit mới và chi tiêu thực tế
             target_budget['updated_at'] = now_iso
             
-            save_json(self.file_path, budgets)
+            self._save_budgets(budgets, updated=[(existing_budget_index, self._budget_key(old_budget))])
+            self.events.publish('budget', UPDATED, record=target_budget, old=old_budget)
             logger.debug(f"BudgetManager: Updated existing budget. Limit: {new_limit}, Actual Spent: {actual_spent}, Remaining: {new_remaining}")
             return target_budget
         else: 
@@ -151,10 +159,142 @@ class BudgetManager:
             if 'user_id' not in budget_data and hasattr(self.user_manager, 'current_user_id'):
                  budget_data['user_id'] = self.user_manager.current_user_id
             budgets.append(budget_data)
-            save_json(self.file_path, budgets)
+            self._save_budgets(budgets, inserted=[len(budgets) - 1])
+            self.events.publish('budget', INSERTED, record=budget_data)
             logger.debug(f"BudgetManager: Created new budget. Limit: {new_limit}, Actual Spent: {actual_spent}, Remaining: {new_remaining}")
             return budget_data
 
+    @staticmethod
+    def _budget_key(budget):
+        return (budget.get('user_id'), budget.get('category_id'), budget.get('year'), budget.get('month'))
+
+    def _build_key_index(self, budgets):
+        """Lập chỉ mục (user_id, category_id, year, month) -> vị trí của ngân sách đầu tiên khớp"""
+        index = {}
+        for i, budget in enumerate(budgets):
+            index.setdefault(self._budget_key(budget), i)
+        self._key_index = index
+        self._index_signature = self.repository.signature()
+        return index
+
+    def _get_key_index(self, budgets):
+        """Lấy chỉ mục khóa của budgets (danh sách vừa đọc bằng get_all_budgets), chỉ quét lại khi dữ liệu lưu trữ đã thay đổi"""
+        if self._key_index is None or self.repository.signature() != self._index_signature:
+            return self._build_key_index(budgets)
+        return self._key_index
+
+    def _save_budgets(self, budgets, inserted=(), updated=(), rebuild=False):
+        """Lưu danh sách ngân sách và cập nhật chỉ mục khóa theo các thay đổi
+
+        Args:
+            inserted: Vị trí các ngân sách vừa thêm vào cuối danh sách
+            updated: Các cặp (vị trí, khóa cũ) của ngân sách đã sửa
+            rebuild: Dựng lại chỉ mục từ budgets (khi vị trí bị dịch, vd sau khi xóa)
+        """
+        was_current = self._key_index is not None and self.repository.signature() == self._index_signature
+        if not self.repository.save_all(budgets):
+            self._key_index = None
+            return False
+        if rebuild or not was_current:
+            self._build_key_index(budgets)
+            return True
+        index = self._key_index
+        for position, old_key in updated:
+            new_key = self._budget_key(budgets[position])
+            if new_key == old_key:
+                continue
+            if index.get(old_key) == position:
+                # Ngân sách đầu tiên của khóa cũ đã đổi khóa: tìm ngân sách kế tiếp còn giữ khóa cũ
+                index.pop(old_key)
+                for i in range(position + 1, len(budgets)):
+                    if self._budget_key(budgets[i]) == old_key:
+                        index[old_key] = i
+                        break
+            index[new_key] = min(index.get(new_key, position), position)
+        for position in inserted:
+            index.setdefault(self._budget_key(budgets[position]), position)
+        self._index_signature = self.repository.signature()
+        return True
+
+    def apply_expense_deltas(self, deltas):
+        """
+        Áp dụng nhiều thay đổi chi tiêu lên ngân sách trong một lần đọc/ghi budgets.json.
+        Dùng cho nhập hàng loạt hoặc phát lại giao dịch thay vì ghi lại file cho từng giao dịch.
+
+        Args:
+            deltas (iterable): Các bộ (user_id, category_id, year, month, amount); amount dương
+                là chi tiêu mới (giảm số dư), amount âm là hoàn chi tiêu (tăng số dư).
+
+        Returns:
+            int: Số thay đổi tìm được ngân sách phù hợp và đã được áp dụng.
+        """
+        budgets = self.get_all_budgets()
+        key_index = self._get_key_index(budgets)
+        applied = 0
+        now_iso = datetime.datetime.now().isoformat()
+        overspent = []
+        originals = {} # vị trí -> bản sao ngân sách trước lần thay đổi đầu tiên
+
+        for user_id, category_id, year, month, amount in deltas:
+            position = key_index.get((user_id, category_id, year, month))
+            if position is None:
+                logger.warning(f"BudgetManager: Không tìm thấy ngân sách phù hợp cho user='{user_id}', cat='{category_id}', Y/M={year}/{month}")
+                continue
+
+            budget_item = budgets[position]
+            originals.setdefault(position, dict(budget_item))
+            original_remaining = budget_item.get('current_amount', budget_item.get('limit', 0))
+            new_remaining = original_remaining - amount
+            budget_item['current_amount'] = new_remaining
+            budget_item['updated_at'] = now_iso
+            applied += 1
+            logger.debug(f"BudgetManager: Budget for cat='{category_id}' updated. Limit: {budget_item.get('limit', 0)}, Original Remaining: {original_remaining}, Delta: {amount}, New Remaining: {new_remaining}")
+
+            if new_remaining < 0 and amount > 0:
+                overspent.append(budget_item)
+
+        if applied:
+            # Chỉ đổi số dư, không đổi khóa: chỉ mục giữ nguyên
+            self._save_budgets(budgets)
+            logger.debug(f"BudgetManager: budgets.json lưu {applied} thay đổi chi tiêu.")
+            for position, old_budget in originals.items():
+                self.events.publish('budget', UPDATED, record=budgets[position], old=old_budget)
+
+        # Gửi thông báo sau khi đã lưu, mỗi ngân sách tối đa một thông báo cho cả lô
+        notified = set()
+        for budget_item in overspent:
+            key = self._budget_key(budget_item)
+            if key not in notified:
+                notified.add(key)
+                self._notify_overspent(budget_item)
+        return applied
+
+    def _notify_overspent(self, budget_item):
+        """Gửi thông báo vượt ngân sách cho một ngân sách có số dư âm"""
+        user_id, category_id, year, month = self._budget_key(budget_item)
+        if not (self.notification_manager and self.category_manager and self.user_manager):
+            logger.warning("BudgetManager: Không thể gửi thông báo vượt ngân sách do thiếu quản lý (notification, category, or user manager).")
+            return
+        limit = budget_item.get('limit', 0)
+        new_remaining = budget_item.get('current_amount', 0)
+        category_details = self.category_manager.get_category_by_id(category_id)
+        category_name = category_details.get('name', 'Không rõ') if category_details else 'Không rõ'
+        user_details = self.user_manager.get_user_by_id(user_id)
+        user_name = user_details.get('name', 'Người dùng') if user_details else 'Người dùng'
+        spent_total = limit - new_remaining
+        overspent_by = -new_remaining
+        title = "Cảnh báo vượt ngân sách"
+        content = (f"Bạn đã chi tiêu {spent_total:,.0f}đ cho hạng mục '{category_name}', "
+                   f"vượt quá {overspent_by:,.0f}đ so với ngân sách {limit:,.0f}đ "
+                   f"cho tháng {month}/{year}.")
+        self.notification_manager.add_notification(
+            user_id=user_id,
+            title=title,
+            content=content,
+            notify_type="warning"
+        )
+        logger.info(f"BudgetManager: vượt ngân sách cho người dùng {user_id} ({user_name}), danh mục {category_name}.")
+
     def apply_expense_to_budget(self, user_id, category_id, year, month, expense_amount):
         """
         Áp dụng chi phí cho ngân sách, giảm số dư còn lại trong ngân sách.
@@ -165,98 +305,19 @@ class BudgetManager:
             month (int): Tháng của ngân sách.
             expense_amount (float): Số tiền chi phí cần áp dụng (nên là số dương).
         """
-        budgets = self.get_all_budgets()
-        updated = False
         logger.debug(f"BudgetManager: Applying expense for user='{user_id}', cat='{category_id}', Y/M={year}/{month}, expense={expense_amount}")
-        
-        for budget_item in budgets:
-            b_user_id = budget_item.get('user_id')
-            b_category_id = budget_item.get('category_id')
-            b_year = budget_item.get('year')
-            b_month = budget_item.get('month')
-
-            if (b_user_id == user_id and
-                b_category_id == category_id and
-                b_year == year and 
-                b_month == month):
-
-                original_remaining = budget_item.get('current_amount', budget_item.get('limit', 0))
-                limit = budget_item.get('limit', 0)
-
-                new_remaining = original_remaining - expense_amount
-                budget_item['current_amount'] = new_remaining
-                budget_item['updated_at'] = datetime.datetime.now().isoformat()
-
-                logger.debug(f"BudgetManager: Budget for cat='{category_id}' updated. Limit: {limit}, Original Remaining: {original_remaining}, Expense: {expense_amount}, New Remaining: {new_remaining}")
-
-                if new_remaining < 0 and expense_amount > 0:
-                    if self.notification_manager and self.category_manager and self.user_manager:
-                        category_details = self.category_manager.get_category_by_id(category_id)
-                        category_name = category_details.get('name', 'Không rõ') if category_details else 'Không rõ'
-                        user_details = self.user_manager.get_user_by_id(user_id)
-                        user_name = user_details.get('name', 'Người dùng') if user_details else 'Người dùng'
-                        spent_total = limit - new_remaining 
-                        overspent_by = -new_remaining
-                        title = "Cảnh báo vượt ngân sách"
-                        content = (f"Bạn đã chi tiêu {spent_total:,.0f}đ cho hạng mục '{category_name}', "
-                                   f"vượt quá {overspent_by:,.0f}đ so với ngân sách {limit:,.0f}đ "
-                                   f"cho tháng {month}/{year}.")
-                        self.notification_manager.add_notification(
-                            user_id=user_id,
-                            title=title,
-                            content=content,
-                            notify_type="warning"
-                        )
-                        logger.info(f"BudgetManager: vượt ngân sách cho người dùng {user_id} ({user_name}), danh mục {category_name}.")
-                    else:
-                        logger.warning("BudgetManager: Không thể gửi thông báo vượt ngân sách do thiếu quản lý (notification, category, or user manager).")
-
-                updated = True
-                break
-        
-        if updated:
-            save_json(self.file_path, budgets)
-            logger.debug(f"BudgetManager: budgets.json lưu dữ liệu cho user='{user_id}', cat='{category_id}'.")
-        else:
-            logger.warning(f"BudgetManager: Không tìm thấy ngân sách phù hợp để áp dụng chi phí cho user='{user_id}', cat='{category_id}', Y/M={year}/{month}")
-        return updated
+        return self.apply_expense_deltas([(user_id, category_id, year, month, expense_amount)]) > 0
 
     def revert_expense_from_budget(self, user_id, category_id, year, month, reverted_expense_amount):
         """
-        Hoàn chi phí khi xóa giao dịch, tăng dư còn lại trong ngân sách.
+        Hoàn chi phí khi xóa giao dịch, tăng dư còn lại trong ngân sách.
 
         Args:
-            user_id (str): ID của người dùng.
-            category_id (str): ID của danh mục.
+            user_id (str): ID của người dùng.
+            category_id (str): ID của danh mục.
             year (int): Năm của ngân sách.
             month (int): Tháng của ngân sách.
             reverted_expense_amount (float): Số tiền chi phí cần hoàn (nên là số dương).
         """
-        budgets = self.get_all_budgets()
-        updated = False
         logger.debug(f"BudgetManager: Reverting expense for user='{user_id}', cat='{category_id}', Y/M={year}/{month}, reverted_amount={reverted_expense_amount}")
-        
-        for budget_item in budgets:
-            b_user_id = budget_item.get('user_id')
-            b_category_id = budget_item.get('category_id')
-            b_year = budget_item.get('year')
-            b_month = budget_item.get('month')
-
-            if (b_user_id == user_id and
-                b_category_id == category_id and
-                b_year == year and 
-                b_month == month):
-                original_remaining = budget_item.get('current_amount', budget_item.get('limit', 0))
-                new_remaining = original_remaining + reverted_expense_amount # Tăng current_amount khi hoàn chi phí
-                budget_item['current_amount'] = new_remaining # Cập nhật current_amount
-                budget_item['updated_at'] = datetime.datetime.now().isoformat()
-                logger.debug(f"BudgetManager: Ngân sách cho cat='{category_id}' đã được cập nhật sau khi hoàn chi phí. Số dư ban đầu: {original_remaining}, Số tiền hoàn: {reverted_expense_amount}, Số dư mới: {new_remaining}")
-                updated = True
-                break
-        
-        if updated:
-            save_json(self.file_path, budgets)
-            logger.debug(f"BudgetManager: budgets.json lưu dữ liệu cho user='{user_id}', cat='{category_id}'.")
-        else:
-            logger.warning(f"BudgetManager: Không tìm thấy ngân sách phù hợp để hoàn chi phí cho user='{user_id}', cat='{category_id}', Y/M={year}/{month}")
-        return updated
+        return self.apply_expense_deltas([(user_id, category_id, year, month, -reverted_expense_amount)]) > 0
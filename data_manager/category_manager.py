@@ -3,8 +3,10 @@
 import os
 import json
 import logging
+import threading
 from datetime import datetime
-from utils.file_helper import load_json, save_json, generate_id, get_current_datetime, format_datetime_display
+from utils.file_helper import generate_id, id_allocator, get_current_datetime, format_datetime_display
+from data_manager.repository import create_repository
 from data_manager.user_manager import UserManager
 #kwargs là từ khóa đối số, cho phép truyền vào các tham số tùy ý
 # Set up logging
@@ -18,6 +20,11 @@ class CategoryManager:
         # Tạo thư mục data nếu nó không tồn tại
         os.makedirs(data_dir, exist_ok=True)
         self.file_path = os.path.join(data_dir, file_path)
+        self.repository = create_repository('categories', self.file_path)
+        # Bộ đệm tra cứu category_id -> category, dựng lại khi file thay đổi hoặc sau khi lưu
+        self._category_index = None
+        self._index_signature = None
+        self._index_lock = threading.RLock() # Chỉ mục có thể được dựng ở luồng nền (prefetch của dashboard)
 
         # Khởi tạo tệp categories nếu nó không tồn tại  
         if not os.path.exists(self.file_path):
@@ -72,10 +79,12 @@ class CategoryManager:
         ]
         
         created_categories = []
-        for cat in default_categories:
+        # Giữ trước cả khối ID trong một lần khóa/ghi sequences.json thay vì cấp từng ID
+        category_ids = id_allocator.reserve('cat', len(default_categories), seed=self.categories)
+        for cat, category_id in zip(default_categories, category_ids):
             try:
                 category = {
-                    'category_id': generate_id('cat', self.categories),
+                    'category_id': category_id,
                     'name': cat["name"],
                     'type': cat["type"],
                     'icon': cat["icon"],
@@ -112,7 +121,7 @@ class CategoryManager:
     def load_categories(self):
         """Tải danh sách categories từ file"""
         try:
-            categories = load_json(self.file_path)
+            categories = self.repository.load_all()
             logger.debug(f"Đã tải {len(categories)} danh mục từ {self.file_path}")
             return categories
         except Exception as e:
@@ -124,7 +133,9 @@ class CategoryManager:
         try:
             if categories is None:
                 categories = self.categories
-            save_json(self.file_path, categories)
+            self.repository.save_all(categories)
+            with self._index_lock:
+                self._category_index = None
             logger.debug(f"Đã lưu {len(categories)} danh mục vào {self.file_path}")
             return True
         except Exception as e:
@@ -172,23 +183,42 @@ class CategoryManager:
             logger.error(f"Error getting categories: {str(e)}")
             return []
 
+    def _get_category_index(self):
+        """Lấy chỉ mục category_id -> category, chỉ tải lại file khi dữ liệu đã thay đổi"""
+        with self._index_lock:
+            signature = self.repository.signature()
+            if self._category_index is None or signature != self._index_signature:
+                # Danh sách riêng: không gán self.categories, vốn được các hàm ghi sửa trên luồng giao diện
+                self._category_index = {cat.get('category_id'): cat for cat in self.load_categories()}
+                self._index_signature = signature
+            return self._category_index
+
     def get_category_by_id(self, category_id):
         """Lấy category theo ID"""
         try:
             if not category_id:
                 return None
-                
-            # Tải lại categories từ file để đảm bảo dữ liệu mới nhất
-            self.categories = self.load_categories()
-            
-            for category in self.categories:
-                if category['category_id'] == category_id:
-                    return category
-            return None
+            return self._get_category_index().get(category_id)
             
         except Exception as e:
             logger.error(f"Error getting category {category_id}: {str(e)}")
             return None
+
+    def get_categories_by_ids(self, category_ids):
+        """Lấy nhiều category theo ID trong một lần tra cứu
+
+        Args:
+            category_ids: Các ID danh mục cần lấy (có thể trùng lặp)
+
+        Returns:
+            dict: category_id -> category, bỏ qua các ID không tìm thấy
+        """
+        try:
+            index = self._get_category_index()
+            return {cid: index[cid] for cid in set(category_ids) if cid in index}
+        except Exception as e:
+            logger.error(f"Error getting categories by ids: {str(e)}")
+            return {}
             
     def get_category_by_name(self, name, user_id=None, category_type=None):
         """Lấy category theo tên, có thể lọc theo user_id và category_type"""
@@ -419,9 +449,9 @@ class CategoryManager:
         if category_id is None:
             return "Unknown"
             
-        for category in self.categories:
-            if category.get('category_id') == category_id:
-                return category.get('name', 'Unknown')
+        category = self.get_category_by_id(category_id)
+        if category:
+            return category.get('name', 'Unknown')
         return "Unknown"
 
     def get_user_categories(self, user_id, is_admin=False):
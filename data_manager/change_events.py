@@ -0,0 +1,83 @@
+import logging
+
+# Cấu hình logging
+logger = logging.getLogger(__name__)
+
+# Các loại thay đổi
+INSERTED = 'inserted'
+UPDATED = 'updated'
+DELETED = 'deleted'
+
+
+class ChangeEvent:
+    """Một thay đổi dữ liệu do manager phát ra sau khi ghi thành công
+
+    Attributes:
+        entity: Loại dữ liệu ('transaction', 'budget', ...)
+        action: INSERTED, UPDATED hoặc DELETED
+        record: Bản ghi sau khi ghi (None với DELETED)
+        old: Bản ghi trước khi ghi (None với INSERTED)
+    """
+    __slots__ = ('entity', 'action', 'record', 'old')
+
+    def __init__(self, entity, action, record=None, old=None):
+        self.entity = entity
+        self.action = action
+        self.record = record
+        self.old = old
+
+    @property
+    def user_id(self):
+        """user_id của bản ghi bị ảnh hưởng (ưu tiên bản ghi mới)"""
+        for record in (self.record, self.old):
+            if record is not None:
+                return record.get('user_id')
+        return None
+
+    def records(self):
+        """Các bản ghi bị ảnh hưởng (cũ và/hoặc mới)"""
+        return [r for r in (self.old, self.record) if r is not None]
+
+    def __repr__(self):
+        return f"ChangeEvent({self.entity!r}, {self.action!r}, user_id={self.user_id!r})"
+
+
+class EventBus:
+    """Bộ phát sự kiện thay đổi đơn giản, đồng bộ, không phụ thuộc Qt
+
+    Handler được gọi ngay trên luồng đã ghi dữ liệu, theo thứ tự đăng ký. Lỗi trong một
+    handler chỉ được ghi log để không làm hỏng thao tác ghi hay các handler khác.
+    """
+
+    def __init__(self):
+        self._handlers = {}
+
+    def subscribe(self, entity, handler):
+        """Đăng ký handler(event) cho một loại dữ liệu ('*' = mọi loại)"""
+        handlers = self._handlers.setdefault(entity, [])
+        if handler not in handlers:
+            handlers.append(handler)
+
+    def unsubscribe(self, entity, handler):
+        handlers = self._handlers.get(entity, [])
+        if handler in handlers:
+            handlers.remove(handler)
+
+    def publish(self, entity, action, record=None, old=None):
+        """Phát một ChangeEvent tới các handler đã đăng ký
+
+        Returns:
+            ChangeEvent: Sự kiện đã phát
+        """
+        event = ChangeEvent(entity, action, record=record, old=old)
+        # Sao chép danh sách để handler có thể hủy đăng ký trong lúc được gọi
+        for handler in list(self._handlers.get(entity, ())) + list(self._handlers.get('*', ())):
+            try:
+                handler(event)
+            except Exception as e:
+                logger.error(f"Lỗi khi xử lý {event}: {e}", exc_info=True)
+        return event
+
+
+# Bộ phát sự kiện dùng chung cho các manager trong ứng dụng
+event_bus = EventBus()
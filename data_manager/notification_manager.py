@@ -1,12 +1,23 @@
 import os
-from utils.file_helper import load_json, save_json, generate_id, get_current_datetime
+import bisect
+import heapq
+import itertools
+import threading
+from utils.file_helper import save_json, generate_id, get_current_datetime
+from data_manager.repository import create_repository
 from PyQt5.QtCore import pyqtSignal, QObject # Add QObject and pyqtSignal
 
 class NotificationManager(QObject): # Thừa kế từ QObject để sử dụng tín hiệu
-    """Quản lý thông báo trong ứng dụng"""
+    """Quản lý thông báo trong ứng dụng
+
+    Thông báo chung (không có user_id) được lưu một lần cho mọi người dùng. Trạng thái đã đọc
+    của từng người dùng nằm trong notification_reads.json: một con trỏ (mọi thông báo tạo
+    trước hoặc tại con trỏ đều đã đọc) cùng tập nhỏ các thông báo chung mới hơn con trỏ đã đọc lẻ.
+    Đánh dấu đã đọc tất cả chỉ là một lần cập nhật con trỏ.
+    """
     notification_added = pyqtSignal(dict) # Tín hiệu phát ra thông báo mới
 
-    def __init__(self, file_path='notifications.json'):
+    def __init__(self, file_path='notifications.json', reads_file='notification_reads.json'):
         super().__init__() # Gọi khởi tạo của QObject
         # Đặt đường dẫn đến file thông báo
         base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -15,11 +26,160 @@ class NotificationManager(QObject): # Thừa kế từ QObject để sử dụng
         self.file_path = os.path.join(data_dir, file_path)
         if not os.path.exists(self.file_path):
             save_json(self.file_path, [])
+        self.repository = create_repository('notifications', self.file_path)
+        # Chỉ mục hộp thư trong bộ nhớ (xem _build_index), dựng lại khi file thay đổi từ nơi khác
+        self._index = None
+        self._index_signature = None
+        # Chỉ mục được dựng ở luồng nền (prefetch của dashboard) trong khi luồng giao diện đọc/ghi
+        self._index_lock = threading.RLock()
+        # Con trỏ đã đọc của từng người dùng (journal chỉ ghi thêm, xem _get_read_states)
+        self.reads_file = os.path.join(data_dir, reads_file)
+        if not os.path.exists(self.reads_file):
+            save_json(self.reads_file, [])
+        self.read_repository = create_repository('notification_reads', self.reads_file)
+        self._read_states = None
+        self._read_signature = None
 
     def get_all_notifications(self):
-        return load_json(self.file_path)
+        return self.repository.load_all()
+
+    @staticmethod
+    def _notification_id(notification):
+        return notification.get('id') or notification.get('notification_id')
+
+    @classmethod
+    def _sort_key(cls, notification):
+        """Khóa sắp xếp hộp thư: thời gian tạo, rồi ID để thứ tự ổn định"""
+        return (notification.get('created_at') or '', str(cls._notification_id(notification) or ''))
+
+    def _build_index(self, notifications):
+        """Dựng chỉ mục hộp thư từ danh sách thông báo
+
+        - inbox: user_id -> danh sách (khóa sắp xếp, id) tăng dần theo thời gian tạo
+        - broadcast: danh sách (khóa sắp xếp, id) của thông báo chung (không có user_id)
+        - unread: user_id -> danh sách (khóa sắp xếp, id) của thông báo riêng chưa có cờ is_read;
+          None là khóa của thông báo chung
+        - by_id: id -> thông báo
+        """
+        index = {'inbox': {}, 'broadcast': [], 'unread': {}, 'by_id': {}, 'meta': {}}
+        for notification in sorted(notifications, key=self._sort_key):
+            self._index_add(index, notification)
+        self._index = index
+        self._index_signature = self.repository.signature()
+        return index
+
+    def _get_index(self):
+        """Lấy chỉ mục, chỉ đọc lại notifications.json khi file đã thay đổi"""
+        with self._index_lock:
+            signature = self.repository.signature()
+            if self._index is None or signature != self._index_signature:
+                return self._build_index(self.get_all_notifications())
+            return self._index
+
+    def _index_add(self, index, notification):
+        notification_id = self._notification_id(notification)
+        user_id = notification.get('user_id') or None
+        sort_key = self._sort_key(notification)
+        is_read = bool(notification.get('is_read', False))
+        entries = index['inbox'].setdefault(user_id, []) if user_id else index['broadcast']
+        bisect.insort(entries, (sort_key, notification_id))
+        index['by_id'][notification_id] = notification
+        # Bản ghi trong by_id được trả thẳng cho giao diện và có thể bị sửa tại chỗ: giữ lại các trường đã lập chỉ mục
+        index['meta'][notification_id] = (sort_key, user_id, is_read)
+        if not is_read:
+            bisect.insort(index['unread'].setdefault(user_id, []), (sort_key, notification_id))
+
+    def _index_remove(self, index, notification_id):
+        index['by_id'].pop(notification_id, None)
+        meta = index['meta'].pop(notification_id, None)
+        if meta is None:
+            return
+        sort_key, user_id, is_read = meta
+        entries = index['inbox'].get(user_id, []) if user_id else index['broadcast']
+        self._remove_entry(entries, (sort_key, notification_id))
+        if not is_read:
+            self._remove_entry(index['unread'].get(user_id, []), (sort_key, notification_id))
+
+    @staticmethod
+    def _remove_entry(entries, entry):
+        position = bisect.bisect_left(entries, entry)
+        if position < len(entries) and entries[position] == entry:
+            del entries[position]
+
+    def _get_read_states(self):
+        """user_id -> {'cursor': (khóa sắp xếp, id) hoặc None, 'read': tập id thông báo chung đã đọc sau con trỏ}"""
+        with self._index_lock:
+            signature = self.read_repository.signature()
+            if self._read_states is None or signature != self._read_signature:
+                states = {}
+                for record in self.read_repository.load_all():
+                    cursor = record.get('cursor')
+                    states[record.get('user_id')] = {
+                        'cursor': ((cursor[0], cursor[1]), cursor[2]) if cursor else None,
+                        'read': set(record.get('read') or []),
+                    }
+                self._read_states = states
+                self._read_signature = signature
+            return self._read_states
+
+    def _save_read_state(self, user_id, state):
+        """Ghi trạng thái đọc của một người dùng (một dòng journal)"""
+        with self._index_lock:
+            cursor = state['cursor']
+            record = {
+                'user_id': user_id,
+                'cursor': [cursor[0][0], cursor[0][1], cursor[1]] if cursor else None,
+                'read': sorted(state['read']),
+            }
+            states = self._get_read_states()
+            if not (self.read_repository.update(user_id, record) or self.read_repository.insert(record)):
+                self._read_states = None
+                return False
+            # Cập nhật tại chỗ thay vì đọc lại mọi trạng thái vì chữ ký journal vừa đổi
+            if states is self._read_states:
+                states[user_id] = state
+                self._read_signature = self.read_repository.signature()
+            return True
+
+    def _read_state(self, user_id):
+        return self._get_read_states().get(user_id) or {'cursor': None, 'read': set()}
+
+    @staticmethod
+    def _count_after(entries, cursor):
+        """Số phần tử của danh sách đã sắp xếp nằm sau con trỏ"""
+        return len(entries) - (bisect.bisect_right(entries, cursor) if cursor else 0)
+
+    def is_read_for(self, notification, user_id):
+        """Thông báo đã được user đọc chưa (cờ is_read, con trỏ hoặc tập đã đọc của user)"""
+        if notification.get('is_read', False):
+            return True
+        state = self._read_state(user_id)
+        entry = (self._sort_key(notification), self._notification_id(notification))
+        if state['cursor'] and entry <= state['cursor']:
+            return True
+        return not notification.get('user_id') and entry[1] in state['read']
+
+    def _save(self, notifications, index=None, changes=()):
+        """Lưu danh sách thông báo và cập nhật chỉ mục theo các thay đổi (id cũ, thông báo mới)
+
+        Khi chỉ mục đang đồng bộ với file, chỉ các thông báo thay đổi được cập nhật;
+        nếu không, chỉ mục được dựng lại ở lần đọc kế tiếp.
+        """
+        with self._index_lock:
+            if not self.repository.save_all(notifications):
+                self._index = None
+                return False
+            if index is not None and index is self._index:
+                for old_id, notification in changes:
+                    if old_id is not None:
+                        self._index_remove(index, old_id)
+                    if notification is not None:
+                        self._index_add(index, notification)
+                self._index_signature = self.repository.signature()
+            return True
 
     def add_notification(self, title, content, notify_type, user_id=None):
+        index = self._get_index()
         notifications = self.get_all_notifications()
         notification = {
             'id': generate_id('notify', notifications),
@@ -31,45 +191,121 @@ class NotificationManager(QObject): # Thừa kế từ QObject để sử dụng
             'is_read': False  # Luôn thêm trường is_read khi tạo mới
         }
         notifications.append(notification)
-        save_json(self.file_path, notifications)
+        self._save(notifications, index, [(None, notification)])
         self.notification_added.emit(notification) # Emit signal with the new notification
         return notification
 
+    def broadcast_notification(self, title, content, notify_type):
+        """Gửi thông báo chung tới mọi người dùng
+
+        Thông báo chỉ được lưu một lần (user_id=None); trạng thái đã đọc của từng người dùng
+        nằm trong con trỏ đã đọc nên chi phí ghi không phụ thuộc số người dùng.
+        """
+        return self.add_notification(title, content, notify_type, user_id=None)
+
     def update_notification(self, notification_id, **kwargs):
+        index = self._get_index()
         notifications = self.get_all_notifications()
-        updated = False
         for n in notifications:
             if n.get('notification_id') == notification_id or n.get('id') == notification_id:
+                old_id = self._notification_id(n)
                 for k, v in kwargs.items():
                     n[k] = v
-                updated = True
-                break
-        if updated:
-            save_json(self.file_path, notifications)
-        return updated
+                return self._save(notifications, index, [(old_id, n)])
+        return False
 
     def delete_notification(self, notification_id):
+        index = self._get_index()
         notifications = self.get_all_notifications()
+        removed = [n for n in notifications if n.get('notification_id') == notification_id or n.get('id') == notification_id]
+        if not removed:
+            return False
         new_list = [n for n in notifications if n.get('notification_id') != notification_id and n.get('id') != notification_id]
-        save_json(self.file_path, new_list)
-        return len(new_list) < len(notifications)
+        return self._save(new_list, index, [(self._notification_id(n), None) for n in removed])
 
     def get_user_notifications(self, user_id):
-        """Lấy tất cả thông báo của user"""
-        return [n for n in self.get_all_notifications() if n.get('user_id') == user_id]
+        """Lấy tất cả thông báo riêng của user (không gồm thông báo chung), cũ trước mới sau"""
+        index = self._get_index()
+        return [self._for_user(index['by_id'][notification_id], user_id)
+                for _, notification_id in index['inbox'].get(user_id, [])]
+
+    def _for_user(self, notification, user_id):
+        """Bản sao thông báo với is_read theo trạng thái đọc của user (bản gốc nếu không đổi)"""
+        if notification.get('is_read', False) or not self.is_read_for(notification, user_id):
+            return notification
+        return dict(notification, is_read=True)
+
+    def get_inbox(self, user_id, limit=20, offset=0, include_broadcast=True):
+        """Lấy các thông báo mới nhất của user, kèm thông báo chung
+        
+        Chỉ duyệt limit + offset phần tử đầu của các danh sách đã sắp xếp trong chỉ mục,
+        không đọc các thông báo còn lại.
+        
+        Args:
+            user_id: ID người dùng
+            limit: Số thông báo tối đa (None là tất cả)
+            offset: Bỏ qua offset thông báo mới nhất
+            include_broadcast: Gộp thông báo chung (không có user_id)
+            
+        Returns:
+            list: Thông báo, mới nhất trước
+        """
+        with self._index_lock:
+            index = self._get_index()
+            sources = [reversed(index['inbox'].get(user_id, []))]
+            if include_broadcast:
+                sources.append(reversed(index['broadcast']))
+            newest_first = heapq.merge(*sources, reverse=True)
+            stop = offset + limit if limit is not None else None
+            return [self._for_user(index['by_id'][notification_id], user_id)
+                    for _, notification_id in itertools.islice(newest_first, offset, stop)]
+
+    def count_inbox(self, user_id, include_broadcast=True):
+        """Số thông báo trong hộp thư của user"""
+        index = self._get_index()
+        return len(index['inbox'].get(user_id, [])) + (len(index['broadcast']) if include_broadcast else 0)
 
-    def get_unread_count(self, user_id):
-        """Đếm số lượng thông báo chưa đọc của user"""
-        return sum(1 for n in self.get_user_notifications(user_id) if not n.get('is_read', False))
+    def get_unread_count(self, user_id, include_broadcast=True):
+        """Đếm số lượng thông báo chưa đọc của user từ chỉ mục và con trỏ đã đọc
+
+        Chỉ tìm nhị phân vị trí con trỏ trong danh sách chưa đọc, không duyệt thông báo.
+        """
+        with self._index_lock:
+            index = self._get_index()
+            state = self._read_state(user_id)
+            count = self._count_after(index['unread'].get(user_id, []), state['cursor'])
+            if include_broadcast:
+                count += self._count_after(index['unread'].get(None, []), state['cursor'])
+                # Tập đã đọc chỉ chứa thông báo chung sau con trỏ; bỏ qua ID đã bị xóa hoặc đã có cờ is_read
+                count -= sum(1 for notification_id in state['read']
+                             if notification_id in index['meta'] and not index['meta'][notification_id][2])
+            return count
+
+    def mark_as_read(self, notification_id, user_id):
+        """Đánh dấu một thông báo là đã đọc với user
+
+        Thông báo riêng được đặt cờ is_read; thông báo chung chỉ được thêm vào tập đã đọc của user.
+        """
+        index = self._get_index()
+        meta = index['meta'].get(notification_id)
+        if meta is None:
+            return False
+        sort_key, owner_id, is_read = meta
+        if owner_id:
+            return is_read or self.update_notification(notification_id, is_read=True)
+        state = self._read_state(user_id)
+        entry = (sort_key, notification_id)
+        if is_read or (state['cursor'] and entry <= state['cursor']) or notification_id in state['read']:
+            return True
+        return self._save_read_state(user_id, {'cursor': state['cursor'], 'read': state['read'] | {notification_id}})
 
     def mark_all_as_read(self, user_id):
-        """Đánh dấu tất cả thông báo của user là đã đọc"""
-        notifications = self.get_all_notifications()
-        changed = False
-        for n in notifications:
-            if n.get('user_id') == user_id and not n.get('is_read', False):
-                n['is_read'] = True
-                changed = True
-        if changed:
-            save_json(self.file_path, notifications)
-        return changed
+        """Đánh dấu tất cả thông báo của user (kể cả thông báo chung) là đã đọc
+
+        Chỉ dời con trỏ đã đọc của user tới thông báo mới nhất, không ghi lại notifications.json.
+        """
+        if not self.get_unread_count(user_id):
+            return False
+        index = self._get_index()
+        newest = [entries[-1] for entries in (index['inbox'].get(user_id), index['broadcast']) if entries]
+        return self._save_read_state(user_id, {'cursor': max(newest), 'read': set()})
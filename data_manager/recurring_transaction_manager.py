@@ -1,5 +1,6 @@
 import os
-from utils.file_helper import load_json, save_json, generate_id
+from utils.file_helper import save_json, generate_id
+from data_manager.repository import create_repository
 
 class RecurringTransactionManager:
     def __init__(self, file_path='recurring_transactions.json'):
@@ -9,9 +10,10 @@ class RecurringTransactionManager:
         self.file_path = os.path.join(data_dir, file_path)
         if not os.path.exists(self.file_path):
             save_json(self.file_path, [])
+        self.repository = create_repository('recurring_transactions', self.file_path)
 
     def get_all_recurring(self):
-        return load_json(self.file_path)
+        return self.repository.load_all()
 
     def get_recurring_by_user(self, user_id):
         return [r for r in self.get_all_recurring() if r.get('user_id') == user_id]
@@ -20,5 +22,5 @@ class RecurringTransactionManager:
         recurrings = self.get_all_recurring()
         recurring['id'] = generate_id('rec', recurrings)
         recurrings.append(recurring)
-        save_json(self.file_path, recurrings)
+        self.repository.save_all(recurrings)
         return recurring
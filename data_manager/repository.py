@@ -0,0 +1,955 @@
+# repository.py
+
+import os
+import json
+import sqlite3
+import logging
+import threading
+import datetime
+import itertools
+from abc import ABC, abstractmethod
+from utils.file_helper import load_json, save_json, append_jsonl, read_jsonl, get_config_value
+
+# Cấu hình logging
+logger = logging.getLogger(__name__)
+
+
+def _file_signature(path):
+    """Trả về (mtime_ns, size) của file, hoặc None nếu file không tồn tại"""
+    try:
+        st = os.stat(path)
+        return (st.st_mtime_ns, st.st_size)
+    except OSError:
+        return None
+
+
+def normalize_datetime(value):
+    """Chuẩn hóa chuỗi ngày giờ về dạng ISO naive (bỏ timezone) để so sánh chuỗi được
+
+    Returns:
+        datetime.datetime hoặc None nếu không phân tích được
+    """
+    if not value or not isinstance(value, str):
+        return None
+    try:
+        return datetime.datetime.fromisoformat(value.replace('Z', '+00:00')).replace(tzinfo=None)
+    except ValueError:
+        try:
+            return datetime.datetime.strptime(value.split('T')[0], "%Y-%m-%d")
+        except ValueError:
+            return None
+
+
+def _date_column(field):
+    def extract(record):
+        dt = normalize_datetime(record.get(field))
+        return dt.isoformat() if dt else None
+    return extract
+
+
+def _date_part(field, part):
+    def extract(record):
+        dt = normalize_datetime(record.get(field))
+        return getattr(dt, part) if dt else None
+    return extract
+
+
+def _lower(field):
+    def extract(record):
+        value = record.get(field)
+        return value.lower() if isinstance(value, str) else value
+    return extract
+
+
+def _field(field):
+    return lambda record: record.get(field)
+
+
+# Mô tả từng tập dữ liệu: file JSON mặc định, trường ID, các cột được đánh chỉ mục trong SQLite
+# và có giữ các thế hệ sao lưu .bak.N khi lưu bằng JSON hay không (backups)
+COLLECTIONS = {
+    'transactions': {
+        'file': 'transactions.json',
+        'backups': True,
+        'id_field': 'transaction_id',
+        'columns': {
+            'user_id': ('TEXT', _field('user_id')),
+            'category_id': ('TEXT', _field('category_id')),
+            'type': ('TEXT', _field('type')),
+            'date': ('TEXT', _date_column('date')),
+            'year': ('INTEGER', _date_part('date', 'year')),
+            'month': ('INTEGER', _date_part('date', 'month')),
+            'amount': ('REAL', _field('amount')),
+        },
+        'indexes': [('user_id', 'date'), ('user_id', 'category_id', 'type', 'year', 'month'), ('year', 'month')],
+    },
+    'budgets': {
+        'file': 'budgets.json',
+        'backups': True,
+        'id_field': 'id',
+        'columns': {
+            'user_id': ('TEXT', _field('user_id')),
+            'category_id': ('TEXT', _field('category_id')),
+            'year': ('INTEGER', _field('year')),
+            'month': ('INTEGER', _field('month')),
+        },
+        'indexes': [('user_id', 'category_id', 'year', 'month')],
+    },
+    'categories': {
+        'file': 'categories.json',
+        'backups': True,
+        'id_field': 'category_id',
+        'columns': {
+            'user_id': ('TEXT', _field('user_id')),
+            'type': ('TEXT', _field('type')),
+        },
+        'indexes': [('user_id', 'type')],
+    },
+    'notifications': {
+        'file': 'notifications.json',
+        'id_field': 'id',
+        'columns': {
+            'user_id': ('TEXT', _field('user_id')),
+            'created_at': ('TEXT', _date_column('created_at')),
+        },
+        'indexes': [('user_id', 'created_at')],
+    },
+    'notification_reads': {
+        'file': 'notification_reads.json',
+        'id_field': 'user_id',
+        'columns': {},
+        'indexes': [],
+    },
+    'audit_logs': {
+        'file': 'login_history.json',
+        'id_field': None,
+        'columns': {
+            'user_id': ('TEXT', _field('user_id')),
+            'action': ('TEXT', _field('action')),
+            'timestamp': ('TEXT', _field('timestamp')),
+        },
+        'indexes': [('timestamp',), ('user_id', 'timestamp')],
+    },
+    'users': {
+        'file': 'users.json',
+        'backups': True,
+        'id_field': 'user_id',
+        'columns': {
+            'username': ('TEXT', _lower('username')),
+            'email': ('TEXT', _lower('email')),
+            'phone': ('TEXT', _field('phone')),
+        },
+        'indexes': [('username',), ('email',), ('phone',)],
+    },
+    'budget_change_history': {
+        'file': 'budget_change_history.json',
+        'id_field': 'id',
+        'columns': {'user_id': ('TEXT', _field('user_id'))},
+        'indexes': [('user_id',)],
+    },
+    'recurring_transactions': {
+        'file': 'recurring_transactions.json',
+        'backups': True,
+        'id_field': 'id',
+        'columns': {'user_id': ('TEXT', _field('user_id'))},
+        'indexes': [('user_id',)],
+    },
+}
+
+
+class BaseRepository(ABC):
+    """Giao diện chung cho nơi lưu trữ một tập bản ghi (list các dict)
+
+    Lớp con phải cài đặt load_all(), signature() và save_all(); insert/update/delete
+    mặc định được dựng trên hai phương thức đọc/ghi toàn bộ đó.
+    supports_queries = True nghĩa là repository hỗ trợ find()/sum() chạy trên chỉ mục;
+    nếu False, manager tự lọc dữ liệu bằng Python như trước.
+    """
+    supports_queries = False
+
+    def __init__(self, id_field=None):
+        self.id_field = id_field
+
+    @abstractmethod
+    def load_all(self):
+        """Đọc toàn bộ bản ghi
+
+        Returns:
+            list: Các bản ghi
+        """
+
+    @abstractmethod
+    def signature(self):
+        """Chữ ký thay đổi mỗi khi dữ liệu lưu trữ thay đổi, dùng để làm mới chỉ mục trong bộ nhớ
+
+        Returns:
+            Giá trị so sánh được
+        """
+
+    @abstractmethod
+    def save_all(self, records):
+        """Ghi đè toàn bộ tập bản ghi
+
+        Returns:
+            bool: True nếu ghi thành công
+        """
+
+    def insert(self, record):
+        records = self.load_all()
+        records.append(record)
+        return self.save_all(records)
+
+    def update(self, record_id, record):
+        records = self.load_all()
+        for i, existing in enumerate(records):
+            if existing.get(self.id_field) == record_id:
+                records[i] = record
+                return self.save_all(records)
+        return False
+
+    def delete(self, record_id):
+        records = self.load_all()
+        remaining = [r for r in records if r.get(self.id_field) != record_id]
+        if len(remaining) < len(records):
+            return self.save_all(remaining)
+        return False
+
+
+class JsonRepository(BaseRepository):
+    """Lưu trữ toàn bộ tập bản ghi trong một file JSON (qua record_store)
+
+    backups là số thế hệ sao lưu .bak.N giữ lại mỗi lần ghi file (0 = không sao lưu).
+    """
+
+    def __init__(self, file_path, id_field=None, backups=0):
+        super().__init__(id_field)
+        self.file_path = file_path
+        self.backups = backups
+
+    def load_all(self):
+        return load_json(self.file_path)
+
+    def signature(self):
+        return _file_signature(self.file_path)
+
+    def save_all(self, records):
+        return save_json(self.file_path, records, backups=self.backups)
+
+
+class JournalJsonRepository(JsonRepository):
+    """File JSON snapshot kèm journal JSON-lines chỉ ghi thêm
+
+    Mỗi insert/update/delete là một dòng ghi thêm vào journal; load_all phát lại
+    snapshot cộng journal. compact() gộp journal vào snapshot, tự động chạy khi
+    journal đạt compact_threshold dòng. Các thao tác journal là idempotent
+    (insert/update là upsert theo ID) nên phát lại sau khi gộp dở dang vẫn đúng.
+    """
+
+    def __init__(self, file_path, id_field, compact_threshold=500, backups=0):
+        super().__init__(file_path, id_field, backups)
+        self.journal_path = os.path.splitext(file_path)[0] + '.journal.jsonl'
+        self.compact_threshold = compact_threshold
+        self._state = None
+
+    def signature(self):
+        return (_file_signature(self.file_path), _file_signature(self.journal_path))
+
+    def _apply_entries(self, state, entries):
+        records, positions = state['records'], state['positions']
+        for entry in entries:
+            op = entry.get('op')
+            if op in ('insert', 'update'):
+                record = entry.get('record') or {}
+                record_id = record.get(self.id_field)
+                if record_id in positions:
+                    records[positions[record_id]] = record
+                else:
+                    positions[record_id] = len(records)
+                    records.append(record)
+            elif op == 'delete':
+                index = positions.pop(entry.get('id', entry.get(self.id_field)), None)
+                if index is not None:
+                    records[index] = None
+
+    def load_all(self):
+        """Đọc snapshot và phát lại journal, chỉ đọc phần journal mới ghi thêm"""
+        signature = _file_signature(self.file_path)
+        state = self._state
+        if state is None or state['signature'] != signature or \
+                (os.path.exists(self.journal_path) and os.path.getsize(self.journal_path) < state['offset']):
+            records = load_json(self.file_path)
+            state = {'signature': signature, 'offset': 0, 'entries': 0, 'records': records,
+                     'positions': {r.get(self.id_field): i for i, r in enumerate(records)}}
+            self._state = state
+
+        entries, state['offset'] = read_jsonl(self.journal_path, state['offset'])
+        if entries:
+            self._apply_entries(state, entries)
+            state['entries'] += len(entries)
+        # Bản sao từng bản ghi như load_json: người gọi sửa bản ghi không làm hỏng trạng thái đã phát lại
+        return [dict(r) for r in state['records'] if r is not None]
+
+    def save_all(self, records):
+        if not save_json(self.file_path, records, backups=self.backups):
+            return False
+        return self._remove_journal()
+
+    def _append(self, entry):
+        if not append_jsonl(self.journal_path, [entry]):
+            return False
+        state = self._state
+        if state is not None and state['entries'] + 1 >= self.compact_threshold:
+            self.compact()
+        return True
+
+    def insert(self, record):
+        return self._append({'op': 'insert', 'record': record})
+
+    def update(self, record_id, record):
+        return self._append({'op': 'update', 'record': record})
+
+    def delete(self, record_id):
+        return self._append({'op': 'delete', 'id': record_id})
+
+    def _remove_journal(self):
+        try:
+            if os.path.exists(self.journal_path):
+                os.remove(self.journal_path)
+        except OSError as e:
+            logger.error(f"Không thể xóa journal {self.journal_path}: {e}")
+            return False
+        self._state = None
+        return True
+
+    def compact(self):
+        """Gộp journal vào file snapshot và xóa journal
+
+        Returns:
+            bool: True nếu gộp thành công hoặc không có gì để gộp, False nếu có lỗi
+        """
+        if not os.path.exists(self.journal_path):
+            return True
+        records = self.load_all()
+        if not self.save_all(records):
+            logger.error(f"Không thể gộp journal vào {self.file_path}")
+            return False
+        logger.info(f"Đã gộp journal vào {self.file_path} ({len(records)} bản ghi)")
+        return True
+
+
+class SqliteRepository(BaseRepository):
+    """Lưu trữ tập bản ghi trong một bảng SQLite
+
+    Mỗi bản ghi được lưu nguyên dạng JSON trong cột data, kèm các cột được trích xuất
+    (user_id, date, year, month...) có chỉ mục để find()/sum() chạy bằng SQL.
+    Khi bảng được tạo lần đầu, dữ liệu JSON hiện có (kể cả journal và phân vùng nhật ký)
+    được nhập tự động.
+    """
+    supports_queries = True
+
+    def __init__(self, db_path, table, id_field=None, columns=None, indexes=(), import_path=None):
+        super().__init__(id_field)
+        self.db_path = db_path
+        self.table = table
+        self.columns = dict(columns or {})
+        self._lock = threading.RLock()
+        self._writes = 0  # Số lần ghi qua kết nối này (data_version không đổi với lần ghi của chính nó)
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        created = self._create_table(indexes)
+        if created and import_path:
+            records = _load_json_source(table, import_path)
+            self.save_all(records)
+            logger.info(f"Đã nhập {len(records)} bản ghi từ {import_path} vào bảng {table}")
+
+    def _create_table(self, indexes):
+        with self._lock, self._conn:
+            exists = self._conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (self.table,)).fetchone()
+            column_defs = ''.join(f', "{name}" {sql_type}' for name, (sql_type, _) in self.columns.items())
+            self._conn.execute(
+                f'CREATE TABLE IF NOT EXISTS "{self.table}" '
+                f'(seq INTEGER PRIMARY KEY AUTOINCREMENT, record_id TEXT{column_defs}, data TEXT NOT NULL)')
+            self._conn.execute(
+                f'CREATE INDEX IF NOT EXISTS "idx_{self.table}_record_id" ON "{self.table}" (record_id)')
+            for index_columns in indexes:
+                name = f"idx_{self.table}_{'_'.join(index_columns)}"
+                cols = ', '.join(f'"{c}"' for c in index_columns)
+                self._conn.execute(f'CREATE INDEX IF NOT EXISTS "{name}" ON "{self.table}" ({cols})')
+        return not exists
+
+    def _row_values(self, record):
+        record_id = record.get(self.id_field) if self.id_field else None
+        values = [extract(record) for _, extract in self.columns.values()]
+        return [record_id, *values, json.dumps(record, ensure_ascii=False)]
+
+    def _insert_sql(self):
+        names = ', '.join(['record_id', *(f'"{c}"' for c in self.columns), 'data'])
+        placeholders = ', '.join('?' * (len(self.columns) + 2))
+        return f'INSERT INTO "{self.table}" ({names}) VALUES ({placeholders})'
+
+    def _check_column(self, column):
+        if column != 'record_id' and column not in self.columns:
+            raise ValueError(f"Cột không được hỗ trợ trong bảng {self.table}: {column}")
+        return f'"{column}"'
+
+    def _where(self, equals=None, range_column=None, start=None, end=None):
+        clauses, params = [], []
+        for column, value in (equals or {}).items():
+            if value is None:
+                clauses.append(f'{self._check_column(column)} IS NULL')
+            else:
+                clauses.append(f'{self._check_column(column)} = ?')
+                params.append(value)
+        if range_column:
+            column = self._check_column(range_column)
+            if start is not None:
+                clauses.append(f'{column} >= ?')
+                params.append(start)
+            if end is not None:
+                clauses.append(f'{column} <= ?')
+                params.append(end)
+        return (' WHERE ' + ' AND '.join(clauses)) if clauses else '', params
+
+    def signature(self):
+        """(PRAGMA data_version, số lần ghi qua kết nối này)
+
+        data_version tăng khi một kết nối khác (manager khác, tiến trình khác) ghi vào cơ sở dữ liệu.
+        """
+        with self._lock:
+            return (self._conn.execute('PRAGMA data_version').fetchone()[0], self._writes)
+
+    def load_all(self):
+        with self._lock:
+            rows = self._conn.execute(f'SELECT data FROM "{self.table}" ORDER BY seq').fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def save_all(self, records):
+        try:
+            with self._lock, self._conn:
+                self._conn.execute(f'DELETE FROM "{self.table}"')
+                self._conn.executemany(self._insert_sql(), [self._row_values(r) for r in records])
+                self._writes += 1
+            return True
+        except sqlite3.Error as e:
+            logger.error(f"Lỗi khi lưu bảng {self.table}: {e}")
+            return False
+
+    def insert(self, record):
+        try:
+            with self._lock, self._conn:
+                self._conn.execute(self._insert_sql(), self._row_values(record))
+                self._writes += 1
+            return True
+        except sqlite3.Error as e:
+            logger.error(f"Lỗi khi thêm bản ghi vào bảng {self.table}: {e}")
+            return False
+
+    def update(self, record_id, record):
+        values = self._row_values(record)
+        assignments = ', '.join(['record_id = ?', *(f'"{c}" = ?' for c in self.columns), 'data = ?'])
+        try:
+            with self._lock, self._conn:
+                cursor = self._conn.execute(
+                    f'UPDATE "{self.table}" SET {assignments} WHERE seq = '
+                    f'(SELECT MIN(seq) FROM "{self.table}" WHERE record_id = ?)', [*values, record_id])
+                self._writes += 1
+            return cursor.rowcount > 0
+        except sqlite3.Error as e:
+            logger.error(f"Lỗi khi cập nhật bản ghi {record_id} trong bảng {self.table}: {e}")
+            return False
+
+    def delete(self, record_id):
+        try:
+            with self._lock, self._conn:
+                cursor = self._conn.execute(f'DELETE FROM "{self.table}" WHERE record_id = ?', (record_id,))
+                self._writes += 1
+            return cursor.rowcount > 0
+        except sqlite3.Error as e:
+            logger.error(f"Lỗi khi xóa bản ghi {record_id} trong bảng {self.table}: {e}")
+            return False
+
+    def find(self, equals=None, range_column=None, start=None, end=None, order_by=None, descending=False, limit=None, offset=None):
+        """Lấy các bản ghi thỏa điều kiện bằng SQL
+
+        Args:
+            equals (dict): Điều kiện bằng theo cột, vd {'user_id': 'user_001'}
+            range_column (str): Cột dùng để lọc khoảng [start, end]
+            start, end: Giới hạn khoảng (bao gồm hai đầu), None để bỏ qua
+            order_by (str): Cột sắp xếp, mặc định theo thứ tự thêm vào
+            descending (bool): Sắp xếp giảm dần
+            limit (int): Số bản ghi tối đa
+            offset (int): Bỏ qua offset bản ghi đầu (dùng cho phân trang)
+        """
+        where, params = self._where(equals, range_column, start, end)
+        order = self._check_column(order_by) if order_by else 'seq'
+        direction = " DESC" if descending else ""
+        # seq làm khóa phụ để thứ tự phân trang ổn định khi cột sắp xếp trùng giá trị
+        sql = f'SELECT data FROM "{self.table}"{where} ORDER BY {order}{direction}, seq{direction}'
+        if limit is not None or offset:
+            sql += ' LIMIT ? OFFSET ?'
+            params.extend([-1 if limit is None else int(limit), int(offset or 0)])
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def count(self, equals=None, range_column=None, start=None, end=None):
+        """Đếm số bản ghi thỏa điều kiện như find()"""
+        where, params = self._where(equals, range_column, start, end)
+        with self._lock:
+            row = self._conn.execute(f'SELECT COUNT(*) FROM "{self.table}"{where}', params).fetchone()
+        return row[0]
+
+    def sum(self, column, equals=None, range_column=None, start=None, end=None):
+        """Tính tổng một cột số bằng SQL với cùng điều kiện như find()"""
+        where, params = self._where(equals, range_column, start, end)
+        with self._lock:
+            row = self._conn.execute(
+                f'SELECT COALESCE(SUM({self._check_column(column)}), 0) FROM "{self.table}"{where}', params).fetchone()
+        return row[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class PartitionedJsonlRepository(BaseRepository):
+    """Tập bản ghi theo thời gian chỉ ghi thêm, chia thành các phân vùng JSON-lines theo tháng
+
+    Mỗi bản ghi được ghi thêm vào directory/YYYY-MM.jsonl theo trường thời gian (bản ghi
+    không có thời gian hợp lệ vào undated.jsonl). directory/index.json là chỉ mục thưa:
+    với mỗi phân vùng lưu kích thước đã lập chỉ mục, số bản ghi, thời gian nhỏ/lớn nhất
+    và cứ index_stride bản ghi thì một mốc (thời gian, vị trí byte), cùng số bản ghi theo
+    user_id để bỏ qua phân vùng không có người dùng cần tìm. Truy vấn theo khoảng
+    thời gian chỉ mở các phân vùng giao với khoảng đó và nhảy tới mốc gần nhất; phần cuối
+    file chưa có trong chỉ mục (do tiến trình khác ghi thêm) được quét bổ sung khi truy vấn.
+    Xóa dữ liệu cũ (retention) là xóa nguyên phân vùng.
+    """
+    supports_queries = True
+    UNDATED = 'undated'
+    INDEX_VERSION = 2
+
+    def __init__(self, directory, time_field, id_field=None, import_path=None, index_stride=256):
+        super().__init__(id_field)
+        self.directory = directory
+        self.time_field = time_field
+        self.index_stride = index_stride
+        self.index_path = os.path.join(directory, 'index.json')
+        self._lock = threading.RLock()
+        self._index = None
+        created = not os.path.isdir(directory)
+        os.makedirs(directory, exist_ok=True)
+        if created and import_path and os.path.exists(import_path):
+            # Nhập một lần từ file JSON cũ, sắp theo thời gian để các mốc chỉ mục dùng được
+            records = sorted(load_json(import_path), key=lambda r: self._timestamp(r) or '')
+            self.save_all(records)
+            logger.info(f"Đã nhập {len(records)} bản ghi từ {import_path} vào {directory}")
+
+    def _timestamp(self, record):
+        value = record.get(self.time_field)
+        return value if isinstance(value, str) and value else None
+
+    def partition_key(self, record):
+        """'YYYY-MM' theo trường thời gian của bản ghi, hoặc UNDATED"""
+        dt = normalize_datetime(self._timestamp(record))
+        return f"{dt.year:04d}-{dt.month:02d}" if dt else self.UNDATED
+
+    def _partition_path(self, key):
+        return os.path.join(self.directory, f"{key}.jsonl")
+
+    def _partition_keys(self):
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        return sorted(name[:-len('.jsonl')] for name in names if name.endswith('.jsonl'))
+
+    def _new_entry(self):
+        return {'size': 0, 'count': 0, 'min': None, 'max': None, 'ordered': True, 'marks': [], 'users': {}}
+
+    @staticmethod
+    def _user_key(user_id):
+        return str(user_id)
+
+    def _index_record(self, entry, offset, record):
+        """Cập nhật chỉ mục phân vùng với một bản ghi bắt đầu tại vị trí byte offset
+
+        Returns:
+            bool: True nếu thêm mốc mới (chỉ mục trên đĩa cần ghi lại)
+        """
+        timestamp = self._timestamp(record)
+        new_mark = False
+        if timestamp:
+            if entry['max'] is not None and timestamp < entry['max']:
+                # Ghi không theo thứ tự thời gian: không dùng mốc để nhảy trong phân vùng này
+                entry['ordered'] = False
+            if entry['min'] is None or timestamp < entry['min']:
+                entry['min'] = timestamp
+            if entry['max'] is None or timestamp > entry['max']:
+                entry['max'] = timestamp
+            if entry['count'] % self.index_stride == 0:
+                entry['marks'].append([timestamp, offset])
+                new_mark = True
+        user_key = self._user_key(record.get('user_id'))
+        entry['users'][user_key] = entry['users'].get(user_key, 0) + 1
+        entry['count'] += 1
+        return new_mark
+
+    def _read_lines(self, key, offset=0):
+        """Đọc các bản ghi đầy đủ của phân vùng từ vị trí byte offset
+
+        Returns:
+            tuple: ([(vị trí byte, bản ghi)], vị trí byte đã đọc tới)
+        """
+        try:
+            with open(self._partition_path(key), 'rb') as file:
+                file.seek(offset)
+                chunk = file.read()
+        except FileNotFoundError:
+            return [], offset
+        items = []
+        position = 0
+        end = chunk.rfind(b'\n') + 1
+        while position < end:
+            line_end = chunk.index(b'\n', position) + 1
+            line = chunk[position:line_end]
+            if line.strip():
+                try:
+                    items.append((offset + position, json.loads(line.decode('utf-8'))))
+                except ValueError as e:
+                    logger.error(f"Bỏ qua dòng hỏng trong {self._partition_path(key)} tại byte {offset + position}: {e}")
+            position = line_end
+        return items, offset + end
+
+    def _save_index(self):
+        save_json(self.index_path, {'version': self.INDEX_VERSION, 'stride': self.index_stride,
+                                    'partitions': self._index}, backups=0)
+
+    def _refresh_index(self):
+        """Đồng bộ chỉ mục với các file phân vùng trên đĩa, chỉ quét phần chưa lập chỉ mục"""
+        if self._index is None:
+            stored = load_json(self.index_path) if os.path.exists(self.index_path) else {}
+            usable = isinstance(stored, dict) and stored.get('version') == self.INDEX_VERSION and \
+                stored.get('stride') == self.index_stride
+            self._index = stored.get('partitions', {}) if usable else {}
+        changed = False
+        keys = self._partition_keys()
+        for key in list(self._index):
+            if key not in keys:
+                del self._index[key]
+                changed = True
+        for key in keys:
+            size = os.path.getsize(self._partition_path(key))
+            entry = self._index.get(key)
+            if entry is None or size < entry['size']:
+                # Phân vùng mới hoặc đã bị ghi lại: lập chỉ mục lại từ đầu
+                entry = self._index[key] = self._new_entry()
+                changed = True
+            if size > entry['size']:
+                items, entry['size'] = self._read_lines(key, entry['size'])
+                for offset, record in items:
+                    self._index_record(entry, offset, record)
+                changed = True
+        if changed:
+            self._save_index()
+        return self._index
+
+    def signature(self):
+        return tuple((key, _file_signature(self._partition_path(key))) for key in self._partition_keys())
+
+    def partitions(self):
+        """Thông tin các phân vùng: {key: {'count', 'min', 'max'}} theo thứ tự thời gian"""
+        with self._lock:
+            index = self._refresh_index()
+            return {key: {'count': entry['count'], 'min': entry['min'], 'max': entry['max']}
+                    for key, entry in sorted(index.items())}
+
+    def load_all(self):
+        with self._lock:
+            return [record for key in self._partition_keys() for _, record in self._read_lines(key)[0]]
+
+    def save_all(self, records):
+        """Ghi lại toàn bộ dữ liệu: mỗi phân vùng được ghi ra file tạm rồi đổi tên"""
+        groups = {}
+        for record in records:
+            groups.setdefault(self.partition_key(record), []).append(record)
+        try:
+            with self._lock:
+                for key, group in groups.items():
+                    path = self._partition_path(key)
+                    with open(path + '.tmp', 'w', encoding='utf-8') as file:
+                        file.writelines(json.dumps(r, ensure_ascii=False) + '\n' for r in group)
+                    os.replace(path + '.tmp', path)
+                for key in self._partition_keys():
+                    if key not in groups:
+                        os.remove(self._partition_path(key))
+                self._index = {}
+                self._refresh_index()
+            return True
+        except OSError as e:
+            logger.error(f"Lỗi khi lưu phân vùng trong {self.directory}: {e}")
+            return False
+
+    def insert(self, record):
+        """Ghi thêm một bản ghi vào phân vùng của nó (không đọc lại dữ liệu cũ)"""
+        return self.insert_many([record])
+
+    def insert_many(self, records):
+        """Ghi thêm nhiều bản ghi, mỗi phân vùng một lần ghi"""
+        groups = {}
+        for record in records:
+            groups.setdefault(self.partition_key(record), []).append(record)
+        with self._lock:
+            index = self._refresh_index()
+            save_index = False
+            for key, group in groups.items():
+                path = self._partition_path(key)
+                offset = os.path.getsize(path) if os.path.exists(path) else 0
+                if not append_jsonl(path, group):
+                    return False
+                entry = index.get(key)
+                if entry is None:
+                    entry = index[key] = self._new_entry()
+                    save_index = True
+                if entry['size'] == offset:
+                    for record in group:
+                        save_index |= self._index_record(entry, offset, record)
+                        offset += len((json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8'))
+                    entry['size'] = offset
+                # Nếu không khớp (tiến trình khác vừa ghi thêm), lần truy vấn sau sẽ quét bổ sung
+            if save_index:
+                self._save_index()
+        return True
+
+    def _matches(self, record, equals):
+        return all(record.get(column) == value for column, value in (equals or {}).items())
+
+    def _check_column(self, column):
+        if column not in (None, self.time_field):
+            raise ValueError(f"Chỉ hỗ trợ lọc/sắp xếp theo {self.time_field} trong {self.directory}: {column}")
+
+    def _excluded(self, key, entry, start, end, equals):
+        """True nếu chỉ mục cho biết phân vùng không có bản ghi nào thỏa điều kiện"""
+        if (start is not None or end is not None) and (
+                key == self.UNDATED or entry['max'] is None or
+                (start is not None and entry['max'] < start) or (end is not None and entry['min'] > end)):
+            return True
+        return bool(equals) and 'user_id' in equals and \
+            not entry['users'].get(self._user_key(equals['user_id']))
+
+    def _covered(self, key, entry, start, end):
+        """True nếu mọi bản ghi của phân vùng nằm trong [start, end]"""
+        if start is None and end is None:
+            return True
+        return key != self.UNDATED and entry['min'] is not None and \
+            (start is None or entry['min'] >= start) and (end is None or entry['max'] <= end)
+
+    def _iter_partition(self, key, entry, start, end, equals, descending=False):
+        offset = 0
+        if entry['ordered'] and start is not None:
+            # Mốc cuối cùng trước start: các bản ghi trước mốc đó đều nhỏ hơn start
+            for mark_time, mark_offset in entry['marks']:
+                if mark_time >= start:
+                    break
+                offset = mark_offset
+        items, _ = self._read_lines(key, offset)
+        bounded = start is not None or end is not None
+        records = []
+        for _, record in items:
+            if bounded:
+                timestamp = self._timestamp(record)
+                if timestamp is None or (start is not None and timestamp < start):
+                    continue
+                if end is not None and timestamp > end:
+                    if entry['ordered']:
+                        break
+                    continue
+            if self._matches(record, equals):
+                records.append(record)
+        return reversed(records) if descending else records
+
+    def _partitions_for(self, start, end, equals, descending=False):
+        with self._lock:
+            index = dict(self._refresh_index())
+        return [(key, index[key]) for key in sorted(index, reverse=descending)
+                if not self._excluded(key, index[key], start, end, equals)]
+
+    def iter_range(self, start=None, end=None, equals=None, descending=False):
+        """Duyệt các bản ghi có thời gian trong [start, end], từng phân vùng một
+
+        Với descending=True, phân vùng mới nhất được đọc trước và bản ghi trong mỗi
+        phân vùng được trả về từ cuối lên; người gọi dừng sớm thì các phân vùng cũ hơn
+        không bị đọc.
+        """
+        for key, entry in self._partitions_for(start, end, equals, descending):
+            yield from self._iter_partition(key, entry, start, end, equals, descending)
+
+    def find(self, equals=None, range_column=None, start=None, end=None, order_by=None, descending=False, limit=None, offset=None):
+        """Lấy các bản ghi thỏa điều kiện như SqliteRepository.find
+
+        Chỉ hỗ trợ lọc khoảng và sắp xếp theo trường thời gian; order_by=None giữ thứ tự ghi.
+        Khi các phân vùng liên quan được ghi theo thứ tự thời gian, trang offset/limit được
+        lấy bằng cách duyệt tuần tự và dừng khi đủ, không đọc toàn bộ dữ liệu.
+        """
+        self._check_column(range_column)
+        self._check_column(order_by)
+        if range_column is None:
+            start = end = None
+        offset = int(offset or 0)
+        stop = offset + int(limit) if limit is not None else None
+        partitions = self._partitions_for(start, end, equals, descending)
+        if order_by and not all(entry['ordered'] and key != self.UNDATED for key, entry in partitions):
+            records = [record for key, entry in partitions
+                       for record in self._iter_partition(key, entry, start, end, equals)]
+            records.sort(key=lambda r: self._timestamp(r) or '', reverse=descending)
+            return records[offset:stop]
+        stream = (record for key, entry in partitions
+                  for record in self._iter_partition(key, entry, start, end, equals, descending))
+        return list(itertools.islice(stream, offset, stop))
+
+    def count(self, equals=None, range_column=None, start=None, end=None):
+        """Đếm số bản ghi thỏa điều kiện; phân vùng nằm trọn trong khoảng được đếm từ chỉ mục
+
+        Chỉ mục đủ để đếm khi điều kiện bằng chỉ gồm user_id; các điều kiện khác cần đọc
+        các phân vùng còn lại sau khi đã loại theo chỉ mục.
+        """
+        self._check_column(range_column)
+        if range_column is None:
+            start = end = None
+        user_only = not equals or set(equals) == {'user_id'}
+        total = 0
+        for key, entry in self._partitions_for(start, end, equals):
+            if user_only and self._covered(key, entry, start, end):
+                total += entry['users'].get(self._user_key(equals['user_id']), 0) if equals else entry['count']
+            else:
+                total += sum(1 for _ in self._iter_partition(key, entry, start, end, equals))
+        return total
+
+    def drop_partitions_before(self, key):
+        """Xóa nguyên các phân vùng cũ hơn tháng key ('YYYY-MM')
+
+        Returns:
+            list: Các phân vùng đã xóa
+        """
+        dropped = []
+        with self._lock:
+            for partition in self._partition_keys():
+                if partition != self.UNDATED and partition < key:
+                    try:
+                        os.remove(self._partition_path(partition))
+                        dropped.append(partition)
+                    except OSError as e:
+                        logger.error(f"Không thể xóa phân vùng {partition} trong {self.directory}: {e}")
+            if dropped:
+                self._refresh_index()
+                logger.info(f"Đã xóa {len(dropped)} phân vùng cũ hơn {key} trong {self.directory}")
+        return dropped
+
+
+def get_storage_backend():
+    """Trả về kiểu lưu trữ đang cấu hình trong config.json ('json' hoặc 'sqlite')"""
+    return get_config_value('database', 'type', 'json')
+
+
+def default_sqlite_path(data_dir):
+    return os.path.join(data_dir, get_config_value('database', 'sqlite_file', 'finance.db'))
+
+
+def _load_json_source(collection, json_path):
+    """Đọc toàn bộ dữ liệu lưu trữ JSON hiện có của một tập dữ liệu để nhập vào SQLite
+
+    Journal còn sót được gộp vào snapshot trước, và nhật ký lấy từ các phân vùng JSON-lines
+    (thư mục cùng tên với file JSON) nếu có, để không bỏ sót bản ghi chưa nằm trong file JSON.
+
+    Returns:
+        list: Các bản ghi (rỗng nếu chưa có dữ liệu)
+    """
+    spec = COLLECTIONS.get(collection, {})
+    if spec.get('id_field'):
+        JournalJsonRepository(json_path, spec['id_field']).compact()
+    partition_dir = os.path.splitext(json_path)[0]
+    if collection == 'audit_logs' and os.path.isdir(partition_dir):
+        return PartitionedJsonlRepository(partition_dir, 'timestamp').load_all()
+    return load_json(json_path) if os.path.exists(json_path) else []
+
+
+def create_repository(collection, file_path, backend=None, storage_mode=None, compact_threshold=500):
+    """Tạo repository cho một tập dữ liệu theo cấu hình
+
+    Args:
+        collection (str): Tên tập dữ liệu trong COLLECTIONS
+        file_path (str): Đường dẫn file JSON của tập dữ liệu (nguồn nhập khi dùng SQLite)
+        backend (str): 'json' hoặc 'sqlite', mặc định lấy từ config.json (database.type)
+        storage_mode (str): Với giao dịch trên JSON: 'snapshot' hoặc 'journal',
+            mặc định lấy từ config.json (database.transaction_storage)
+        compact_threshold (int): Số dòng journal tối đa trước khi tự động gộp
+
+    Returns:
+        BaseRepository: Repository tương ứng
+    """
+    spec = COLLECTIONS[collection]
+    backend = backend or get_storage_backend()
+    if backend == 'sqlite':
+        return SqliteRepository(
+            default_sqlite_path(os.path.dirname(file_path)), collection, spec['id_field'],
+            spec['columns'], spec['indexes'], import_path=file_path)
+    if backend != 'json':
+        logger.warning(f"Kiểu lưu trữ không hỗ trợ: {backend}. Dùng JSON.")
+    # Chỉ dữ liệu người dùng nhập mới giữ bản sao lưu; dữ liệu ghi thường xuyên (thông báo đã đọc...) thì không
+    backups = get_config_value('database', 'backup_generations', 0) if spec.get('backups') else 0
+
+    if collection == 'audit_logs' and get_config_value('audit', 'storage', 'partitioned') == 'partitioned':
+        # Nhật ký chỉ ghi thêm: phân vùng theo tháng trong thư mục cùng tên với file JSON
+        return PartitionedJsonlRepository(os.path.splitext(file_path)[0], 'timestamp', spec['id_field'],
+                                          import_path=file_path)
+    if collection == 'notification_reads':
+        # Mỗi lần đổi con trỏ đã đọc là một dòng ghi thêm, không ghi lại toàn bộ file
+        return JournalJsonRepository(file_path, spec['id_field'], compact_threshold)
+    if collection == 'transactions':
+        storage_mode = storage_mode or get_config_value('database', 'transaction_storage', 'snapshot')
+        journal = JournalJsonRepository(file_path, spec['id_field'], compact_threshold, backups)
+        if storage_mode == 'journal':
+            return journal
+        # Journal còn sót từ chế độ journal trước đó: gộp vào snapshot để không mất dữ liệu
+        journal.compact()
+    return JsonRepository(file_path, spec['id_field'], backups)
+
+
+def migrate_json_to_sqlite(data_dir=None, db_path=None, overwrite=False):
+    """Nhập một lần toàn bộ các file JSON trong data/ vào cơ sở dữ liệu SQLite
+
+    Args:
+        data_dir (str): Thư mục chứa các file JSON, mặc định là data/ của ứng dụng
+        db_path (str): Đường dẫn file SQLite, mặc định data/finance.db
+        overwrite (bool): Ghi đè bảng đã có dữ liệu
+
+    Returns:
+        dict: Số bản ghi đã nhập theo từng tập dữ liệu
+    """
+    if data_dir is None:
+        data_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+    db_path = db_path or default_sqlite_path(data_dir)
+    result = {}
+    for collection, spec in COLLECTIONS.items():
+        json_path = os.path.join(data_dir, spec['file'])
+        repo = SqliteRepository(db_path, collection, spec['id_field'], spec['columns'], spec['indexes'])
+        try:
+            if not overwrite and repo.load_all():
+                logger.info(f"Bỏ qua {collection}: bảng đã có dữ liệu")
+                continue
+            records = _load_json_source(collection, json_path)
+            if repo.save_all(records):
+                result[collection] = len(records)
+                logger.info(f"Đã nhập {len(records)} bản ghi vào {collection}")
+        finally:
+            repo.close()
+    return result
+
+
+if __name__ == "__main__":
+    # Chạy: python -m data_manager.repository [--overwrite]
+    import sys
+    logging.basicConfig(level=logging.INFO)
+    for name, count in migrate_json_to_sqlite(overwrite='--overwrite' in sys.argv).items():
+        print(f"{name}: {count}")
@@ -0,0 +1,92 @@
+import datetime
+
+import numpy as np
+
+# Mã loại giao dịch lưu trong cột types (0 = loại khác/không rõ)
+TYPE_CODES = {'income': 1, 'expense': 2}
+EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+
+
+def epoch_day(value):
+    """Đổi date/datetime thành số ngày kể từ 1970-01-01"""
+    if isinstance(value, datetime.datetime):
+        value = value.date()
+    return value.toordinal() - EPOCH_ORDINAL
+
+
+def month_code(value):
+    """Đổi date/datetime thành số tháng liên tục (năm * 12 + tháng - 1)"""
+    return value.year * 12 + value.month - 1
+
+
+class TransactionFrame:
+    """Ảnh chụp dạng cột (mảng NumPy) giao dịch của một người dùng, sắp xếp theo ngày, dùng cho thống kê
+
+    Mỗi giao dịch là một vị trí trong các cột song song:
+        days: số ngày kể từ 1970-01-01 (tăng dần)
+        months: số tháng liên tục (xem month_code)
+        amounts: số tiền
+        types: mã loại giao dịch (TYPE_CODES)
+        categories: mã danh mục, tra category_id qua category_ids[mã]
+    Khoảng ngày được cắt bằng np.searchsorted trên cột days; phép tổng và gom nhóm
+    dùng mặt nạ boolean và np.bincount trên các cột thay vì vòng lặp Python.
+    """
+
+    def __init__(self, dated_records):
+        """
+        Args:
+            dated_records: Các cặp (datetime, giao dịch) đã sắp xếp theo ngày tăng dần
+        """
+        dated_records = list(dated_records)
+        self.category_ids = []
+        category_codes = {}
+        categories = []
+        for _, t in dated_records:
+            category_id = t.get('category_id', 'unknown')
+            code = category_codes.get(category_id)
+            if code is None:
+                code = category_codes[category_id] = len(self.category_ids)
+                self.category_ids.append(category_id)
+            categories.append(code)
+        self.days = np.asarray([epoch_day(d) for d, _ in dated_records], dtype=np.int64)
+        self.months = np.asarray([month_code(d) for d, _ in dated_records], dtype=np.int64)
+        self.amounts = np.asarray([t.get('amount', 0) or 0 for _, t in dated_records], dtype=np.float64)
+        self.types = np.asarray([TYPE_CODES.get(t.get('type'), 0) for _, t in dated_records], dtype=np.int8)
+        self.categories = np.asarray(categories, dtype=np.intp)
+
+    def __len__(self):
+        return len(self.days)
+
+    def span(self, start_date=None, end_date=None):
+        """Vị trí [lo, hi) của các giao dịch trong khoảng ngày (bao gồm hai đầu, None = không giới hạn)"""
+        lo = int(np.searchsorted(self.days, epoch_day(start_date), side='left')) if start_date is not None else 0
+        hi = int(np.searchsorted(self.days, epoch_day(end_date), side='right')) if end_date is not None else len(self.days)
+        return lo, max(lo, hi)
+
+    def totals(self, start_date=None, end_date=None):
+        """Tổng thu và chi trong khoảng ngày
+
+        Returns:
+            dict: {'income': tổng, 'expense': tổng}
+        """
+        lo, hi = self.span(start_date, end_date)
+        sums = np.bincount(self.types[lo:hi], weights=self.amounts[lo:hi], minlength=len(TYPE_CODES) + 1)
+        return {tx_type: float(sums[code]) for tx_type, code in TYPE_CODES.items()}
+
+    def total(self, tx_type, start_date=None, end_date=None):
+        """Tổng số tiền của một loại giao dịch trong khoảng ngày"""
+        return self.totals(start_date, end_date).get(tx_type, 0)
+
+    def by_category(self, tx_type, start_date=None, end_date=None):
+        """Tổng số tiền theo danh mục cho một loại giao dịch trong khoảng ngày
+
+        Returns:
+            dict: category_id -> tổng (chỉ các danh mục có giao dịch)
+        """
+        lo, hi = self.span(start_date, end_date)
+        mask = self.types[lo:hi] == TYPE_CODES.get(tx_type)
+        categories = self.categories[lo:hi][mask]
+        size = len(self.category_ids)
+        sums = np.bincount(categories, weights=self.amounts[lo:hi][mask], minlength=size)
+        present = np.bincount(categories, minlength=size)
+        return {self.category_ids[code]: float(sums[code]) for code in np.flatnonzero(present)}
@@ -1,17 +1,32 @@
 import os
 import logging
-from utils.file_helper import load_json, save_json, generate_id
+from utils.file_helper import save_json, id_allocator
+from data_manager.repository import create_repository, normalize_datetime
+from data_manager.change_events import event_bus, INSERTED, UPDATED, DELETED
+import numpy as np
+from data_manager.transaction_frame import TransactionFrame, TYPE_CODES, epoch_day, month_code
 import datetime
+import threading
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
 
 # Cấu hình logging
 logger = logging.getLogger(__name__)
 
 class TransactionManager:
-    def __init__(self, file_path='transactions.json', budget_manager=None):
+    VIEW_CACHE_SIZE = 8 # Số truy vấn (sắp xếp, loại, tìm kiếm) giữ trong _views
+
+    def __init__(self, file_path='transactions.json', budget_manager=None, storage_mode=None, journal_compact_threshold=500, repository=None, events=None):
         """Khởi tạo quản lý giao dịch
         
         Args:
             file_path: Đường dẫn đến file lưu trữ giao dịch
+            storage_mode: Với kiểu lưu trữ JSON: 'snapshot' (ghi lại toàn bộ file) hoặc 'journal'
+                (ghi thêm vào file JSON-lines và gộp định kỳ). Mặc định lấy từ config.json
+                (database.transaction_storage)
+            journal_compact_threshold: Số dòng journal tối đa trước khi tự động gộp vào snapshot
+            repository: Repository tùy chọn, mặc định tạo theo config.json (database.type)
+            events: EventBus nhận ChangeEvent('transaction', ...) sau mỗi lần ghi, mặc định event_bus dùng chung
         """
         base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
         data_dir = os.path.join(base_dir, 'data')
@@ -20,6 +35,22 @@ class TransactionManager:
         if not os.path.exists(self.file_path):
             save_json(self.file_path, [])
         self.budget_manager = budget_manager # Thêm tham chiếu đến BudgetManager nếu truyền vào
+        self.events = events or event_bus
+        self.repository = repository or create_repository(
+            'transactions', self.file_path, storage_mode=storage_mode, compact_threshold=journal_compact_threshold)
+        # Dữ liệu dẫn xuất trong bộ nhớ (chỉ dùng với repository JSON):
+        # chỉ mục user_id -> (danh sách ngày đã sắp xếp, giao dịch tương ứng) và
+        # bảng tổng chi (user_id, category_id, năm, tháng) -> số tiền
+        self._user_index = None
+        self._expense_rollup = None
+        self._derived_signature = None
+        # Ảnh chụp dạng cột theo người dùng (user_id -> TransactionFrame) cho các phép thống kê
+        self._frames = {}
+        # Danh sách đã lọc/sắp xếp cho bảng giao dịch phân trang, khóa theo tham số truy vấn;
+        # chỉ giữ VIEW_CACHE_SIZE truy vấn dùng gần nhất (mỗi chuỗi tìm kiếm là một truy vấn mới)
+        self._views = OrderedDict()
+        # Bảo vệ dữ liệu dẫn xuất: dashboard dựng chúng ở luồng nền (prefetch) trong khi luồng giao diện ghi
+        self._index_lock = threading.RLock()
 
     def get_all_transactions(self):
         """Lấy tất cả giao dịch
@@ -27,7 +58,142 @@ class TransactionManager:
         Returns:
             list: Danh sách tất cả giao dịch
         """
-        return load_json(self.file_path)
+        return self.repository.load_all()
+
+    def compact_journal(self):
+        """Gộp journal giao dịch vào file snapshot (chỉ có tác dụng với chế độ journal)
+        
+        Returns:
+            bool: True nếu gộp thành công hoặc không có gì để gộp, False nếu có lỗi
+        """
+        if hasattr(self.repository, 'compact'):
+            return self.repository.compact()
+        return True
+
+    def _ensure_derived(self, force=False):
+        """Đảm bảo chỉ mục theo người dùng và bảng tổng chi theo tháng khớp với dữ liệu lưu trữ
+
+        Cả hai được dựng lại trong một lần duyệt khi dữ liệu thay đổi từ bên ngoài;
+        các thay đổi qua add/update/delete_transaction được cập nhật trực tiếp.
+
+        Returns:
+            bool: False nếu repository tự hỗ trợ truy vấn
+        """
+        if self.repository.supports_queries:
+            return False
+        with self._index_lock:
+            signature = self.repository.signature()
+            if force or self._user_index is None or signature != self._derived_signature:
+                grouped = {}
+                rollup = {}
+                for t in self.get_all_transactions():
+                    tx_date = normalize_datetime(t.get('date'))
+                    if tx_date is None:
+                        continue
+                    grouped.setdefault(t.get('user_id'), []).append((tx_date, t))
+                    if t.get('type') == 'expense':
+                        key = (t.get('user_id'), t.get('category_id'), tx_date.year, tx_date.month)
+                        rollup[key] = rollup.get(key, 0) + t.get('amount', 0)
+                index = {}
+                for user_id, items in grouped.items():
+                    items.sort(key=lambda item: item[0])
+                    index[user_id] = ([d for d, _ in items], [t for _, t in items])
+                self._user_index = index
+                self._expense_rollup = rollup
+                self._frames = {}
+                self._views.clear()
+                self._derived_signature = signature
+                logger.debug(f"Đã dựng chỉ mục giao dịch cho {len(index)} người dùng, {len(rollup)} mục tổng chi theo tháng")
+            return True
+
+    def _get_user_index(self):
+        """Lấy chỉ mục giao dịch theo người dùng (user_id -> (ngày đã sắp xếp, giao dịch)), hoặc None"""
+        return self._user_index if self._ensure_derived() else None
+
+    def _get_expense_rollup(self):
+        """Lấy bảng tổng chi (user_id, category_id, năm, tháng) -> số tiền, hoặc None"""
+        return self._expense_rollup if self._ensure_derived() else None
+
+    def rebuild_expense_rollups(self):
+        """Dựng lại bảng tổng chi theo tháng (và chỉ mục theo người dùng) từ dữ liệu lưu trữ
+        
+        Returns:
+            bool: True nếu đã dựng lại, False nếu repository tự tính tổng bằng truy vấn
+        """
+        return self._ensure_derived(force=True)
+
+    def _derived_is_current(self):
+        return self._user_index is not None and self.repository.signature() == self._derived_signature
+
+    def _update_derived(self, was_current, old=None, new=None):
+        """Cập nhật chỉ mục và bảng tổng chi sau khi ghi: bỏ bản ghi cũ (nếu có), thêm bản ghi mới (nếu có)
+
+        Args:
+            was_current: Dữ liệu dẫn xuất có khớp dữ liệu lưu trữ ngay trước khi ghi hay không;
+                nếu không, chúng bị hủy để dựng lại ở lần đọc sau
+
+        Người gọi giữ _index_lock từ lúc lấy was_current tới khi cập nhật xong.
+        """
+        if not was_current:
+            self._user_index = None
+            self._expense_rollup = None
+            self._frames = {}
+            self._views.clear()
+            return
+        for record in (old, new):
+            if record is not None:
+                self._frames.pop(record.get('user_id'), None)
+        self._views.clear()
+        if old is not None:
+            old_date = normalize_datetime(old.get('date'))
+            entry = self._user_index.get(old.get('user_id'))
+            if entry is not None and old_date is not None:
+                dates, records = entry
+                tid = old.get('transaction_id')
+                for i in range(bisect_left(dates, old_date), bisect_right(dates, old_date)):
+                    if records[i].get('transaction_id') == tid:
+                        del dates[i]
+                        del records[i]
+                        break
+            if old_date is not None and old.get('type') == 'expense':
+                key = (old.get('user_id'), old.get('category_id'), old_date.year, old_date.month)
+                self._expense_rollup[key] = self._expense_rollup.get(key, 0) - old.get('amount', 0)
+        if new is not None:
+            new_date = normalize_datetime(new.get('date'))
+            if new_date is not None:
+                dates, records = self._user_index.setdefault(new.get('user_id'), ([], []))
+                pos = bisect_right(dates, new_date)
+                dates.insert(pos, new_date)
+                records.insert(pos, new)
+                if new.get('type') == 'expense':
+                    key = (new.get('user_id'), new.get('category_id'), new_date.year, new_date.month)
+                    self._expense_rollup[key] = self._expense_rollup.get(key, 0) + new.get('amount', 0)
+        self._derived_signature = self.repository.signature()
+
+    def get_frame(self, user_id):
+        """Lấy ảnh chụp dạng cột các giao dịch của người dùng (xem TransactionFrame)
+
+        Ảnh chụp được lưu đệm và bị hủy khi giao dịch của người dùng thay đổi.
+
+        Args:
+            user_id: ID của người dùng
+
+        Returns:
+            TransactionFrame: Các cột ngày, tháng, số tiền, loại, danh mục sắp xếp theo ngày
+        """
+        with self._index_lock:
+            index = self._get_user_index()
+            frame = self._frames.get(user_id)
+            if frame is not None:
+                return frame
+            if index is not None:
+                dates, records = index.get(user_id, ([], []))
+                frame = TransactionFrame(zip(dates, records))
+            else:
+                dated = [(normalize_datetime(t.get('date')), t) for t in self.get_transactions_by_user(user_id)]
+                frame = TransactionFrame(sorted((item for item in dated if item[0] is not None), key=lambda item: item[0]))
+            self._frames[user_id] = frame
+            return frame
 
     def get_transactions_by_user(self, user_id):
         """Lấy giao dịch theo ID người dùng
@@ -38,6 +204,8 @@ class TransactionManager:
         Returns:
             list: Danh sách giao dịch của người dùng
         """
+        if self.repository.supports_queries:
+            return self.repository.find(equals={'user_id': user_id})
         return [t for t in self.get_all_transactions() if t.get('user_id') == user_id]
 
     def add_transaction(self, transaction):
@@ -49,21 +217,11 @@ class TransactionManager:
         Returns:
             dict: Thông tin giao dịch đã được thêm
         """
-        transactions = self.get_all_transactions()
         # Chuẩn hóa ID cho đồng bộ
         if 'transaction_id' not in transaction:
-            # Tìm ID lớn nhất hiện tại
-            max_id = 0
-            for t in transactions:
-                tid = t.get('transaction_id', '')
-                if tid and tid.startswith('txn_'):
-                    try:
-                        id_num = int(tid[4:])
-                        max_id = max(max_id, id_num)
-                    except ValueError:
-                        continue
-            # Tạo ID mới
-            transaction['transaction_id'] = f"txn_{max_id+1:03d}"
+            # Dữ liệu chỉ được đọc để khôi phục số thứ tự nếu chưa có trong sequences.json
+            transaction['transaction_id'] = id_allocator.next_id(
+                'txn', seed=self.get_all_transactions, id_field='transaction_id')
         
         # Chuẩn hóa định dạng ngày
         for date_field in ['date', 'created_at', 'updated_at']:
@@ -73,8 +231,11 @@ class TransactionManager:
                 except Exception as e:
                     logger.error(f"Không thể chuẩn hóa ngày cho trường {date_field}: {e}")
         
-        transactions.append(transaction)
-        save_json(self.file_path, transactions)
+        with self._index_lock:
+            derived_current = self._derived_is_current()
+            self.repository.insert(transaction)
+            self._update_derived(derived_current, new=transaction)
+        self.events.publish('transaction', INSERTED, record=transaction)
         # Sau khi thêm giao dịch chi tiêu, chỉ gọi apply_expense_to_budget (KHÔNG gọi add_or_update_budget)
         if self.budget_manager and transaction.get('type') == 'expense':            
             user_id = transaction.get('user_id')
@@ -108,8 +269,11 @@ class TransactionManager:
                 if 'created_at' not in updated_transaction and 'created_at' in t:
                     updated_transaction['created_at'] = t['created_at']
                 updated_transaction['updated_at'] = datetime.datetime.now().isoformat()
-                transactions[i] = updated_transaction
-                save_json(self.file_path, transactions)
+                with self._index_lock:
+                    derived_current = self._derived_is_current()
+                    self.repository.update(t.get('transaction_id'), updated_transaction)
+                    self._update_derived(derived_current, old=t, new=updated_transaction)
+                self.events.publish('transaction', UPDATED, record=updated_transaction, old=t)
                 # Sau khi cập nhật giao dịch chi tiêu, cập nhật ngân sách liên quan
                 if self.budget_manager and updated_transaction.get('type') == 'expense':
                     user_id = updated_transaction.get('user_id')
@@ -136,9 +300,16 @@ class TransactionManager:
         """Xóa một giao dịch theo ID của nó."""
         transactions = self.get_all_transactions()
         original_length = len(transactions)
+        removed = [t for t in transactions if t.get('transaction_id') == transaction_id]
         transactions = [t for t in transactions if t.get('transaction_id') != transaction_id]
         if len(transactions) < original_length:
-            save_json(self.file_path, transactions)
+            with self._index_lock:
+                derived_current = self._derived_is_current()
+                self.repository.delete(transaction_id)
+                for t in removed:
+                    self._update_derived(derived_current, old=t)
+            for t in removed:
+                self.events.publish('transaction', DELETED, old=t)
             # Sau khi xóa giao dịch chi tiêu, cập nhật ngân sách liên quan
             deleted_tx = [t for t in transactions if t.get('transaction_id') == transaction_id]
             if self.budget_manager and deleted_tx and deleted_tx[0].get('type') == 'expense':
@@ -171,11 +342,14 @@ class TransactionManager:
         Returns:
             list: Danh sách giao dịch trong tháng
         """
-        transactions = self.get_all_transactions()
-        
         # Nếu cả năm và tháng đều là 0, trả về tất cả giao dịch (bộ lọc = "Tất cả")
         if year == 0 or month == 0:
-            return transactions
+            return self.get_all_transactions()
+
+        if self.repository.supports_queries:
+            return self.repository.find(equals={'year': year, 'month': month})
+
+        transactions = self.get_all_transactions()
         
         month_transactions = []
         
@@ -218,6 +392,142 @@ class TransactionManager:
             
         return sorted_transactions[:limit]
     
+    # Các trường có thể dùng để sắp xếp bảng giao dịch (ánh xạ sang cột SQLite nếu có)
+    SORT_FIELDS = {
+        'date': 'date', 'amount': 'amount', 'type': 'type', 'category_id': 'category_id',
+        'transaction_id': 'record_id', 'description': None,
+    }
+
+    @staticmethod
+    def _matches(t, tx_type=None, search=None):
+        if tx_type and t.get('type') != tx_type:
+            return False
+        return not search or search in str(t.get('description', '')).casefold()
+
+    @classmethod
+    def matches_query(cls, t, tx_type=None, search=None):
+        """Giao dịch có thuộc kết quả của get_transaction_page với bộ lọc này không"""
+        return cls._matches(t, tx_type, search.strip().casefold() if search else None)
+
+    @staticmethod
+    def sort_key(sort_by):
+        """Hàm khóa sắp xếp tương ứng với sort_by của get_transaction_page"""
+        if sort_by == 'date':
+            return lambda t: normalize_datetime(t.get('date')) or datetime.datetime.min
+        if sort_by == 'amount':
+            return lambda t: t.get('amount') or 0
+        return lambda t: str(t.get(sort_by) or '').casefold()
+
+    def _get_view(self, user_id, sort_by, descending, tx_type, search):
+        """Danh sách giao dịch của người dùng đã lọc và sắp xếp (lưu đệm đến lần ghi kế tiếp)"""
+        key = (user_id, sort_by, descending, tx_type, search)
+        with self._index_lock:
+            index = self._get_user_index()
+            view = self._views.get(key) if index is not None else None
+            if view is not None:
+                self._views.move_to_end(key)
+                return view
+            if index is not None:
+                # Chỉ mục đã sắp xếp theo ngày tăng dần
+                records = index.get(user_id, ([], []))[1]
+            else:
+                records = sorted(self.get_transactions_by_user(user_id), key=self.sort_key('date'))
+            view = [t for t in records if self._matches(t, tx_type, search)]
+            if sort_by == 'date':
+                if descending:
+                    view.reverse()
+            else:
+                # sort ổn định nên các giá trị trùng giữ thứ tự theo ngày
+                view.sort(key=self.sort_key(sort_by), reverse=descending)
+            if index is not None:
+                self._views[key] = view
+                while len(self._views) > self.VIEW_CACHE_SIZE:
+                    self._views.popitem(last=False)
+            return view
+
+    def count_transactions(self, user_id, tx_type=None, search=None):
+        """Đếm giao dịch của người dùng theo bộ lọc (xem get_transaction_page)"""
+        search = search.strip().casefold() if search else None
+        if self.repository.supports_queries and not search:
+            equals = {'user_id': user_id}
+            if tx_type:
+                equals['type'] = tx_type
+            return self.repository.count(equals=equals)
+        if not tx_type and not search:
+            index = self._get_user_index()
+            if index is not None:
+                return len(index.get(user_id, ([], []))[0])
+        return len(self._get_view(user_id, 'date', True, tx_type, search))
+
+    def get_transaction_page(self, user_id, offset=0, limit=None, sort_by='date', descending=True, tx_type=None, search=None):
+        """Lấy một trang giao dịch của người dùng, lọc và sắp xếp phía lưu trữ
+
+        Args:
+            user_id: ID người dùng
+            offset, limit: Vị trí bắt đầu và số giao dịch tối đa của trang (limit=None: tới hết)
+            sort_by: Một trong SORT_FIELDS
+            descending: Sắp xếp giảm dần (mặc định mới nhất lên đầu)
+            tx_type: 'income', 'expense' hoặc None (tất cả)
+            search: Chuỗi cần có trong mô tả (không phân biệt hoa thường)
+
+        Returns:
+            list: Các giao dịch của trang
+        """
+        if sort_by not in self.SORT_FIELDS:
+            raise ValueError(f"Không hỗ trợ sắp xếp theo: {sort_by}")
+        search = search.strip().casefold() if search else None
+        end = None if limit is None else offset + limit
+        if self.repository.supports_queries and not search and self.SORT_FIELDS[sort_by]:
+            equals = {'user_id': user_id}
+            if tx_type:
+                equals['type'] = tx_type
+            return self.repository.find(equals=equals, order_by=self.SORT_FIELDS[sort_by],
+                                        descending=descending, limit=limit, offset=offset)
+        if sort_by == 'date' and not tx_type and not search:
+            with self._index_lock:
+                index = self._get_user_index()
+                if index is not None:
+                    # Đọc thẳng trên chỉ mục theo ngày, không cần tạo danh sách mới
+                    records = index.get(user_id, ([], []))[1]
+                    if not descending:
+                        return records[offset:end]
+                    total = len(records)
+                    stop = 0 if end is None else max(total - end, 0)
+                    return records[stop:max(total - offset, 0)][::-1]
+        return self._get_view(user_id, sort_by, descending, tx_type, search)[offset:end]
+
+    def get_transaction_position(self, user_id, transaction, sort_by='date', descending=True, tx_type=None, search=None):
+        """Vị trí của giao dịch trong kết quả get_transaction_page với cùng bộ lọc và cách sắp xếp
+
+        Dùng để chèn một giao dịch vừa ghi vào các trang đã tải đúng chỗ kho lưu trữ đặt nó
+        (kể cả thứ tự giữa các giao dịch trùng ngày).
+
+        Returns:
+            int: Vị trí tính từ 0, hoặc None nếu giao dịch không có trong kết quả
+                hoặc repository tự truy vấn (không xác định được mà không đọc hết kết quả)
+        """
+        if sort_by not in self.SORT_FIELDS:
+            raise ValueError(f"Không hỗ trợ sắp xếp theo: {sort_by}")
+        search = search.strip().casefold() if search else None
+        if self.repository.supports_queries and not search and self.SORT_FIELDS[sort_by]:
+            return None
+        tid = transaction.get('transaction_id')
+        with self._index_lock:
+            if sort_by == 'date' and not tx_type and not search:
+                index = self._get_user_index()
+                tx_date = normalize_datetime(transaction.get('date'))
+                if index is not None and tx_date is not None:
+                    dates, records = index.get(user_id, ([], []))
+                    for i in range(bisect_left(dates, tx_date), bisect_right(dates, tx_date)):
+                        if records[i].get('transaction_id') == tid:
+                            return len(records) - 1 - i if descending else i
+                    return None
+            view = self._get_view(user_id, sort_by, descending, tx_type, search)
+            for i, t in enumerate(view):
+                if t.get('transaction_id') == tid:
+                    return i
+        return None
+
     def get_transactions_in_range(self, start_date, end_date, user_id=None):
         """Lấy giao dịch trong khoảng thời gian
         
@@ -229,16 +539,15 @@ class TransactionManager:
         Returns:
             list: Danh sách giao dịch trong khoảng thời gian
         """
-        transactions = self.get_all_transactions()
-        
         logger.debug(f"Lấy giao dịch trong khoảng: start_date={start_date} (type: {type(start_date)}), end_date={end_date} (type: {type(end_date)}), user_id={user_id}")
         
         # Xử lý trường hợp start_date hoặc end_date là None
         if start_date is None or end_date is None:
             if user_id:
-                result = [t for t in transactions if t.get('user_id') == user_id]
+                result = self.get_transactions_by_user(user_id)
                 logger.debug(f"-> {len(result)} giao dịch (tất cả thời gian, đã lọc theo người dùng)")
                 return result
+            transactions = self.get_all_transactions()
             logger.debug(f"-> {len(transactions)} giao dịch (tất cả thời gian)")
             return transactions
 
@@ -255,9 +564,30 @@ class TransactionManager:
             
         logger.debug(f"Đã chuyển đổi: start_datetime={start_datetime}, end_datetime={end_datetime}")
 
+        if self.repository.supports_queries:
+            # Cột date trong SQLite lưu ISO naive nên so sánh chuỗi tương đương so sánh thời gian
+            result = self.repository.find(
+                equals={'user_id': user_id} if user_id else None, range_column='date',
+                start=start_datetime.replace(tzinfo=None).isoformat(),
+                end=end_datetime.replace(tzinfo=None).isoformat())
+            logger.debug(f"-> {len(result)} giao dịch trong khoảng {start_datetime} - {end_datetime} cho user_id={user_id} (SQL)")
+            return result
+
+        index = self._get_user_index() if user_id else None
+        if index is not None:
+            # Tìm nhị phân trên danh sách ngày đã sắp xếp của người dùng
+            start_key = start_datetime.replace(tzinfo=None)
+            end_key = end_datetime.replace(tzinfo=None)
+            dates, records = index.get(user_id, ([], []))
+            result = records[bisect_left(dates, start_key):bisect_right(dates, end_key)]
+            logger.debug(f"-> {len(result)} giao dịch trong khoảng {start_datetime} - {end_datetime} cho user_id={user_id} (chỉ mục)")
+            return result
+
         # Lọc theo user_id nếu được cung cấp
         if user_id:
-            transactions = [t for t in transactions if t.get('user_id') == user_id]
+            transactions = self.get_transactions_by_user(user_id)
+        else:
+            transactions = self.get_all_transactions()
 
         filtered_transactions = []
         for transaction in transactions:
@@ -297,6 +627,89 @@ class TransactionManager:
         logger.debug(f"-> {len(filtered_transactions)} giao dịch trong khoảng {start_datetime} - {end_datetime} cho user_id={user_id}")
         return filtered_transactions
     
+    @staticmethod
+    def _to_date(value):
+        return value.date() if isinstance(value, datetime.datetime) else value
+
+    @staticmethod
+    def build_periods(start_date, end_date, granularity):
+        """Tạo danh sách ngày bắt đầu của từng khoảng (bucket) trong [start_date, end_date]
+        
+        Args:
+            start_date, end_date: datetime.date giới hạn khoảng thời gian
+            granularity: 'day', 'week' (7 ngày tính từ start_date), 'month' (tháng dương lịch)
+                hoặc None (một khoảng duy nhất)
+            
+        Returns:
+            list: Danh sách datetime.date là ngày bắt đầu mỗi khoảng
+        """
+        if granularity == 'day':
+            return [start_date + datetime.timedelta(days=i) for i in range((end_date - start_date).days + 1)]
+        if granularity == 'week':
+            return [start_date + datetime.timedelta(days=i) for i in range(0, (end_date - start_date).days + 1, 7)]
+        if granularity == 'month':
+            periods = [start_date]
+            year, month = start_date.year, start_date.month
+            while True:
+                year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+                month_start = datetime.date(year, month, 1)
+                if month_start > end_date:
+                    return periods
+                periods.append(month_start)
+        return [start_date]
+
+    def aggregate(self, user_id, start_date, end_date, granularity=None, group_by='type'):
+        """Tổng hợp thu/chi theo từng khoảng thời gian trong một lần duyệt
+        
+        Args:
+            user_id: ID người dùng
+            start_date, end_date: Khoảng thời gian (datetime.date hoặc datetime.datetime)
+            granularity: 'day', 'week', 'month' hoặc None (xem build_periods)
+            group_by: 'type' hoặc 'category' (thêm tổng theo danh mục cho từng loại)
+            
+        Returns:
+            dict: {
+                'periods': [ngày bắt đầu mỗi khoảng],
+                'series': {'income': [tổng mỗi khoảng], 'expense': [...]},
+                'totals': {'income': tổng, 'expense': tổng},
+                'categories': {'income': {category_id: tổng}, 'expense': {...}} (khi group_by='category')
+            }
+        """
+        start_date, end_date = self._to_date(start_date), self._to_date(end_date)
+        periods = self.build_periods(start_date, end_date, granularity)
+        series = {}
+        categories = {'income': {}, 'expense': {}}
+
+        if user_id:
+            frame = self.get_frame(user_id)
+        else:
+            transactions = self.get_transactions_in_range(start_date, end_date)
+            dated = [(normalize_datetime(t.get('date')), t) for t in transactions]
+            frame = TransactionFrame(sorted((item for item in dated if item[0] is not None), key=lambda item: item[0]))
+        lo, hi = frame.span(start_date, end_date)
+        if granularity == 'day':
+            buckets = frame.days[lo:hi] - epoch_day(start_date)
+        elif granularity == 'week':
+            buckets = (frame.days[lo:hi] - epoch_day(start_date)) // 7
+        elif granularity == 'month':
+            buckets = frame.months[lo:hi] - month_code(start_date)
+        else:
+            buckets = np.zeros(hi - lo, dtype=np.int64)
+
+        amounts, types = frame.amounts[lo:hi], frame.types[lo:hi]
+        for tx_type, code in TYPE_CODES.items():
+            mask = types == code
+            sums = np.bincount(buckets[mask], weights=amounts[mask], minlength=len(periods))
+            series[tx_type] = sums[:len(periods)].tolist()
+        totals = frame.totals(start_date, end_date)
+        if group_by == 'category':
+            categories = {tx_type: frame.by_category(tx_type, start_date, end_date) for tx_type in TYPE_CODES}
+
+        result = {'periods': periods, 'series': series, 'totals': totals}
+        if group_by == 'category':
+            result['categories'] = categories
+        return result
+
     def get_total_expenses(self, user_id, category_id, year, month):
         """
         Tính toán tổng số tiền chi tiêu cho một người dùng, theo danh mục, năm và tháng nhất định.
@@ -310,6 +723,14 @@ class TransactionManager:
         Returns:
             float: Tổng số tiền chi tiêu
         """
+        if self.repository.supports_queries:
+            return self.repository.sum('amount', equals={
+                'user_id': user_id, 'category_id': category_id, 'type': 'expense', 'year': year, 'month': month})
+
+        rollup = self._get_expense_rollup()
+        if rollup is not None:
+            return rollup.get((user_id, category_id, year, month), 0)
+
         user_transactions = self.get_transactions_by_user(user_id)
         total_spent = 0
         for t in user_transactions:
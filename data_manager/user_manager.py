@@ -7,15 +7,17 @@ import logging
 import sys
 import random
 import string
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 # THêm đường dẫn gốc của package vào sys.path để import các module
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from utils.file_helper import (
-    load_json, save_json, generate_id,
+    generate_id, get_config_value,
     is_valid_email, is_valid_phone, is_strong_password # Import new validation functions
 )
+from data_manager.repository import create_repository
 
 # Thiết lập cấu hình logging
 logging.basicConfig(level=logging.INFO)
@@ -28,6 +30,12 @@ class UserManager: # Quản lý người dùng
         data_dir = os.path.join(package_dir, 'data')
         os.makedirs(data_dir, exist_ok=True)
         self.user_file = os.path.join(data_dir, user_file)
+        # Hệ số chi phí bcrypt (2^rounds vòng lặp), cấu hình trong config.json (security.password_salt_rounds)
+        self.password_rounds = int(get_config_value('security', 'password_salt_rounds', 12))
+        self.repository = create_repository('users', self.user_file)
+        # Chỉ mục băm trong bộ nhớ: user_id/username/email/phone (đã casefold) -> danh sách user
+        self._indexes = None
+        self._index_signature = None
         if not os.path.exists(self.user_file):
             self.save_users([])
             
@@ -49,25 +57,108 @@ class UserManager: # Quản lý người dùng
 
     def load_users(self):
         try:
-            users = load_json(self.user_file)
+            users = self.repository.load_all()
             logger.debug(f"Loaded {len(users)} users from {self.user_file}")
             return users
         except Exception as e:
             logger.error(f"Error loading users: {str(e)}")
             return []
 
-    def save_users(self, users):
+    def save_users(self, users, changes=None):
+        """Lưu danh sách users
+
+        Args:
+            changes: Các cặp (user_id, bản ghi mới hoặc None nếu đã xóa) để cập nhật chỉ mục tại chỗ;
+                None nghĩa là không rõ thay đổi, chỉ mục được dựng lại ở lần tra cứu kế tiếp
+        """
+        was_current = self._indexes is not None and self.repository.signature() == self._index_signature
         try:
-            save_json(self.user_file, users)
+            if not self.repository.save_all(users):
+                self._indexes = None
+                logger.error(f"Error saving users to {self.user_file}")
+                return False
+            if was_current and changes is not None and all(user_id for user_id, _ in changes):
+                for user_id, user in changes:
+                    self._index_replace(user_id, user)
+                self._index_signature = self.repository.signature()
+            else:
+                self._indexes = None
             logger.debug(f"Saved {len(users)} users to {self.user_file}")
             return True
         except Exception as e:
+            self._indexes = None
             logger.error(f"Error saving users: {str(e)}")
             return False
 
+    @staticmethod
+    def _fold(value):
+        """Chuẩn hóa khóa tra cứu: bỏ khoảng trắng hai đầu và casefold"""
+        return str(value).strip().casefold() if value else None
+
+    def _index_keys(self, user):
+        """Các khóa của user trong từng chỉ mục"""
+        keys = {
+            'user_id': {user.get('user_id'), user.get('id')},
+            'username': {self._fold(user.get('username'))},
+            'email': {self._fold(user.get('email'))},
+            'phone': {self._fold(user.get('phone'))},
+        }
+        return {name: {value for value in values if value} for name, values in keys.items()}
+
+    def _build_indexes(self, users):
+        """Dựng các chỉ mục băm user_id, username, email, phone từ danh sách users"""
+        indexes = {'user_id': {}, 'username': {}, 'email': {}, 'phone': {}}
+        for user in users:
+            for name, values in self._index_keys(user).items():
+                for value in values:
+                    indexes[name].setdefault(value, []).append(user)
+        self._indexes = indexes
+        self._index_signature = self.repository.signature()
+        return indexes
+
+    def _index_replace(self, user_id, user):
+        """Thay bản ghi của user_id trong chỉ mục bằng user (None để xóa), chỉ sửa các khóa liên quan"""
+        indexes = self._indexes
+        matches = indexes['user_id'].get(user_id)
+        old = matches[0] if matches else None
+        new = dict(user) if user is not None else None
+        old_keys = self._index_keys(old) if old is not None else {}
+        new_keys = self._index_keys(new) if new is not None else {}
+        for name, index in indexes.items():
+            before, after = old_keys.get(name, set()), new_keys.get(name, set())
+            for value in before:
+                bucket = index[value]
+                position = next(i for i, u in enumerate(bucket) if u is old)
+                if value in after:
+                    # Khóa không đổi: giữ nguyên vị trí để thứ tự tra cứu như khi dựng lại
+                    bucket[position] = new
+                else:
+                    del bucket[position]
+                    if not bucket:
+                        del index[value]
+            for value in after - before:
+                index.setdefault(value, []).append(new)
+
+    def _get_indexes(self):
+        """Lấy các chỉ mục, chỉ đọc lại users.json khi dữ liệu lưu trữ đã thay đổi"""
+        signature = self.repository.signature()
+        if self._indexes is None or signature != self._index_signature:
+            return self._build_indexes(self.load_users())
+        return self._indexes
+
+    def _lookup(self, index_name, value):
+        """Danh sách user có khóa value trong chỉ mục index_name"""
+        key = value if index_name == 'user_id' else self._fold(value)
+        if not key:
+            return []
+        return self._get_indexes()[index_name].get(key, [])
+
+    def _is_unique(self, index_name, value, user_id_to_exclude=None):
+        return all(user.get('user_id') == user_id_to_exclude for user in self._lookup(index_name, value))
+
     def hash_password(self, password):
         try:
-            return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+            return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=self.password_rounds)).decode('utf-8')
         except Exception as e:
             logger.error(f"Error hashing password: {str(e)}")
             raise ValueError("Error processing password")
@@ -84,37 +175,19 @@ class UserManager: # Quản lý người dùng
         """Kiểm tra xem email có duy nhất không, ngoại trừ user_id_to_exclude nếu có."""
         if not email: 
             return True
-        users = self.load_users()
-        for user in users:
-            if user.get('user_id') == user_id_to_exclude:
-                continue
-            if user.get('email') == email:
-                return False
-        return True
+        return self._is_unique('email', email, user_id_to_exclude)
 
     def is_phone_unique(self, phone, user_id_to_exclude=None):# Kiểm tra tính duy nhất của số điện thoại
         """Kiểm tra xem số điện thoại có duy nhất không, ngoại trừ user_id_to_exclude nếu có."""
         if not phone: # Nếu không có số điện thoại thì coi như duy nhất
             return True
-        users = self.load_users()
-        for user in users:
-            if user.get('user_id') == user_id_to_exclude:
-                continue
-            if user.get('phone') == phone:
-                return False
-        return True
+        return self._is_unique('phone', phone, user_id_to_exclude)
 
     def is_username_unique(self, username, user_id_to_exclude=None):
         """Kiểm tra xem username có duy nhất không, ngoại trừ user_id_to_exclude nếu có."""
         if not username:
             return True
-        users = self.load_users()
-        for user in users:
-            if user.get('user_id') == user_id_to_exclude:
-                continue
-            if user.get('username', '').lower() == username.lower():
-                return False
-        return True
+        return self._is_unique('username', username, user_id_to_exclude)
 
     def is_admin(self, user_id):
         """Kiểm tra xem user_id có phải là admin không"""
@@ -131,13 +204,10 @@ class UserManager: # Quản lý người dùng
             return None
             
         try:
-            users = self.load_users()
-            logger.debug(f"Searching for user '{username}' in {len(users)} users")
-            
-            for user in users:
-                if user['username'].lower() == username.lower():
-                    logger.debug(f"Found user: {user['username']}")
-                    return user
+            matches = self._lookup('username', username)
+            if matches:
+                logger.debug(f"Found user: {matches[0]['username']}")
+                return dict(matches[0])
                     
             logger.debug(f"User '{username}' not found")
             return None
@@ -150,11 +220,8 @@ class UserManager: # Quản lý người dùng
         if not email:
             return None
         try:
-            users = self.load_users()
-            for user in users:
-                if user.get('email', '').lower() == email.lower():
-                    return user
-            return None
+            matches = self._lookup('email', email)
+            return dict(matches[0]) if matches else None
         except Exception as e:
             logger.error(f"Error finding user by email: {str(e)}")
             return None
@@ -163,11 +230,8 @@ class UserManager: # Quản lý người dùng
         if not identifier:
             return None
         try:
-            users = self.load_users()
-            for user in users:
-                if user.get('email', '').lower() == identifier.lower() or user.get('username', '').lower() == identifier.lower():
-                    return user
-            return None
+            matches = self._lookup('email', identifier) or self._lookup('username', identifier)
+            return dict(matches[0]) if matches else None
         except Exception as e:
             logger.error(f"Error finding user by email/username: {str(e)}")
             return None
@@ -177,12 +241,9 @@ class UserManager: # Quản lý người dùng
         if not user_id:
             return None
         try:
-            users = self.load_users()
-            for user in users:
-                # Check for both 'id' and 'user_id' for compatibility
-                if user.get('id') == user_id or user.get('user_id') == user_id:
-                    return user
-            return None
+            # Chỉ mục user_id gồm cả khóa 'id' cũ để tương thích
+            matches = self._lookup('user_id', user_id)
+            return dict(matches[0]) if matches else None
         except Exception as e:
             logger.error(f"Error getting user by ID: {str(e)}")
             return None
@@ -218,8 +279,8 @@ class UserManager: # Quản lý người dùng
             for u in users:
                 if u.get('user_id') == user.get('user_id'):
                     u['last_login'] = datetime.now().isoformat()
+                    self.save_users(users, [(u['user_id'], u)])
                     break
-            self.save_users(users)
             
             logger.info(f"Successful login for user: {identifier}")
             return {"status": "success", "user": user}
@@ -237,14 +298,13 @@ class UserManager: # Quản lý người dùng
         code = ''.join(random.choices(string.digits, k=6))
         # Demo: ghi nhật ký, thực tế nên lưu vào DB và gửi email
         logging.info(f"[DEMO] Mã đặt lại mật khẩu cho {identifier}: {code}")
-        user['reset_code'] = code
-        user['reset_code_time'] = datetime.now().isoformat()
         users = self.load_users()
         for u in users:
             if u.get('user_id') == user.get('user_id'):
                 u['reset_code'] = code
-                u['reset_code_time'] = user['reset_code_time']
-        self.save_users(users)
+                u['reset_code_time'] = datetime.now().isoformat()
+                self.save_users(users, [(u['user_id'], u)])
+                break
         return {"status": "success", "message": "Đã gửi mã đặt lại mật khẩu (xem terminal demo)."}
 
     def reset_password_with_code(self, identifier, code, new_password):
@@ -255,15 +315,16 @@ class UserManager: # Quản lý người dùng
             return {"status": "error", "message": "Mã xác nhận không đúng."}
         if not is_strong_password(new_password):
             return {"status": "error", "message": "Mật khẩu mới không đủ mạnh."}
-        user['password'] = self.hash_password(new_password)
-        user['reset_code'] = None
-        user['reset_code_time'] = None
-        user['updated_at'] = datetime.now().isoformat()
+        password_hash = self.hash_password(new_password)
         users = self.load_users()
         for u in users:
             if u.get('user_id') == user.get('user_id'):
-                u.update(user)
-        self.save_users(users)
+                u['password'] = password_hash
+                u['reset_code'] = None
+                u['reset_code_time'] = None
+                u['updated_at'] = datetime.now().isoformat()
+                self.save_users(users, [(u['user_id'], u)])
+                break
         return {"status": "success", "message": "Đặt lại mật khẩu thành công."}
 
     def add_user(self, email, username, password, full_name="", phone="", date_of_birth="", address="", role="user"):
@@ -317,7 +378,7 @@ class UserManager: # Quản lý người dùng
             }
             
             users.append(user)
-            if self.save_users(users):
+            if self.save_users(users, [(user['user_id'], user)]):
                 logger.info(f"Added new user: {email}")
                 # Return success dictionary with user data
                 return {"status": "success", "user": user}
@@ -349,7 +410,7 @@ class UserManager: # Quản lý người dùng
             if not user_found:
                 return {"status": "error", "message": "Không tìm thấy người dùng."}
 
-            if self.save_users(users):
+            if self.save_users(users, [(user_id, users[i])]):
                 logger.info(f"Cập nhật hồ sơ thành công cho user ID: {user_id}")
                 # Trả về thông tin người dùng đã cập nhật
                 updated_user = self.get_user_by_id(user_id)
@@ -410,7 +471,7 @@ class UserManager: # Quản lý người dùng
                             
             if user_data_changed:
                 user_to_update['updated_at'] = datetime.now().isoformat()
-                if self.save_users(users):
+                if self.save_users(users, [(user_id, user_to_update)]):
                     logger.info(f"Updated user: {user_id}")
                     return True # Successfully updated
                 else:
@@ -437,7 +498,7 @@ class UserManager: # Quản lý người dùng
             for i, user in enumerate(users):
                 if user['user_id'] == user_id:
                     del users[i]
-                    if self.save_users(users):
+                    if self.save_users(users, [(user_id, None)]):
                         logger.info(f"Deleted user: {user_id}")
                         return True
                         
@@ -450,15 +511,15 @@ class UserManager: # Quản lý người dùng
     def toggle_user_lock(self, user_id, lock=True):
         try:
             users = self.load_users()
-            user_updated = False
+            user_updated = None
             for user in users:
                 if user['user_id'] == user_id:
                     user['is_active'] = not lock
                     user['updated_at'] = datetime.now().isoformat()
-                    user_updated = True
+                    user_updated = user
                     break
             
-            if user_updated and self.save_users(users):
+            if user_updated and self.save_users(users, [(user_id, user_updated)]):
                 logger.info(f"User {user_id} lock status set to {lock}")
                 return True
             logger.warning(f"User {user_id} not found or failed to update lock status.")
@@ -478,18 +539,18 @@ class UserManager: # Quản lý người dùng
                 return {"status": "error", "message": "Mật khẩu yếu. Phải gồm chữ hoa, thường, số và ký tự đặc biệt, ít nhất 8 ký tự."}
 
             users = self.load_users()
-            user_found = False
+            user_found = None
             for user in users:
                 if user['user_id'] == user_id:
                     user['password'] = self.hash_password(new_password)
                     user['updated_at'] = datetime.now().isoformat()
-                    user_found = True
+                    user_found = user
                     break
             
             if not user_found:
                 return {"status": "error", "message": "User not found."}
 
-            if self.save_users(users):
+            if self.save_users(users, [(user_id, user_found)]):
                 logger.info(f"Admin reset password for user: {user_id}")
                 return {"status": "success", "message": "Password reset successfully."}
             else:
@@ -506,7 +567,7 @@ class UserManager: # Quản lý người dùng
                     raise ValueError("Mật khẩu mới không đủ mạnh.")
                 user['password'] = self.hash_password(new_password)
                 user['updated_at'] = datetime.now().isoformat()
-                self.save_users(users)
+                self.save_users(users, [(user['user_id'], user)])
                 print("Đổi mật khẩu thành công.")
                 return True
         raise ValueError("Sai mật khẩu cũ hoặc người dùng không tồn tại.")
@@ -517,7 +578,7 @@ class UserManager: # Quản lý người dùng
             if user['username'] == username:
                 user['is_active'] = False
                 user['updated_at'] = datetime.now().isoformat()
-                self.save_users(users)
+                self.save_users(users, [(user['user_id'], user)])
                 print("Tài khoản đã được tắt.")
                 return True
         raise ValueError("Không tìm thấy người dùng để tắt.")
@@ -528,7 +589,7 @@ class UserManager: # Quản lý người dùng
             if user['username'] == username:
                 user['is_active'] = True
                 user['updated_at'] = datetime.now().isoformat()
-                self.save_users(users)
+                self.save_users(users, [(user['user_id'], user)])
                 print("Tài khoản đã được kích hoạt.")
                 return True
         raise ValueError("Không tìm thấy người dùng để kích hoạt.")
@@ -548,7 +609,7 @@ class UserManager: # Quản lý người dùng
                 if address is not None:
                     user['address'] = address
                 user['updated_at'] = datetime.now().isoformat()
-                self.save_users(users)
+                self.save_users(users, [(user['user_id'], user)])
                 print("Thông tin người dùng đã được cập nhật.")
                 return True
         raise ValueError("Không tìm thấy người dùng để cập nhật thông tin.")
@@ -575,22 +636,29 @@ class UserManager: # Quản lý người dùng
             if user['username'] == username:
                 user['avatar'] = avatar_path
                 user['updated_at'] = datetime.now().isoformat()
-                self.save_users(users)
+                self.save_users(users, [(user['user_id'], user)])
                 print("Ảnh đại diện đã được cập nhật.")
                 return True
         raise ValueError("Không tìm thấy người dùng để cập nhật ảnh đại diện.")
 
-    def reset_all_passwords(self, new_password="123456aA@"):
-        """Reset mật khẩu của tất cả users thành mật khẩu mặc định"""
+    def reset_all_passwords(self, new_password="123456aA@", max_workers=None):
+        """Reset mật khẩu của tất cả users thành mật khẩu mặc định
+
+        Mỗi user cần một hash (salt) riêng; bcrypt nhả GIL khi băm nên các hash được
+        tính song song trên nhiều lõi CPU.
+        """
         if not is_strong_password(new_password): # Use imported function
             raise ValueError("Mật khẩu mới không đủ mạnh")
             
         users = self.load_users()
         updated_count = 0
         
-        for user in users:
-            user['password'] = self.hash_password(new_password)
-            user['updated_at'] = datetime.now().isoformat()
+        with ThreadPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor:
+            hashes = list(executor.map(self.hash_password, [new_password] * len(users)))
+        now = datetime.now().isoformat()
+        for user, password_hash in zip(users, hashes):
+            user['password'] = password_hash
+            user['updated_at'] = now
             updated_count += 1
             
         self.save_users(users)
@@ -608,4 +676,43 @@ class UserManager: # Quản lý người dùng
                 "is_active": u.get("is_active", True)
             }
             for u in users
-        ]
\ No newline at end of file
+        ]
+
+def benchmark_password_hashing(count=8, rounds=None, max_workers=None):
+    """Đo thông lượng băm và kiểm tra mật khẩu (tuần tự và song song) với hệ số chi phí cho trước
+
+    Returns:
+        dict: Số thao tác mỗi giây cho từng trường hợp
+    """
+    import time
+    if rounds is None:
+        rounds = int(get_config_value('security', 'password_salt_rounds', 12))
+    password = b"Benchmark@123"
+
+    def hash_once(_):
+        return bcrypt.hashpw(password, bcrypt.gensalt(rounds=rounds))
+
+    results = {}
+    start = time.perf_counter()
+    hashes = [hash_once(i) for i in range(count)]
+    results['hash_serial'] = count / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor:
+        list(executor.map(hash_once, range(count)))
+    results['hash_parallel'] = count / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor:
+        list(executor.map(lambda h: bcrypt.checkpw(password, h), hashes))
+    results['login_parallel'] = count / (time.perf_counter() - start)
+    return results
+
+
+if __name__ == "__main__":
+    # Chạy: python -m data_manager.user_manager [số lần băm] [rounds]
+    args = sys.argv[1:]
+    count = int(args[0]) if args else 8
+    rounds = int(args[1]) if len(args) > 1 else None
+    for name, rate in benchmark_password_hashing(count, rounds).items():
+        print(f"{name}: {rate:.2f} ops/s")
@@ -1,7 +1,54 @@
-from PyQt5.QtWidgets import QWidget, QVBoxLayout, QLabel, QLineEdit, QPushButton, QTableWidget, QTableWidgetItem, QHeaderView, QHBoxLayout, QDateEdit
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QLabel, QLineEdit, QPushButton, QTableView, QHeaderView, QHBoxLayout, QDateEdit, QComboBox
 from PyQt5.QtCore import Qt, QDate
 from utils.ui_styles import TableStyleHelper, ButtonStyleHelper, UIStyles
 from utils.file_helper import format_datetime_display
+from utils.paged_table_model import PagedTableModel
+
+
+class AuditLogTableModel(PagedTableModel):
+    """Pages audit logs from AuditLogManager, newest first.
+
+    Filtering is done by AuditLogManager.get_logs_page and cells are formatted lazily in data().
+    """
+    HEADERS = ["Thời gian", "Người dùng", "Hành động"]
+
+    def __init__(self, audit_log_manager, parent=None):
+        super().__init__(parent)
+        self.audit_log_manager = audit_log_manager
+        self.filters = {}
+
+    def set_query(self, **filters):
+        """Filters are passed to AuditLogManager.get_logs_page (user_id, action, start_date, end_date)"""
+        self.filters = filters
+        self.reload()
+
+    def fetch_page(self, offset, limit):
+        return self.audit_log_manager.get_logs_page(offset=offset, limit=limit, **self.filters)
+
+    def total_count(self):
+        return self.audit_log_manager.count_logs(**self.filters)
+
+    def log_at(self, row):
+        return self.row_at(row)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self._rows):
+            return None
+        log = self._rows[index.row()]
+        if role == Qt.DisplayRole:
+            column = index.column()
+            if column == 0:
+                return format_datetime_display(log.get('timestamp', ''))
+            if column == 1:
+                return str(log.get('user_id') or '')
+            if column == 2:
+                return str(log.get('action', ''))
+        elif role == Qt.TextAlignmentRole:
+            return int(Qt.AlignLeft | Qt.AlignVCenter)
+        elif role == Qt.UserRole:
+            return log
+        return None
+
 
 class AdminAuditTab(QWidget):
     def __init__(self, audit_log_manager, parent=None):
@@ -46,6 +93,20 @@ class AdminAuditTab(QWidget):
         self.to_date.setFixedWidth(120)
         search_layout.addWidget(self.to_date)
         
+        # User filter
+        self.user_filter = QLineEdit()
+        self.user_filter.setPlaceholderText("ID người dùng")
+        self.user_filter.setFixedWidth(130)
+        self.user_filter.returnPressed.connect(self.search_logs)
+        search_layout.addWidget(self.user_filter)
+        
+        # Action filter (editable: other actions can be typed)
+        self.action_filter = QComboBox()
+        self.action_filter.setEditable(True)
+        self.action_filter.addItems(["Tất cả", "login", "logout"])
+        self.action_filter.setFixedWidth(130)
+        search_layout.addWidget(self.action_filter)
+        
         # Search button
         self.search_button = QPushButton("Tìm kiếm")
         self.search_button.setFixedWidth(140)
@@ -65,80 +126,57 @@ class AdminAuditTab(QWidget):
         search_layout.addStretch()
         layout.addLayout(search_layout)
         
-        # Table
-        self.audit_table = QTableWidget(0, 2)
+        # Table: rows are fetched page by page as the user scrolls
+        self.audit_model = AuditLogTableModel(self.audit_log_manager, self)
+        self.audit_table = QTableView()
+        self.audit_table.setModel(self.audit_model)
         TableStyleHelper.apply_common_table_style(self.audit_table)
-        self.audit_table.setHorizontalHeaderLabels(["Thời gian", "Hành động"])
         
-        # Áp dụng styling chung
-        TableStyleHelper.apply_common_table_style(self.audit_table)
-          # Cấu hình hiển thị bảng - cố định kích thước theo form
+        # Cấu hình hiển thị bảng - cố định kích thước theo form
         header = self.audit_table.horizontalHeader()
         header.setSectionResizeMode(0, QHeaderView.Interactive)  # Cho phép người dùng thay đổi kích thước cột thời gian
-        header.setSectionResizeMode(1, QHeaderView.Stretch)  # Hành động sẽ lấp đầy không gian còn lại
-        
-        # Đặt các thuộc tính khác
+        header.setSectionResizeMode(1, QHeaderView.Interactive)
+        header.setSectionResizeMode(2, QHeaderView.Stretch)  # Hành động sẽ lấp đầy không gian còn lại
         self.audit_table.setColumnWidth(0, 180)  # Đặt chiều rộng cố định cho cột thời gian
-        self.audit_table.verticalHeader().setVisible(False)  # Ẩn header dọc
-        self.audit_table.setAlternatingRowColors(True)  # Màu dòng xen kẽ
-        self.audit_table.horizontalHeader().setStretchLastSection(True)  # Đảm bảo cột cuối cùng kéo dài hết chiều rộng bảng
+        self.audit_table.setColumnWidth(1, 120)
+        
+        # Chiều cao dòng cố định: không phải đo lại từng dòng khi tải thêm trang
+        self.audit_table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.audit_table.verticalHeader().setDefaultSectionSize(30)
         self.audit_table.setHorizontalScrollBarPolicy(Qt.ScrollBarAsNeeded)  # Hiển thị thanh cuộn ngang khi cần
-          # Đặt bảng vào layout chính - sẽ theo kích thước của form
         layout.addWidget(self.audit_table)
         
+        self.count_label = QLabel()
+        self.count_label.setStyleSheet("color: #6b7280;")
+        layout.addWidget(self.count_label)
+        
         # Cấu hình layout chính
         self.setLayout(layout)
 
     def load_audit_log_table(self):
-        """Tải toàn bộ log history"""
-        logs = self.audit_log_manager.get_all_logs()
-        self._display_logs(logs)
+        """Tải log history (mọi bộ lọc được xóa), mới nhất trước"""
+        self.user_filter.clear()
+        self.action_filter.setCurrentIndex(0)
+        self.audit_model.set_query()
+        self.update_count_label()
 
     def search_logs(self):
-        """Tìm kiếm logs theo khoảng thời gian"""
-        from_date = self.from_date.date().toString("yyyy-MM-dd")
-        to_date = self.to_date.date().toString("yyyy-MM-dd")
-        
-        logs = self.audit_log_manager.get_logs_by_date_range(from_date, to_date)
-        self._display_logs(logs)
-
-    def _display_logs(self, logs):
-        """Hiển thị logs lên bảng"""
-        self.audit_table.setRowCount(0)
-        
-        # Hiển thị từ mới đến cũ nhất
-        for log in reversed(logs):
-            row = self.audit_table.rowCount()
-            self.audit_table.insertRow(row)
-            
-            # Cài đặt item thời gian
-            timestamp_fmt = self.format_datetime(log.get('timestamp', ''))
-            time_item = QTableWidgetItem(timestamp_fmt)
-            time_item.setTextAlignment(Qt.AlignLeft | Qt.AlignVCenter)
-            self.audit_table.setItem(row, 0, time_item)
-            
-            # Cài đặt item hành động
-            action_item = QTableWidgetItem(f"{log.get('action', '')} (user: {log.get('user_id', '')})") 
-            action_item.setTextAlignment(Qt.AlignLeft | Qt.AlignVCenter)
-            self.audit_table.setItem(row, 1, action_item)
-            
-            # Thiết lập chiều cao hàng
-            self.audit_table.setRowHeight(row, 30)
-        
-        # Tối ưu hóa kích thước bảng
-        self.audit_table.resizeColumnsToContents()
-          # Đảm bảo thời gian hiển thị đúng kích thước
-        self.audit_table.setColumnWidth(0, 180)
-            
-        # Đảm bảo dữ liệu được hiển thị đúng ngay khi mở tab
-        self.audit_table.horizontalHeader().setStretchLastSection(True)
-        
-        # Thiết lập chiều cao dòng cố định cho tất cả các dòng
-        for row in range(self.audit_table.rowCount()):
-            self.audit_table.setRowHeight(row, 30)
-        
-        # Cập nhật giao diện ngay lập tức
-        self.audit_table.update()
+        """Tìm kiếm logs theo khoảng thời gian, người dùng và hành động"""
+        filters = {
+            'start_date': self.from_date.date().toString("yyyy-MM-dd"),
+            'end_date': self.to_date.date().toString("yyyy-MM-dd"),
+        }
+        user_id = self.user_filter.text().strip()
+        if user_id:
+            filters['user_id'] = user_id
+        action = self.action_filter.currentText().strip()
+        if action and action != "Tất cả":
+            filters['action'] = action
+        self.audit_model.set_query(**filters)
+        self.update_count_label()
+
+    def update_count_label(self):
+        self.count_label.setText(f"{self.audit_model.total_count():,} bản ghi")
 
     def format_datetime(self, dt_str):
         return format_datetime_display(dt_str)    # Phương thức xử lý sự kiện hiển thị để đảm bảo bảng hiển thị đúng theo form
@@ -148,4 +186,3 @@ class AdminAuditTab(QWidget):
         # Đảm bảo kích thước cột và form hiển thị đúng
         self.audit_table.setColumnWidth(0, 180)
         self.audit_table.horizontalHeader().setStretchLastSection(True)
-        self.audit_table.update()
@@ -116,16 +116,8 @@ class AdminNotifyTab(QWidget):
             return
         
         try:
-            # Lấy user_id từ user hiện tại nếu có
-            current_user = None
-            if self.user_manager:
-                current_user = self.user_manager.get_current_user()
-                user_id = current_user.get('id') or current_user.get('user_id') if current_user else None
-            else:
-                user_id = None
-                
-            # Gửi thông báo với user_id
-            self.notification_manager.add_notification(title, content, notify_type, user_id=user_id)
+            # Gửi thông báo chung: lưu một lần, mỗi người dùng tự theo dõi trạng thái đã đọc
+            self.notification_manager.broadcast_notification(title, content, notify_type)
             QMessageBox.information(self, 'Thành công', 'Đã gửi thông báo!')
             self.load_notifications_table()
             self.clear_form()  # Clear form after successful addition
@@ -9,16 +9,10 @@ from PyQt5.QtWidgets import (QComboBox, QFrame, QGroupBox, QHBoxLayout,
                              QTableWidgetItem, QVBoxLayout, QWidget)
 
 from utils.ui_styles import TableStyleHelper
+from utils.lazy_modules import figure_classes, matplotlib_available
 
-# Conditional import for Matplotlib
-try:
-    import matplotlib
-    matplotlib.use('Qt5Agg')
-    from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-    from matplotlib.figure import Figure
-    MATPLOTLIB_AVAILABLE = True
-except ImportError:
-    MATPLOTLIB_AVAILABLE = False
+# Matplotlib is optional here and only imported when the chart is built
+MATPLOTLIB_AVAILABLE = matplotlib_available()
 
 
 class AdminOverviewTab(QWidget):
@@ -103,6 +97,7 @@ class AdminOverviewTab(QWidget):
         
         # --- Matplotlib Canvas ---
         if MATPLOTLIB_AVAILABLE:
+            Figure, FigureCanvas = figure_classes()
             self.figure = Figure(figsize=(5, 4), dpi=100)
             self.figure.patch.set_facecolor('none')  # Transparent background
             self.canvas = FigureCanvas(self.figure)
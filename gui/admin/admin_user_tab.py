@@ -73,22 +73,26 @@ class AdminUserTab(QWidget):
         self.btn_lock = QPushButton("Khóa tài khoản")
         self.btn_unlock = QPushButton("Mở khóa tài khoản")
         self.btn_reset_pw = QPushButton("Đặt lại mật khẩu")
+        self.btn_export_reports = QPushButton("Xuất báo cáo tháng")
         
         # Áp dụng styling chung cho buttons
         ButtonStyleHelper.style_primary_button(self.btn_view_detail)
         ButtonStyleHelper.style_danger_button(self.btn_lock)
         ButtonStyleHelper.style_success_button(self.btn_unlock)
         ButtonStyleHelper.style_normal_button(self.btn_reset_pw)
+        ButtonStyleHelper.style_normal_button(self.btn_export_reports)
         
         btn_layout.addWidget(self.btn_view_detail)
         btn_layout.addWidget(self.btn_lock)
         btn_layout.addWidget(self.btn_unlock)
         btn_layout.addWidget(self.btn_reset_pw)
+        btn_layout.addWidget(self.btn_export_reports)
         layout.addLayout(btn_layout)
         self.btn_view_detail.clicked.connect(self.view_user_detail)
         self.btn_lock.clicked.connect(self.lock_user)
         self.btn_unlock.clicked.connect(self.unlock_user)
         self.btn_reset_pw.clicked.connect(self.reset_user_password)
+        self.btn_export_reports.clicked.connect(self.export_monthly_reports)
         self.user_search_input.returnPressed.connect(self.search_user)
           # Initially disable buttons until selection is made
         self.btn_view_detail.setEnabled(False)
@@ -292,6 +296,32 @@ class AdminUserTab(QWidget):
             QMessageBox.information(self, 'Cấp lại mật khẩu', f"Mật khẩu mới cho {info}: {new_password}\nĐã gửi thông báo cho người dùng.")
         else:
             QMessageBox.warning(self, 'Lỗi', result.get('message', 'Không thể đặt lại mật khẩu!'))    
+
+    def export_monthly_reports(self):
+        """Xuất báo cáo tháng hiện tại của mọi người dùng vào một file PDF (chạy ở tiến trình riêng)"""
+        from PyQt5.QtWidgets import QFileDialog
+        from gui.user.user_report_tab import start_report_export
+        from utils.report_export import period_reports
+        users = [(u['user_id'], u.get('full_name') or u.get('username') or u['user_id'])
+                 for u in self.user_manager.load_users()
+                 if u.get('role', 'user') == 'user' and u.get('user_id')]
+        if not users:
+            QMessageBox.information(self, 'Xuất báo cáo', 'Không có người dùng nào để xuất báo cáo.')
+            return
+        today = QDate.currentDate()
+        file_path, _ = QFileDialog.getSaveFileName(
+            self, 'Lưu báo cáo PDF', f'bao_cao_{today.year()}_{today.month():02d}.pdf', 'PDF Files (*.pdf)')
+        if not file_path:
+            return
+        if not file_path.endswith('.pdf'):
+            file_path += '.pdf'
+        job = {
+            'format': 'pdf',
+            'path': file_path,
+            'reports': period_reports(users, 'month', today.year(), today.month()),
+        }
+        self.export_task = start_report_export(self, job, title='Xuất báo cáo người dùng')
+
     def on_item_clicked(self, item):
         """Handle item click to ensure selection is visible"""
         if item:
@@ -9,6 +9,7 @@ import logging
 try:
     from data_manager.user_manager import UserManager
     from utils.file_helper import get_asset_path
+    from utils.background_task import run_in_background, password_pool
 except Exception as e:
     import traceback
     import logging
@@ -184,21 +185,36 @@ class LoginForm(QDialog):
             QMessageBox.warning(self, "Thiếu thông tin", "Vui lòng nhập email hoặc tên đăng nhập và mật khẩu")
             return
             
-        try:
-            result = self.user_manager.authenticate_user(identifier, password)
-            
-            if result.get("status") == "success":
-                user = result["user"]
-                self.user_manager.set_current_user(user["user_id"])
-                self.login_success.emit(user["user_id"])
-                self.accept()
-            else:
-                QMessageBox.critical(self, "Đăng nhập thất bại", result.get("message", "Email/tên đăng nhập hoặc mật khẩu không đúng"))        
-        except Exception as e:
-            import traceback
-            logging.error(f'[ERROR] Error during authentication: {e}')
-            traceback.print_exc()
-            QMessageBox.critical(self, "Lỗi", "Có lỗi xảy ra trong quá trình đăng nhập")
+        if not self.login_button.isEnabled():
+            return # Đang xác thực, bỏ qua lần bấm lặp lại
+
+        # bcrypt chạy trên password_pool để giao diện không bị treo trong lúc băm
+        self.set_login_busy(True)
+        run_in_background(self.user_manager.authenticate_user, identifier, password,
+                          on_finished=self.on_login_result,
+                          on_failed=self.on_login_error,
+                          pool=password_pool)
+
+    def set_login_busy(self, busy):
+        self.login_button.setEnabled(not busy)
+        self.login_button.setText("Đang đăng nhập..." if busy else "Đăng nhập")
+        self.id_input.setEnabled(not busy)
+        self.password_input.setEnabled(not busy)
+
+    def on_login_result(self, result):
+        self.set_login_busy(False)
+        if result.get("status") == "success":
+            user = result["user"]
+            self.user_manager.set_current_user(user["user_id"])
+            self.login_success.emit(user["user_id"])
+            self.accept()
+        else:
+            QMessageBox.critical(self, "Đăng nhập thất bại", result.get("message", "Email/tên đăng nhập hoặc mật khẩu không đúng"))
+
+    def on_login_error(self, message):
+        self.set_login_busy(False)
+        logging.error(f'[ERROR] Error during authentication: {message}')
+        QMessageBox.critical(self, "Lỗi", "Có lỗi xảy ra trong quá trình đăng nhập")
             
     def keyPressEvent(self, event):
         if event.key() in (Qt.Key_Return, Qt.Key_Enter):
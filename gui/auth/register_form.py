@@ -5,6 +5,7 @@ from PyQt5.QtGui import QIcon, QPixmap
 import os
 from data_manager.user_manager import UserManager
 from utils.file_helper import get_asset_path
+from utils.background_task import run_in_background, password_pool
 
 
 class RegisterForm(QDialog):
@@ -300,6 +301,7 @@ class RegisterForm(QDialog):
             QPushButton:pressed { background-color: #1256A1; }
         """)
         register_btn.clicked.connect(self.register)
+        self.register_btn = register_btn
         card_layout.addWidget(register_btn)
 
         # Login link
@@ -352,14 +354,21 @@ class RegisterForm(QDialog):
         if not is_valid:
             return
 
-        # Call to UserManager
-        result = self.user_manager.add_user(
+        # Call to UserManager (bcrypt chạy trên password_pool, không chặn giao diện)
+        self.register_btn.setEnabled(False)
+        run_in_background(
+            self.user_manager.add_user,
             email=self.email_edit.text().strip(),
             username=self.username_edit.text().strip(),
             password=self.password_edit.text(),
-            full_name=self.fullname_edit.text().strip()
+            full_name=self.fullname_edit.text().strip(),
+            on_finished=self.on_register_result,
+            on_failed=lambda message: self.on_register_result({"status": "error", "message": message}),
+            pool=password_pool
         )
 
+    def on_register_result(self, result):
+        self.register_btn.setEnabled(True)
         if result.get("status") == "success":
             QMessageBox.information(
                 self,
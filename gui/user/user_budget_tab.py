@@ -7,9 +7,7 @@ from PyQt5.QtGui import QFont, QIcon, QColor, QPalette
 from PyQt5.QtCore import Qt, pyqtSignal, QDate
 import datetime
 import json
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-from matplotlib.figure import Figure
-import matplotlib.pyplot as plt
+from utils.lazy_modules import figure_classes
 import logging # Added for logging errors
 
 class EditBudgetDialog(QDialog):
@@ -243,6 +241,7 @@ class UserBudgetTab(QWidget):
         chart_title_label.setStyleSheet("color: #334155; margin-top: 15px;")
         left_layout.addWidget(chart_title_label)
 
+        Figure, FigureCanvas = figure_classes() # matplotlib is imported here on first use
         self.figure = Figure(figsize=(5, 4), dpi=100) # Adjust size as needed
         self.canvas = FigureCanvas(self.figure)
         self.canvas.setStyleSheet("border-radius: 6px;")
@@ -392,73 +391,105 @@ class UserBudgetTab(QWidget):
 
         for row, budget in enumerate(self.budgets_data):
             self.budget_table.insertRow(row)
-            
-            budget_id = budget.get('id', '')            # Attempt to get category name from category_id for more robustness
-            category_id = budget.get('category_id')
-            category_name = budget.get('category', 'N/A') # Fallback to stored name
-            if category_id:
-                cat_obj = self.category_manager.get_category_by_id(category_id)
-                if cat_obj:
-                    category_name = cat_obj.get('name', category_name)
-            
-            limit = budget.get('limit', 0)
-           
-            remaining = budget.get('current_amount', 0)  # remaining balance
-            spent = limit - remaining  # spent = limit - remaining
-            
-            # Đảm bảo chi tiêu không phải là số âm (trong trường hợp dữ liệu không nhất quán)
-            spent = max(0, spent)
-            # Clamp remaining so it cannot be less than 0 for display
-            display_remaining = max(0, remaining)
+            self.set_budget_row(row, budget)
+
+    def set_budget_row(self, row, budget):
+        """Fill (or refill) one table row from a budget record"""
+        budget_id = budget.get('id', '')            # Attempt to get category name from category_id for more robustness
+        category_id = budget.get('category_id')
+        category_name = budget.get('category', 'N/A') # Fallback to stored name
+        if category_id:
+            cat_obj = self.category_manager.get_category_by_id(category_id)
+            if cat_obj:
+                category_name = cat_obj.get('name', category_name)
+        
+        limit = budget.get('limit', 0)
+       
+        remaining = budget.get('current_amount', 0)  # remaining balance
+        spent = limit - remaining  # spent = limit - remaining
+        
+        # Đảm bảo chi tiêu không phải là số âm (trong trường hợp dữ liệu không nhất quán)
+        spent = max(0, spent)
+        # Clamp remaining so it cannot be less than 0 for display
+        display_remaining = max(0, remaining)
 
-            self.budget_table.setItem(row, 0, QTableWidgetItem(str(budget_id)))
-            self.budget_table.setItem(row, 1, QTableWidgetItem(category_name))
-            
-            limit_item = QTableWidgetItem(f"{limit:,.0f} đ")
-            limit_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-            self.budget_table.setItem(row, 2, limit_item)
-
-            # Display spent as a positive number
-            spent_item = QTableWidgetItem(f"{spent:,.0f} đ")
-            spent_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-            self.budget_table.setItem(row, 3, spent_item)
-
-            remaining_item = QTableWidgetItem(f"{display_remaining:,.0f} đ")
-            remaining_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-            if remaining < 0:
-                remaining_item.setForeground(QColor("red"))
-            else:
-                remaining_item.setForeground(QColor("green"))
-            self.budget_table.setItem(row, 4, remaining_item)            # Progress Bar
-            progress_bar = QProgressBar()
-            progress_bar.setMinimum(0)
-            progress_bar.setMaximum(100)
-            # Calculate percentage based on spent amount
-            percentage = int((spent / limit) * 100) if limit > 0 else 0
-            percentage = min(max(percentage, 0), 100) # Clamp về 100% nếu vượt
-            progress_bar.setValue(percentage)
-            
-            progress_bar_style_sheet = """
-                QProgressBar {
-                    border: 1px solid #e5e7eb;
-                    border-radius: 5px;
-                    text-align: center;
-                    height: 20px;
-                }
-                QProgressBar::chunk {
-                    background-color: %s;
-                    border-radius: 4px;
-                }
-            """
-            if percentage >= 90:
-                progress_bar.setStyleSheet(progress_bar_style_sheet % "#ef4444") # Red
-            elif percentage >= 75:
-                progress_bar.setStyleSheet(progress_bar_style_sheet % "#f97316") # Orange
-            else:
-                progress_bar.setStyleSheet(progress_bar_style_sheet % "#10b981") # Green
-            self.budget_table.setCellWidget(row, 5, progress_bar)
-            
-            self.budget_table.item(row, 0).setData(Qt.UserRole, budget)
+        self.budget_table.setItem(row, 0, QTableWidgetItem(str(budget_id)))
+        self.budget_table.setItem(row, 1, QTableWidgetItem(category_name))
+        
+        limit_item = QTableWidgetItem(f"{limit:,.0f} đ")
+        limit_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+        self.budget_table.setItem(row, 2, limit_item)
+
+        # Display spent as a positive number
+        spent_item = QTableWidgetItem(f"{spent:,.0f} đ")
+        spent_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+        self.budget_table.setItem(row, 3, spent_item)
+
+        remaining_item = QTableWidgetItem(f"{display_remaining:,.0f} đ")
+        remaining_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+        if remaining < 0:
+            remaining_item.setForeground(QColor("red"))
+        else:
+            remaining_item.setForeground(QColor("green"))
+        self.budget_table.setItem(row, 4, remaining_item)            # Progress Bar
+        progress_bar = QProgressBar()
+        progress_bar.setMinimum(0)
+        progress_bar.setMaximum(100)
+        # Calculate percentage based on spent amount
+        percentage = int((spent / limit) * 100) if limit > 0 else 0
+        percentage = min(max(percentage, 0), 100) # Clamp về 100% nếu vượt
+        progress_bar.setValue(percentage)
+        
+        progress_bar_style_sheet = """
+            QProgressBar {
+                border: 1px solid #e5e7eb;
+                border-radius: 5px;
+                text-align: center;
+                height: 20px;
+            }
+            QProgressBar::chunk {
+                background-color: %s;
+                border-radius: 4px;
+            }
+        """
+        if percentage >= 90:
+            progress_bar.setStyleSheet(progress_bar_style_sheet % "#ef4444") # Red
+        elif percentage >= 75:
+            progress_bar.setStyleSheet(progress_bar_style_sheet % "#f97316") # Orange
+        else:
+            progress_bar.setStyleSheet(progress_bar_style_sheet % "#10b981") # Green
+        self.budget_table.setCellWidget(row, 5, progress_bar)
+        
+        self.budget_table.item(row, 0).setData(Qt.UserRole, budget)
+
+    def apply_changes(self, events):
+        """Patch affected rows and the chart from budget ChangeEvents (see UserDashboard)"""
+        now = datetime.datetime.now()
+
+        def shown(b):
+            return (b is not None and b.get('user_id') == self.current_user_id
+                    and b.get('year') == now.year and b.get('month') == now.month)
+
+        changed = False
+        for event in events:
+            if event.entity != 'budget' or not (shown(event.old) or shown(event.record)):
+                continue
+            budget_id = (event.record or event.old).get('id')
+            row = next((i for i, b in enumerate(self.budgets_data) if b.get('id') == budget_id), None)
+            if row is not None and not shown(event.record):
+                del self.budgets_data[row]
+                self.budget_table.removeRow(row)
+            elif row is not None:
+                self.budgets_data[row] = event.record
+                self.set_budget_row(row, event.record)
+            elif shown(event.record):
+                row = len(self.budgets_data)
+                self.budgets_data.append(event.record)
+                self.budget_table.insertRow(row)
+                self.set_budget_row(row, event.record)
+            changed = True
+        if changed:
+            self.update_budget_chart(self.budgets_data)
 
 
     def clear_budget_form(self):
@@ -540,7 +571,7 @@ class UserBudgetTab(QWidget):
             if success:
                 QMessageBox.information(self, "Thành công", f"Đã {operation} ngân sách thành công!")
                 self.clear_budget_form()
-                self.load_budgets_and_categories() # Reload table and chart
+                # Table and chart are patched from the change event (apply_changes)
                 self.budget_changed.emit()
             else:
                 QMessageBox.warning(self, "Lỗi", f"Không thể {operation} ngân sách. Có thể ngân sách cho danh mục và tháng này đã tồn tại (nếu thêm mới) hoặc có lỗi xảy ra.")
@@ -590,7 +621,7 @@ class UserBudgetTab(QWidget):
                     success = self.budget_manager.update_budget(updated_data['id'], updated_data)
                     if success:
                         QMessageBox.information(self, "Thành công", "Đã cập nhật ngân sách.")
-                        self.load_budgets_and_categories()
+                        # Table and chart are patched from the change event (apply_changes)
                         self.budget_changed.emit()
                     else:
                         QMessageBox.warning(self, "Lỗi", "Không thể cập nhật ngân sách. Kiểm tra xem có ID ngân sách hợp lệ không.")
@@ -625,7 +656,7 @@ class UserBudgetTab(QWidget):
                 success = self.budget_manager.delete_budget(budget_id)
                 if success:
                     QMessageBox.information(self, "Thành công", f"Đã xóa ngân sách cho '{budget_category}'.")
-                    self.load_budgets_and_categories() # Reload table and chart
+                    # Table and chart are patched from the change event (apply_changes)
                     self.budget_changed.emit()
                 else:
                     QMessageBox.warning(self, "Lỗi", f"Không thể xóa ngân sách cho '{budget_category}'. Ngân sách không tồn tại.")
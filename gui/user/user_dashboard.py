@@ -5,19 +5,15 @@ import logging
 from base.base_dashboard import BaseDashboard
 from utils.ui_styles import TableStyleHelper, ButtonStyleHelper, UIStyles
 from utils.quick_actions import add_quick_actions_to_widget
-import matplotlib
-matplotlib.use('Agg')
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-from matplotlib.figure import Figure
-import matplotlib.pyplot as plt
+from utils.background_task import run_in_background
 import datetime
 import json
 from data_manager.budget_manager import BudgetManager
 from data_manager.notification_manager import NotificationManager
 import logging
 
-# Impo rt the new transaction tab
-from gui.user.user_transaction_tab import UserTransactionTab
+# Module của các tab được import trong create_tab khi dùng lần đầu; matplotlib chỉ được
+# tải bởi các tab vẽ biểu đồ (xem utils.lazy_modules)
 
 class UserDashboard(BaseDashboard):
     
@@ -41,6 +37,17 @@ class UserDashboard(BaseDashboard):
         if hasattr(self.notification_manager, 'notification_added'):
             self.notification_manager.notification_added.connect(self.handle_new_notification)
 
+        # Làm mới từng phần: các manager phát ChangeEvent sau mỗi lần ghi. Sự kiện được gom lại
+        # và phát một lần mỗi vòng lặp sự kiện, nên một lần sửa (sự kiện giao dịch + ngân sách)
+        # chỉ cập nhật mỗi tab đã dựng một lần (xem flush_data_changes).
+        self.pending_changes = []
+        self.change_timer = QTimer(self)
+        self.change_timer.setSingleShot(True)
+        self.change_timer.setInterval(0)
+        self.change_timer.timeout.connect(self.flush_data_changes)
+        self.transaction_manager.events.subscribe('transaction', self.on_data_changed)
+        self.budget_manager.events.subscribe('budget', self.on_data_changed)
+
         # BaseDashboard.init_ui() should have been called by super().__init__()
         # self.current_user will be set by set_current_user()        # self.setup_user_content() will be called by set_current_user()        # Ensure content_stack exists (usually created in BaseDashboard.init_ui)
         if not hasattr(self, 'content_stack'):
@@ -65,36 +72,104 @@ class UserDashboard(BaseDashboard):
             ("Hồ sơ", "users_icon.png"),
         ]
     
+    # Thuộc tính lưu từng tab theo thứ tự get_navigation_items()
+    TAB_ATTRIBUTES = [
+        'overview_tab', 'transaction_tab', 'budget_tab', 'category_tab',
+        'report_tab', 'notifications_tab', 'settings_tab', 'profile_tab',
+    ]
+
     def setup_user_content(self):
-        """Setup user-specific content in the stacked widget"""
+        """Dựng nội dung riêng của người dùng trong content_stack
+
+        Các tab chưa được dựng ở đây: mỗi vị trí giữ một nhãn tạm, tab thật được dựng khi
+        chuyển tới lần đầu (xem ensure_tab). Dữ liệu người dùng được đọc trước trên luồng
+        QThreadPool (prefetch_user_data) để cửa sổ hiện ra ngay, không chờ đọc file;
+        sau đó hàm khởi tạo của tab dùng dữ liệu đã có sẵn trong bộ nhớ đệm.
+        """
         try:
-            from gui.user.user_overview_tab import UserOverviewTab
-            from gui.user.user_transaction_tab import UserTransactionTab 
-            from gui.user.user_budget_tab import UserBudgetTab
-            from gui.user.user_category_tab import UserCategoryTab
-            from gui.user.user_report_tab import UserReport
-            from gui.user.user_notifications_tab import NotificationCenter 
-            from gui.user.user_settings_tab import UserSettings
-            from gui.user.user_profile_tab import UserProfileTab
-            
             user_id = None
             # self.current_user should be set by set_current_user via super().set_current_user()
             if hasattr(self, 'current_user') and self.current_user:
                 user_id = self.current_user.get('id') or self.current_user.get('user_id')
+
+            # Clear existing widgets, to prevent using old data
+            while self.content_stack.count():
+                widget = self.content_stack.widget(0)
+                self.content_stack.removeWidget(widget)
+                widget.deleteLater()
+            for attribute in self.TAB_ATTRIBUTES:
+                setattr(self, attribute, None)
+            self.data_loaded = False
+            # Tab và thao tác nhanh được yêu cầu trong lúc đọc trước, on_user_data_loaded sẽ thực hiện
+            self.pending_tab_index = None
+            self.pending_action = None
+
             if not user_id:
                 logging.error("UserDashboard.setup_user_content - user_id is not available. Cannot create tabs.")
-                # Clear existing widgets if any, to prevent using old data
-                if hasattr(self, 'content_stack'):
-                    while self.content_stack.count():
-                        widget = self.content_stack.widget(0)
-                        self.content_stack.removeWidget(widget)
-                        widget.deleteLater()
                 return
 
             logging.debug(f"UserDashboard.setup_user_content using user_id={user_id} for tabs")
+            self.content_user_id = user_id
+            for _ in self.TAB_ATTRIBUTES:
+                placeholder = QLabel("Đang tải dữ liệu...")
+                placeholder.setAlignment(Qt.AlignCenter)
+                placeholder.setStyleSheet("color: #64748b; font-size: 15px;")
+                self.content_stack.addWidget(placeholder)
+
+            run_in_background(
+                self.prefetch_user_data, user_id,
+                on_finished=lambda result, uid=user_id: self.on_user_data_loaded(uid, result),
+                on_failed=lambda message, uid=user_id: self.on_user_data_loaded(uid, {'error': message}))
+            
+            # Setup Quick Actions
+            self.setup_quick_actions()
             
-            # Create tabs (ensure instantiation order doesn't strictly matter here, only addWidget order)
-            self.overview_tab = UserOverviewTab(
+        except Exception as e:
+            logging.error(f"Error setting up user content: {e}")
+            import traceback
+            traceback.print_exc()
+
+    def prefetch_user_data(self, user_id):
+        """Đọc trước dữ liệu của người dùng (chạy ở luồng nền, không chạm vào widget)
+
+        Returns:
+            dict: Số bản ghi đã nạp cho từng loại dữ liệu
+        """
+        transactions = self.transaction_manager.get_transactions_by_user(user_id)
+        self.transaction_manager.get_frame(user_id)
+        # Dựng chỉ mục danh mục; không dùng get_all_categories vì hàm đó gán lại self.categories
+        categories = self.category_manager._get_category_index()
+        budgets = self.budget_manager.get_budgets_by_user(user_id)
+        notifications = self.notification_manager.get_inbox(user_id) # Dựng chỉ mục hộp thư
+        return {
+            'transactions': len(transactions),
+            'categories': len(categories),
+            'budgets': len(budgets),
+            'notifications': len(notifications),
+        }
+
+    def on_user_data_loaded(self, user_id, result):
+        """Nhận kết quả đọc trước dữ liệu (luồng giao diện) và dựng tab đang hiển thị"""
+        if user_id != getattr(self, 'content_user_id', None):
+            return # Người dùng đã thay đổi trong lúc đang tải
+        if 'error' in result:
+            logging.error(f"UserDashboard: Prefetch failed, tabs will load data themselves: {result['error']}")
+        else:
+            logging.debug(f"UserDashboard: Prefetched user data {result}")
+        self.data_loaded = True
+        index = self.pending_tab_index
+        self.pending_tab_index = None
+        self.on_tab_changed(self.content_stack.currentIndex() if index is None else index)
+        action, self.pending_action = self.pending_action, None
+        if action:
+            action()
+
+    def create_tab(self, index):
+        """Tạo widget của tab tại vị trí index (theo thứ tự get_navigation_items())"""
+        user_id = self.content_user_id
+        if index == 0:
+            from gui.user.user_overview_tab import UserOverviewTab
+            return UserOverviewTab(
                 user_manager=self.user_manager, 
                 transaction_manager=self.transaction_manager, 
                 category_manager=self.category_manager, 
@@ -102,8 +177,9 @@ class UserDashboard(BaseDashboard):
                 budget_manager=self.budget_manager, 
                 notification_manager=self.notification_manager
             )
-            
-            self.transaction_tab = UserTransactionTab(
+        if index == 1:
+            from gui.user.user_transaction_tab import UserTransactionTab
+            tab = UserTransactionTab(
                 user_manager=self.user_manager,
                 transaction_manager=self.transaction_manager,
                 category_manager=self.category_manager,
@@ -111,9 +187,10 @@ class UserDashboard(BaseDashboard):
                 budget_manager=self.budget_manager,
                 notification_manager=self.notification_manager
             )
-            self.transaction_tab.transaction_added_or_updated.connect(self.refresh_overview_and_related_tabs)
-
-            self.budget_tab = UserBudgetTab( # Corrected class name
+            return tab
+        if index == 2:
+            from gui.user.user_budget_tab import UserBudgetTab
+            tab = UserBudgetTab( # Corrected class name
                 current_user_id=user_id,  # Pass user_id directly
                 user_manager=self.user_manager, 
                 transaction_manager=self.transaction_manager, 
@@ -122,14 +199,18 @@ class UserDashboard(BaseDashboard):
                 budget_manager=self.budget_manager,
                 notification_manager=self.notification_manager
             )
-            if hasattr(self.budget_tab, 'budget_changed'): # Connect signal if it exists
-                self.budget_tab.budget_changed.connect(self.refresh_overview_and_related_tabs) # Or a more specific handler
-
-            self.category_tab = UserCategoryTab(self.user_manager, self.category_manager)
-            self.report_tab = UserReport(self.user_manager, self.transaction_manager, self.category_manager)
-            self.notifications_tab = NotificationCenter(self.user_manager, self.notification_manager)
-            
-            from data_manager.user_manager import UserManager
+            return tab
+        if index == 3:
+            from gui.user.user_category_tab import UserCategoryTab
+            return UserCategoryTab(self.user_manager, self.category_manager)
+        if index == 4:
+            from gui.user.user_report_tab import UserReport
+            return UserReport(self.user_manager, self.transaction_manager, self.category_manager)
+        if index == 5:
+            from gui.user.user_notifications_tab import NotificationCenter 
+            return NotificationCenter(self.user_manager, self.notification_manager)
+        if index == 6:
+            from gui.user.user_settings_tab import UserSettings
             class DummySettingsManager:
                 def load_settings(self):
                     return {}
@@ -137,39 +218,69 @@ class UserDashboard(BaseDashboard):
                     pass
             # Nếu bạn đã có SettingsManager thực sự, thay DummySettingsManager bằng class thật
             self.settings_manager = DummySettingsManager()
-            self.settings_tab = UserSettings(self.user_manager, self.wallet_manager, self.category_manager, self.settings_manager)
-            
-            self.profile_tab = UserProfileTab(self.user_manager)
+            return UserSettings(self.user_manager, self.wallet_manager, self.category_manager, self.settings_manager)
+        if index == 7:
+            from gui.user.user_profile_tab import UserProfileTab
+            tab = UserProfileTab(self.user_manager)
             # Connect the profile updated signal to the header update
-            self.profile_tab.profile_updated.connect(self.update_header)
-            
-            # Clear existing widgets
-            while self.content_stack.count():
-                widget = self.content_stack.widget(0)
-                self.content_stack.removeWidget(widget)
-                widget.deleteLater()
-            
-            # Add tabs to content stack in the new order
-            self.content_stack.addWidget(self.overview_tab)      # 0
-            self.content_stack.addWidget(self.transaction_tab)  # 1
-            self.content_stack.addWidget(self.budget_tab)       # 2 
-            self.content_stack.addWidget(self.category_tab)     # 3 
-            self.content_stack.addWidget(self.report_tab)       # 4 
-            self.content_stack.addWidget(self.notifications_tab) # 5
-            self.content_stack.addWidget(self.settings_tab)     # 6
-            self.content_stack.addWidget(self.profile_tab)      # 7
-            logging.debug(f"User dashboard setup complete, {self.content_stack.count()} tabs added")
-            
-            # Setup Quick Actions
-            self.setup_quick_actions()
-            
-        except Exception as e:
-            logging.error(f"Error setting up user content: {e}")
-            import traceback
-            traceback.print_exc()
+            tab.profile_updated.connect(self.update_header)
+            return tab
+        return None
+
+    def ensure_tab(self, index):
+        """Dựng tab tại vị trí index khi dùng lần đầu, thay cho nhãn tạm
+
+        Returns:
+            bool: True nếu tab vừa được tạo trong lần gọi này
+        """
+        if not (0 <= index < len(self.TAB_ATTRIBUTES)) or getattr(self, self.TAB_ATTRIBUTES[index], None):
+            return False
+        tab = self.create_tab(index)
+        if tab is None:
+            return False
+        setattr(self, self.TAB_ATTRIBUTES[index], tab)
+        placeholder = self.content_stack.widget(index)
+        self.content_stack.insertWidget(index, tab)
+        if placeholder is not None:
+            self.content_stack.removeWidget(placeholder)
+            placeholder.deleteLater()
+        self.content_stack.setCurrentIndex(index)
+        logging.debug(f"UserDashboard: Tab {self.TAB_ATTRIBUTES[index]} created on first use")
+        return True
     
+    def on_data_changed(self, event):
+        """Đưa ChangeEvent của TransactionManager/BudgetManager cho người dùng hiện tại vào hàng đợi"""
+        if event.user_id != getattr(self, 'content_user_id', None):
+            return
+        self.pending_changes.append(event)
+        self.change_timer.start()
+
+    def flush_data_changes(self):
+        """Để mỗi tab đã dựng tự cập nhật theo các ChangeEvent trong hàng đợi"""
+        events, self.pending_changes = self.pending_changes, []
+        if not events:
+            return
+        logging.debug(f"UserDashboard: Dispatching {len(events)} change events: {events}")
+        for attribute in ('overview_tab', 'transaction_tab', 'budget_tab', 'report_tab'):
+            tab = getattr(self, attribute, None)
+            if tab and hasattr(tab, 'apply_changes'):
+                try:
+                    tab.apply_changes(events)
+                except Exception as e:
+                    logging.error(f"UserDashboard: {attribute} could not apply changes: {e}", exc_info=True)
+
+    def closeEvent(self, event):
+        # EventBus tồn tại lâu hơn cửa sổ này: ngừng nhận thay đổi khi đóng
+        self.transaction_manager.events.unsubscribe('transaction', self.on_data_changed)
+        self.budget_manager.events.unsubscribe('budget', self.on_data_changed)
+        super().closeEvent(event)
+
     def refresh_overview_and_related_tabs(self):
-        """Refreshes tabs that depend on transaction or budget data."""
+        """Tải lại toàn bộ các tab phụ thuộc dữ liệu giao dịch hoặc ngân sách
+
+        Các thay đổi thường ngày không đi qua đây nữa: tab tự cập nhật theo ChangeEvent
+        (flush_data_changes). Chỉ dùng khi cần tải lại toàn bộ.
+        """
         logging.debug("UserDashboard: refresh_overview_and_related_tabs CALLED") # Changed from print
         if hasattr(self, 'overview_tab') and self.overview_tab:
             logging.debug("UserDashboard: Refreshing Overview Tab") # Changed from print
@@ -255,6 +366,11 @@ class UserDashboard(BaseDashboard):
                 return
                 
             logging.debug(f"Switching to tab index {index} (Name: {current_tab_name})")
+            if not getattr(self, 'data_loaded', False):
+                self.pending_tab_index = index # on_user_data_loaded sẽ dựng tab này
+                return
+            if self.ensure_tab(index):
+                return # Tab vừa dựng đã tự tải dữ liệu
             
             if 0 <= index < self.content_stack.count():
                 self.content_stack.setCurrentIndex(index)
@@ -300,11 +416,11 @@ class UserDashboard(BaseDashboard):
     def reload_categories(self):
         """Callback to reload category in other tabs when there are changes"""
         try:
-            if hasattr(self, 'transaction_tab') and hasattr(self.transaction_tab, 'load_categories'):
+            if getattr(self, 'transaction_tab', None) and hasattr(self.transaction_tab, 'load_categories'):
                 self.transaction_tab.load_categories()
-            if hasattr(self, 'overview_tab') and hasattr(self.overview_tab, 'update_dashboard'): # Overview might use categories in charts
+            if getattr(self, 'overview_tab', None) and hasattr(self.overview_tab, 'update_dashboard'): # Overview might use categories in charts
                 self.overview_tab.update_dashboard()
-            if hasattr(self, 'budget_tab') and hasattr(self.budget_tab, 'load_budgets_and_categories'): # Budget tab likely needs category refresh                self.budget_tab.load_budgets_and_categories()
+            if getattr(self, 'budget_tab', None) and hasattr(self.budget_tab, 'load_budgets_and_categories'): # Budget tab likely needs category refresh                self.budget_tab.load_budgets_and_categories()
             # Add other tabs that depend on category list if necessary
                 logging.debug("UserDashboard.reload_categories called and propagated.")
         except Exception as e:
@@ -315,12 +431,12 @@ class UserDashboard(BaseDashboard):
     def update_dashboard(self):
         """Update dashboard data"""
         try:
-            if hasattr(self, 'overview_tab'):
+            if getattr(self, 'overview_tab', None):
                 self.overview_tab.update_dashboard()
-            if hasattr(self, 'transaction_tab'):
+            if getattr(self, 'transaction_tab', None):
                 if hasattr(self.transaction_tab, 'load_transactions_to_table'):
                     self.transaction_tab.load_transactions_to_table()
-            if hasattr(self, 'report_tab'):
+            if getattr(self, 'report_tab', None):
                 if hasattr(self.report_tab, 'reload_data'):
                     self.report_tab.reload_data()        
         except Exception as e:
@@ -401,8 +517,11 @@ class UserDashboard(BaseDashboard):
     def handle_add_income(self):
         """Handle quick action: Add Income"""
         self.switch_tab(1)  # Switch to transaction tab (index 1)
+        if not getattr(self, 'data_loaded', False):
+            self.pending_action = self.handle_add_income # Thực hiện lại khi tab giao dịch đã được dựng
+            return
         try:
-            if hasattr(self, 'transaction_tab') and hasattr(self.transaction_tab, 'open_add_transaction_dialog'):
+            if getattr(self, 'transaction_tab', None) and hasattr(self.transaction_tab, 'open_add_transaction_dialog'):
                 self.transaction_tab.open_add_transaction_dialog(transaction_type="income")        
         except Exception as e:
             logging.error(f"Error in handle_add_income: {e}")
@@ -410,8 +529,11 @@ class UserDashboard(BaseDashboard):
     def handle_add_expense(self):
         """Handle quick action: Add Expense"""
         self.switch_tab(1) # Switch to transaction tab (index 1)
+        if not getattr(self, 'data_loaded', False):
+            self.pending_action = self.handle_add_expense # Thực hiện lại khi tab giao dịch đã được dựng
+            return
         try:
-            if hasattr(self, 'transaction_tab') and hasattr(self.transaction_tab, 'open_add_transaction_dialog'):
+            if getattr(self, 'transaction_tab', None) and hasattr(self.transaction_tab, 'open_add_transaction_dialog'):
                 self.transaction_tab.open_add_transaction_dialog(transaction_type="expense")
         except Exception as e:
             logging.error(f"Error in handle_add_expense: {e}")
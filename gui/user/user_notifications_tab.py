@@ -77,6 +77,7 @@ class ToastNotification(QWidget):
 class NotificationCenter(QWidget):
     """Notification center for viewing all notifications"""
     notification_changed = pyqtSignal()
+    INBOX_LIMIT = 20 # Number of latest notifications shown
     
     def __init__(self, user_manager, notification_manager, parent=None):
         super().__init__(parent)
@@ -217,14 +218,9 @@ class NotificationCenter(QWidget):
                 self.content_layout.addWidget(no_user_label)
                 return
             
-            # Lấy cả thông báo chung (không có user_id) và thông báo riêng của user
-            all_notifications = self.notification_manager.get_all_notifications()
-            notifications = []
-            
-            for notif in all_notifications:
-                # Thêm thông báo nếu là thông báo chung hoặc dành cho user hiện tại
-                if notif.get('user_id') == user_id or not notif.get('user_id'):
-                    notifications.append(notif)
+            # Thông báo riêng của user và thông báo chung (không có user_id), mới nhất trước;
+            # chỉ mục hộp thư chỉ trả về INBOX_LIMIT thông báo đầu, không duyệt phần còn lại
+            notifications = self.notification_manager.get_inbox(user_id, limit=self.INBOX_LIMIT)
             
             if not notifications:
                 no_notif_frame = QFrame()
@@ -253,10 +249,7 @@ class NotificationCenter(QWidget):
                 self.content_layout.addWidget(no_notif_frame)
                 return
                 
-            # Sort by date (newest first)
-            notifications.sort(key=lambda x: x.get('created_at', ''), reverse=True)
-            
-            for notif in notifications[:20]:  # Show latest 20
+            for notif in notifications:  # Latest INBOX_LIMIT, newest first
                 notif_widget = self.create_notification_widget(notif)
                 self.content_layout.addWidget(notif_widget)
                 
@@ -385,7 +378,9 @@ class NotificationCenter(QWidget):
     def mark_as_read(self, notification_id):
         """Mark a single notification as read"""
         try:
-            if self.notification_manager.update_notification(notification_id, is_read=True):
+            current_user = self.user_manager.get_current_user()
+            user_id = current_user.get('id') or current_user.get('user_id') if current_user else None
+            if self.notification_manager.mark_as_read(notification_id, user_id):
                 show_toast(self, "Đã đánh dấu thông báo là đã đọc", "success")
                 self.load_notifications()
                 self.notification_changed.emit()
@@ -15,11 +15,13 @@ import logging
 from data_manager.transaction_manager import TransactionManager
 from data_manager.budget_manager import BudgetManager
 from data_manager.category_manager import CategoryManager
+from data_manager.repository import normalize_datetime
 from utils.animated_widgets import AnimatedStatCard
 from utils.quick_actions import add_quick_actions_to_widget
 from utils.ui_styles import TableStyleHelper, ChartStyleHelper
 
 OTHER_CATEGORY_THRESHOLD_PERCENT = 3.0 # Categories below this % go into "Khác"
+RECENT_TRANSACTION_LIMIT = 15 # Rows in the "Giao dịch gần đây" table
 
 class HoverableBudgetListItemWidget(QWidget):
     def __init__(self, parent=None):
@@ -294,277 +296,17 @@ class UserOverviewTab(QWidget):
             logging.debug(f"UserOverviewTab: Starting dashboard update for user {self.user_id}. Filter: {current_filter_text}")
             start_date, end_date = self.get_filter_dates()
             logging.debug(f"UserOverviewTab: Date range for transactions: Start={start_date}, End={end_date}")
-            transactions = self.transaction_manager.get_transactions_in_range(start_date, end_date, self.user_id)
-            logging.debug(f"UserOverviewTab: Found {len(transactions)} transactions in range.")
-            
-            total_income = sum(t["amount"] for t in transactions if t["type"] == "income")
-            total_expense = sum(t["amount"] for t in transactions if t["type"] == "expense")
-            self.balance_card.set_value(total_income - total_expense)
-            self.expense_card.set_value(total_expense)
-            self.saving_card.set_value(total_income - total_expense)
-
-            all_user_transactions = self.transaction_manager.get_transactions_by_user(self.user_id)
-            self.tx_table.setRowCount(0) 
-            recent_transactions_to_display = sorted(all_user_transactions, key=lambda x: x["date"], reverse=True)[:15]
-            self.recent_transactions_group.setTitle(f"Giao dịch gần đây ({len(recent_transactions_to_display)} mục mới nhất)")
-
-            for t in recent_transactions_to_display:
-                row = self.tx_table.rowCount()
-                self.tx_table.insertRow(row)
-                try:
-                    date_obj = datetime.datetime.fromisoformat(t["date"].replace('Z', '+00:00'))
-                    display_date = date_obj.strftime("%d/%m/%Y")
-                except: display_date = str(t.get("date", ""))
-                self.tx_table.setItem(row, 0, QTableWidgetItem(display_date))
-                
-                category_id = t.get("category_id", "")
-                category_name = self.category_manager.get_category_name(category_id) if category_id else "Khác"
-                self.tx_table.setItem(row, 1, QTableWidgetItem(category_name))
-                
-                amount_item = QTableWidgetItem(f"{t['amount']:,} đ")
-                amount_item.setForeground(QColor('#ef4444' if t.get('type') == 'expense' else '#10b981'))
-                self.tx_table.setItem(row, 2, amount_item)
-                self.tx_table.setItem(row, 3, QTableWidgetItem(t.get("note", "")))
-            self.tx_table.resizeColumnsToContents()
-
-            # --- REMOVE OLD BUDGET BAR CHART LOGIC ---
-            # if self.budget_manager:
-            #     # self.budget_chart.removeAllSeries() # This was the source of the error
-            #     # for axis in self.budget_chart.axes(): self.budget_chart.removeAxis(axis)
-            #     
-            #     logging.info(f"UserOverviewTab: Updating budget chart for user {self.user_id}. Filter: {self.filter_combo.currentText()}")
-            #     all_user_budgets = self.budget_manager.get_budgets_by_user(self.user_id)
-            #     logging.info(f"UserOverviewTab: Raw budgets from budget_manager for user {self.user_id} ({len(all_user_budgets)} items): {all_user_budgets}")
-            #
-            #     budgets_for_period = []
-            #     current_display_month = None
-            #     current_display_year = None
-            #
-            #     if current_filter_text == "Tháng này":
-            #         today = datetime.date.today()
-            #         current_display_month = today.month
-            #         current_display_year = today.year
-            #         logging.debug(f"UserOverviewTab: Filter is 'Tháng này'. Target year={current_display_year}, month={current_display_month} for budgets.")
-            #     else:
-            #         logging.debug(f"UserOverviewTab: Filter is '{current_filter_text}'. Budget chart will show all user budgets with limit > 0.")
-            #
-            #     for budget_item in all_user_budgets:
-            #         budget_cat_id = budget_item.get('category_id')
-            #         budget_limit = budget_item.get('limit', 0)
-            #         try:
-            #             b_month = int(budget_item.get('month'))
-            #             b_year = int(budget_item.get('year'))
-            #         except (ValueError, TypeError):
-            #             logging.warning(f"UserOverviewTab: Budget item has invalid month/year: {budget_item}. Skipping.")
-            #             continue
-            #
-            #         logging.debug(f"UserOverviewTab: Checking budget: ID={budget_item.get('id')}, CatID='{budget_cat_id}', M={b_month}(type:{type(b_month)}), Y={b_year}(type:{type(b_year)}), Limit={budget_limit}, current_amount={budget_item.get('current_amount')}")
-            #
-            #         if budget_limit > 0:
-            #             if current_display_year and current_display_month: 
-            #                 if b_year == current_display_year and b_month == current_display_month:
-            #                     budgets_for_period.append(budget_item)
-            #             else: 
-            #                 budgets_for_period.append(budget_item)
-            #     
-            #     logging.info(f"UserOverviewTab: Filtered budgets_for_period before charting ({len(budgets_for_period)} items): {budgets_for_period}")
-            #     
-            #     # Clear previous chart data for tooltips - These attributes are removed
-            #     # self.chart_category_names = []
-            #     # self.chart_budget_values = []
-            #     # self.chart_spent_values = []
-            #
-            #     # ... (Logic for populating self.chart_category_names etc. and updating self.budget_chart) ...
-            #     # This entire block for self.budget_chart is now removed.
-            #
-            #     # if self.chart_category_names: 
-            #     #    ... (add series to self.budget_chart) ...
-            #     # else:
-            #     #    # Determine the correct "no data" message 
-            #     #    if not budgets_for_period: 
-            #     #        self.budget_chart.setTitle("Ngân sách và chi tiêu (Không có dữ liệu ngân sách cho kỳ này)")
-            #     #    else: 
-            #     #        self.budget_chart.setTitle("Ngân sách và chi tiêu (Không có dữ liệu hợp lệ để vẽ biểu đồ)")
-            # --- END REMOVE OLD BUDGET BAR CHART LOGIC ---
-            
-            # Update Spending Pie Chart
-            self.spending_series.clear()
-            category_spending_raw = {}
-            for t in transactions:
-                if t.get("type") == "expense":
-                    category_id = t.get("category_id", "")
-                    category_name = self.category_manager.get_category_name(category_id) or "Khác"
-                    category_spending_raw[category_name] = category_spending_raw.get(category_name, 0) + t["amount"]
-            
-            total_spending_for_pie = sum(category_spending_raw.values())
-            
-            # Group small categories into "Khác"
-            processed_category_spending = {}
-            other_total_value = 0
-            if total_spending_for_pie > 0: # Avoid division by zero if no spending
-                for category, total in category_spending_raw.items():
-                    percentage = (total / total_spending_for_pie) * 100
-                    if percentage < OTHER_CATEGORY_THRESHOLD_PERCENT:
-                        other_total_value += total
-                    else:
-                        processed_category_spending[category] = total
-                if other_total_value > 0:
-                    processed_category_spending["Khác"] = processed_category_spending.get("Khác", 0) + other_total_value
-
-            # Sort processed categories for display
-            sorted_category_spending = sorted(processed_category_spending.items(), key=lambda item: item[1], reverse=True)
-
-            if self.spending_chart.legend().markers():
-                for marker in self.spending_chart.legend().markers():
-                    try: marker.clicked.disconnect()
-                    except TypeError: pass
-            
-            for category_name, total_value in sorted_category_spending:
-                if total_value > 0:
-                    percentage = (total_value / total_spending_for_pie) * 100 if total_spending_for_pie > 0 else 0
-                    
-                    slice = self.spending_series.append(category_name, total_value) # category_name for legend
-                    # slice.setLabel(f\"{percentage:.1f}%\") # DEFER setting final label text
-                    slice.setLabelVisible(True) # Initial visibility
-
-                    slice.setProperty("category_name_prop", category_name) 
-                    slice.setProperty("category_value_prop", total_value)
-                    slice.setProperty("category_percentage_prop", percentage)
-            
-            if not self.spending_series.slices():
-                self.spending_chart.setTitle("Chi tiêu theo danh mục (Không có dữ liệu)")
-            else:
-                self.spending_chart.setTitle("Chi tiêu theo danh mục")
-
-            try: 
-                self.spending_series.hovered.disconnect(self.on_slice_hovered)
-            except TypeError: pass
-            self.spending_series.hovered.connect(self.on_slice_hovered)
-            
-            ChartStyleHelper.apply_pie_chart_style(self.spending_series)
-
-            # Iterate AFTER style helper to set final labels and ensure properties
-            for s_slice in self.spending_series.slices(): # Renamed loop variable to avoid conflict
-                perc = s_slice.property("category_percentage_prop")
-                if perc is not None:
-                    s_slice.setLabel(f"{perc:.1f}%")
-                
-                s_slice.setLabelVisible(True) # Ensure label is visible
-                s_slice.setLabelColor(QColor("#FFFFFF")) # Ensure label color
-                s_slice.setLabelFont(QFont("Arial", 8, QFont.Bold)) # Ensure label font
-
-            # Explicitly set legend labels to category names
-            if self.spending_chart.legend().isVisible() and self.spending_series.count() > 0:
-                # Update legend items based on current slices
-                legend_markers = self.spending_chart.legend().markers(self.spending_series)
-                for i, s_slice in enumerate(self.spending_series.slices()):
-                    if i < len(legend_markers):
-                        cat_name = s_slice.property("category_name_prop")
-                        if cat_name:
-                             legend_markers[i].setLabel(cat_name)
-            
-            # ---- Update Budget Overview List ----
-            # Clear previous budget list items
-            while self.budget_overview_list_layout.count():
-                child = self.budget_overview_list_layout.takeAt(0)
-                if child.widget():
-                    child.widget().deleteLater()
-
-            if self.budget_manager and self.user_id and self.category_manager:
-                today = datetime.date.today()
-                current_month_budgets = self.budget_manager.get_budgets_by_month(today.year, today.month, self.user_id)
-                
-                logging.debug(f"UserOverviewTab: Found {len(current_month_budgets)} budgets for current month ({today.month}/{today.year}) for overview list.")
-                
-                if not current_month_budgets:
-                    no_budget_label = QLabel("Không có ngân sách nào được thiết lập cho tháng này.")
-                    no_budget_label.setAlignment(Qt.AlignCenter)
-                    no_budget_label.setStyleSheet("padding: 10px; color: grey;")
-                    self.budget_overview_list_layout.addWidget(no_budget_label)
-                else:
-                    for budget in current_month_budgets:
-                        category_id = budget.get('category_id')
-                        category_name = "N/A"
-                        if category_id:
-                            cat_obj = self.category_manager.get_category_by_id(category_id)
-                            if cat_obj:
-                                category_name = cat_obj.get('name', 'N/A')
-                        
-                        limit = budget.get('limit', 0)
-                        # current_amount now represents the REMAINING balance
-                        remaining = budget.get('current_amount', 0)  # remaining balance
-                        spent = limit - remaining  # spent = limit - remaining
-                        
-                        # Ensure spent is not negative (in case of data inconsistency)
-                        spent = max(0, spent)
-                        
-                        percentage = 0
-                        if limit > 0:
-                            percentage = int((spent / limit) * 100)
-                        percentage = min(max(percentage, 0), 100) # Clamp
-
-                        item_widget = HoverableBudgetListItemWidget() # MODIFIED HERE
-                        item_layout = QHBoxLayout(item_widget)
-                        item_layout.setContentsMargins(8, 5, 8, 5) # Adjusted margins for a bit more padding
-
-                        name_label = QLabel(f"{category_name}")
-                        name_label.setMinimumWidth(100) 
-                        name_label.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Preferred)
-                        name_label.setStyleSheet("background-color: transparent;") # Ensure label bg is transparent
-
-                        progress_bar = QProgressBar()
-                        progress_bar.setValue(percentage)
-                        progress_bar.setFormat(f"{percentage}%")
-                        progress_bar.setFixedHeight(18) # Slightly smaller height
-                        progress_bar.setStyleSheet("background-color: transparent;") # Ensure progressbar bg is transparent within item_widget
-
-                        progress_bar_style_sheet = (
-                            "QProgressBar {"
-                            "    border: 1px solid #cccccc;"
-                            "    border-radius: 5px;"
-                            "    text-align: center;"
-                            "    height: 18px;"
-                            "    background-color: #f0f0f0;"
-                            "    /* Lighter background for the bar track */"
-                            "}"
-                            "QProgressBar::chunk {"
-                            "    background-color: %s;"
-                            "    border-radius: 4px;"
-                            "}"
-                        )
-                        chunk_color = "#10b981" # Default Green
-                        if percentage >= 90:
-                            chunk_color = "#ef4444" # Red
-                        elif percentage >= 75:
-                            chunk_color = "#f97316" # Orange
-                        progress_bar.setStyleSheet(progress_bar_style_sheet % chunk_color)
-
-                        item_layout.addWidget(name_label)
-                        item_layout.addWidget(progress_bar, 1) 
-
-                        tooltip_text = (f"<b>{category_name}</b><br>"
-                                        f"Giới hạn: {limit:,.0f} đ<br>"
-                                        f"Đã chi: {spent:,.0f} đ<br>"
-                                        f"Còn lại: {remaining:,.0f} đ<br>"
-                                        f"Tiến độ: {percentage}%")
-                        item_widget.setToolTip(tooltip_text)
-                        
-                        self.budget_overview_list_layout.addWidget(item_widget)
-                    
-                    self.budget_overview_list_layout.addStretch(1) 
-            else:
-                if not self.budget_manager: logging.warning("UserOverviewTab: BudgetManager not available for budget overview list.")
-                if not self.user_id: logging.warning("UserOverviewTab: User ID not available for budget overview list.")
-                if not self.category_manager: logging.warning("UserOverviewTab: CategoryManager not available for budget overview list.")
-                
-                unavailable_label = QLabel("Không thể tải danh sách ngân sách.")
-                unavailable_label.setAlignment(Qt.AlignCenter)
-                unavailable_label.setStyleSheet("padding: 10px; color: grey;")
-                self.budget_overview_list_layout.addWidget(unavailable_label)
-            # ---- End of Budget Overview List Update ----
-
-            # Refresh chart views
-            self.spending_chart_view.repaint()
+            # Tổng thu/chi và chi theo danh mục tính trên ảnh chụp dạng cột của người dùng;
+            # apply_changes cập nhật hai bảng này theo từng thay đổi thay vì tính lại
+            frame = self.transaction_manager.get_frame(self.user_id)
+            self.range_totals = frame.totals(start_date, end_date)
+            self.category_spending = frame.by_category("expense", start_date, end_date)
+            logging.debug(f"UserOverviewTab: Found {len(frame)} transactions for user, totals in range: {self.range_totals}")
+
+            self.update_summary_cards()
+            self.update_recent_transactions()
+            self.update_spending_chart()
+            self.update_budget_overview_list()
 
         except Exception as e:
             logging.error(f"UserOverviewTab: Lỗi cập nhật dashboard: {e}", exc_info=True)
@@ -575,6 +317,181 @@ class UserOverviewTab(QWidget):
             # error_dialog.setWindowTitle("Lỗi")
             # error_dialog.exec_()
 
+    def apply_changes(self, events):
+        """Patch totals, recent list, pie chart and budget list from ChangeEvents (see UserDashboard)
+
+        Only the sections touched by the events are redrawn; totals and per-category
+        spending are adjusted by the changed amounts instead of re-reading transactions.
+        """
+        if not self.user_id or not hasattr(self, 'range_totals'):
+            return
+        try:
+            start_date, end_date = self.get_filter_dates()
+            today = datetime.date.today()
+            totals_changed = recent_changed = budgets_changed = False
+            for event in events:
+                if event.user_id != self.user_id:
+                    continue
+                if event.entity == 'budget':
+                    budgets_changed = budgets_changed or any(
+                        b.get('year') == today.year and b.get('month') == today.month for b in event.records())
+                    continue
+                if event.entity != 'transaction':
+                    continue
+                for record, sign in ((event.old, -1), (event.record, 1)):
+                    if record is None:
+                        continue
+                    tx_date = normalize_datetime(record.get('date'))
+                    if tx_date is None:
+                        continue
+                    if (record.get('transaction_id') in self.recent_transaction_ids
+                            or len(self.recent_transaction_ids) < RECENT_TRANSACTION_LIMIT
+                            or tx_date >= self.recent_oldest_date):
+                        recent_changed = True
+                    if (start_date and tx_date < start_date) or (end_date and tx_date > end_date):
+                        continue
+                    amount = sign * (record.get('amount', 0) or 0)
+                    tx_type = record.get('type')
+                    if tx_type in self.range_totals:
+                        self.range_totals[tx_type] += amount
+                        totals_changed = True
+                    if tx_type == 'expense':
+                        category_id = record.get('category_id', 'unknown')
+                        remaining = self.category_spending.get(category_id, 0) + amount
+                        if abs(remaining) < 0.005: # Bỏ phần dư làm tròn khi trừ hết
+                            self.category_spending.pop(category_id, None)
+                        else:
+                            self.category_spending[category_id] = remaining
+            if totals_changed:
+                self.update_summary_cards()
+                self.update_spending_chart()
+            if recent_changed:
+                self.update_recent_transactions()
+            if budgets_changed:
+                self.update_budget_overview_list()
+        except Exception as e:
+            logging.error(f"UserOverviewTab: Lỗi cập nhật theo thay đổi, tải lại toàn bộ: {e}", exc_info=True)
+            self.update_dashboard()
+
+    def update_summary_cards(self):
+        total_income = self.range_totals["income"]
+        total_expense = self.range_totals["expense"]
+        self.balance_card.set_value(total_income - total_expense)
+        self.expense_card.set_value(total_expense)
+        self.saving_card.set_value(total_income - total_expense)
+
+    def update_recent_transactions(self):
+        # Trang đầu theo ngày giảm dần đọc thẳng từ chỉ mục, không sắp xếp lại toàn bộ giao dịch
+        recent_transactions_to_display = self.transaction_manager.get_transaction_page(
+            self.user_id, limit=RECENT_TRANSACTION_LIMIT, sort_by='date', descending=True)
+        self.recent_transaction_ids = {t.get('transaction_id') for t in recent_transactions_to_display}
+        self.recent_oldest_date = min(
+            (normalize_datetime(t.get('date')) or datetime.datetime.min for t in recent_transactions_to_display),
+            default=datetime.datetime.min)
+        categories = self.category_manager.get_categories_by_ids(
+            {t.get("category_id") for t in recent_transactions_to_display if t.get("category_id")})
+        self.tx_table.setRowCount(0) 
+        self.recent_transactions_group.setTitle(f"Giao dịch gần đây ({len(recent_transactions_to_display)} mục mới nhất)")
+
+        for t in recent_transactions_to_display:
+            row = self.tx_table.rowCount()
+            self.tx_table.insertRow(row)
+            try:
+                date_obj = datetime.datetime.fromisoformat(t["date"].replace('Z', '+00:00'))
+                display_date = date_obj.strftime("%d/%m/%Y")
+            except: display_date = str(t.get("date", ""))
+            self.tx_table.setItem(row, 0, QTableWidgetItem(display_date))
+            
+            category_id = t.get("category_id", "")
+            category = categories.get(category_id) if category_id else None
+            category_name = category.get("name", "Khác") if category else "Khác"
+            self.tx_table.setItem(row, 1, QTableWidgetItem(category_name))
+            
+            amount_item = QTableWidgetItem(f"{t['amount']:,} đ")
+            amount_item.setForeground(QColor('#ef4444' if t.get('type') == 'expense' else '#10b981'))
+            self.tx_table.setItem(row, 2, amount_item)
+            self.tx_table.setItem(row, 3, QTableWidgetItem(t.get("note", "")))
+        self.tx_table.resizeColumnsToContents()
+
+    def update_spending_chart(self):
+        """Redraw the spending pie from self.category_spending (category_id -> total)"""
+        self.spending_series.clear()
+        category_spending_raw = {}
+        names = self.category_manager.get_categories_by_ids(self.category_spending.keys())
+        for category_id, category_total in self.category_spending.items():
+            category_name = names.get(category_id, {}).get('name') or "Khác"
+            category_spending_raw[category_name] = category_spending_raw.get(category_name, 0) + category_total
+        
+        total_spending_for_pie = sum(category_spending_raw.values())
+        
+        # Group small categories into "Khác"
+        processed_category_spending = {}
+        other_total_value = 0
+        if total_spending_for_pie > 0: # Avoid division by zero if no spending
+            for category, total in category_spending_raw.items():
+                percentage = (total / total_spending_for_pie) * 100
+                if percentage < OTHER_CATEGORY_THRESHOLD_PERCENT:
+                    other_total_value += total
+                else:
+                    processed_category_spending[category] = total
+            if other_total_value > 0:
+                processed_category_spending["Khác"] = processed_category_spending.get("Khác", 0) + other_total_value
+
+        # Sort processed categories for display
+        sorted_category_spending = sorted(processed_category_spending.items(), key=lambda item: item[1], reverse=True)
+
+        if self.spending_chart.legend().markers():
+            for marker in self.spending_chart.legend().markers():
+                try: marker.clicked.disconnect()
+                except TypeError: pass
+        
+        for category_name, total_value in sorted_category_spending:
+            if total_value > 0:
+                percentage = (total_value / total_spending_for_pie) * 100 if total_spending_for_pie > 0 else 0
+                
+                slice = self.spending_series.append(category_name, total_value) # category_name for legend
+                # slice.setLabel(f\"{percentage:.1f}%\") # DEFER setting final label text
+                slice.setLabelVisible(True) # Initial visibility
+
+                slice.setProperty("category_name_prop", category_name) 
+                slice.setProperty("category_value_prop", total_value)
+                slice.setProperty("category_percentage_prop", percentage)
+        
+        if not self.spending_series.slices():
+            self.spending_chart.setTitle("Chi tiêu theo danh mục (Không có dữ liệu)")
+        else:
+            self.spending_chart.setTitle("Chi tiêu theo danh mục")
+
+        try: 
+            self.spending_series.hovered.disconnect(self.on_slice_hovered)
+        except TypeError: pass
+        self.spending_series.hovered.connect(self.on_slice_hovered)
+        
+        ChartStyleHelper.apply_pie_chart_style(self.spending_series)
+
+        # Iterate AFTER style helper to set final labels and ensure properties
+        for s_slice in self.spending_series.slices(): # Renamed loop variable to avoid conflict
+            perc = s_slice.property("category_percentage_prop")
+            if perc is not None:
+                s_slice.setLabel(f"{perc:.1f}%")
+            
+            s_slice.setLabelVisible(True) # Ensure label is visible
+            s_slice.setLabelColor(QColor("#FFFFFF")) # Ensure label color
+            s_slice.setLabelFont(QFont("Arial", 8, QFont.Bold)) # Ensure label font
+
+        # Explicitly set legend labels to category names
+        if self.spending_chart.legend().isVisible() and self.spending_series.count() > 0:
+            # Update legend items based on current slices
+            legend_markers = self.spending_chart.legend().markers(self.spending_series)
+            for i, s_slice in enumerate(self.spending_series.slices()):
+                if i < len(legend_markers):
+                    cat_name = s_slice.property("category_name_prop")
+                    if cat_name:
+                         legend_markers[i].setLabel(cat_name)
+        
+        # Refresh chart views
+        self.spending_chart_view.repaint()
+
     def on_slice_hovered(self, slice, state):
         """Handle pie chart slice hover events"""
         if state:  # Hovering over a slice
@@ -614,70 +531,100 @@ class UserOverviewTab(QWidget):
         pass
 
     def update_budget_overview_list(self):
-        # Clear existing items
-        for i in reversed(range(self.budget_overview_list_layout.count())):
-            widget_item = self.budget_overview_list_layout.itemAt(i)
-            if widget_item:
-                widget = widget_item.widget()
-                if widget is not None:
-                    widget.deleteLater()
-
-        if not self.budget_manager or not self.user_id:
-            no_data_label = QLabel("Không có dữ liệu ngân sách.")
-            self.budget_overview_list_layout.addWidget(no_data_label)
-            return
-
-        today = datetime.date.today()
-        current_month_budgets = self.budget_manager.get_budgets_by_month_year(self.user_id, today.month, today.year)
-        
-        if not current_month_budgets:
-            no_data_label = QLabel("Không có ngân sách nào cho tháng này.")
-            self.budget_overview_list_layout.addWidget(no_data_label)
-            return
-
-        for budget_item_data in current_month_budgets:
-            category_id = budget_item_data.get("category_id")
-            category_name = self.category_manager.get_category_name(category_id) if category_id else "Chưa phân loại"
-            limit = budget_item_data.get("limit", 0)
-            current_amount_spent = abs(budget_item_data.get("current_amount", 0)) # abs() to ensure positive
-            remaining = limit - current_amount_spent
-            progress_percentage = (current_amount_spent / limit * 100) if limit > 0 else 0
+        # Clear previous budget list items
+        while self.budget_overview_list_layout.count():
+            child = self.budget_overview_list_layout.takeAt(0)
+            if child.widget():
+                child.widget().deleteLater()
+
+        if self.budget_manager and self.user_id and self.category_manager:
+            today = datetime.date.today()
+            current_month_budgets = self.budget_manager.get_budgets_by_month(today.year, today.month, self.user_id)
             
-            item_widget = HoverableBudgetListItemWidget() # Use the hoverable widget
-            item_layout = QVBoxLayout(item_widget)
-            item_layout.setContentsMargins(8, 5, 8, 5) # Add some padding
-
-            name_label = QLabel(f"<b>{category_name}</b>")
-            item_layout.addWidget(name_label)
-
-            progress_bar = QProgressBar()
-            progress_bar.setValue(int(progress_percentage))
-            progress_bar.setTextVisible(False) # Hide default text
-            progress_bar.setFixedHeight(12) # Make it a bit slimmer
-            progress_bar.setStyleSheet(f"""
-                QProgressBar {{
-                    border: 1px solid #cccccc;
-                    border-radius: 5px;
-                    background-color: #f0f0f0; /* Lighter background for the bar track */
-                    text-align: center;
-                }}
-                QProgressBar::chunk {{
-                    background-color: {'#66bb6a' if progress_percentage <= 70 else ('#ffa726' if progress_percentage <= 100 else '#ef5350')};
-                    border-radius: 4px;
-                }}
-            """)
-            item_layout.addWidget(progress_bar)
-
-            details_label = QLabel(f"Đã chi: {current_amount_spent:,.0f}đ / {limit:,.0f}đ")
-            details_label.setStyleSheet("font-size: 9pt; color: #555;")
-            item_layout.addWidget(details_label)
+            logging.debug(f"UserOverviewTab: Found {len(current_month_budgets)} budgets for current month ({today.month}/{today.year}) for overview list.")
+            
+            if not current_month_budgets:
+                no_budget_label = QLabel("Không có ngân sách nào được thiết lập cho tháng này.")
+                no_budget_label.setAlignment(Qt.AlignCenter)
+                no_budget_label.setStyleSheet("padding: 10px; color: grey;")
+                self.budget_overview_list_layout.addWidget(no_budget_label)
+            else:
+                for budget in current_month_budgets:
+                    category_id = budget.get('category_id')
+                    category_name = "N/A"
+                    if category_id:
+                        cat_obj = self.category_manager.get_category_by_id(category_id)
+                        if cat_obj:
+                            category_name = cat_obj.get('name', 'N/A')
+                    
+                    limit = budget.get('limit', 0)
+                    # current_amount now represents the REMAINING balance
+                    remaining = budget.get('current_amount', 0)  # remaining balance
+                    spent = limit - remaining  # spent = limit - remaining
+                    
+                    # Ensure spent is not negative (in case of data inconsistency)
+                    spent = max(0, spent)
+                    
+                    percentage = 0
+                    if limit > 0:
+                        percentage = int((spent / limit) * 100)
+                    percentage = min(max(percentage, 0), 100) # Clamp
+
+                    item_widget = HoverableBudgetListItemWidget() # MODIFIED HERE
+                    item_layout = QHBoxLayout(item_widget)
+                    item_layout.setContentsMargins(8, 5, 8, 5) # Adjusted margins for a bit more padding
+
+                    name_label = QLabel(f"{category_name}")
+                    name_label.setMinimumWidth(100) 
+                    name_label.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Preferred)
+                    name_label.setStyleSheet("background-color: transparent;") # Ensure label bg is transparent
+
+                    progress_bar = QProgressBar()
+                    progress_bar.setValue(percentage)
+                    progress_bar.setFormat(f"{percentage}%")
+                    progress_bar.setFixedHeight(18) # Slightly smaller height
+                    progress_bar.setStyleSheet("background-color: transparent;") # Ensure progressbar bg is transparent within item_widget
+
+                    progress_bar_style_sheet = (
+                        "QProgressBar {"
+                        "    border: 1px solid #cccccc;"
+                        "    border-radius: 5px;"
+                        "    text-align: center;"
+                        "    height: 18px;"
+                        "    background-color: #f0f0f0;"
+                        "    /* Lighter background for the bar track */"
+                        "}"
+                        "QProgressBar::chunk {"
+                        "    background-color: %s;"
+                        "    border-radius: 4px;"
+                        "}"
+                    )
+                    chunk_color = "#10b981" # Default Green
+                    if percentage >= 90:
+                        chunk_color = "#ef4444" # Red
+                    elif percentage >= 75:
+                        chunk_color = "#f97316" # Orange
+                    progress_bar.setStyleSheet(progress_bar_style_sheet % chunk_color)
+
+                    item_layout.addWidget(name_label)
+                    item_layout.addWidget(progress_bar, 1) 
+
+                    tooltip_text = (f"<b>{category_name}</b><br>"
+                                    f"Giới hạn: {limit:,.0f} đ<br>"
+                                    f"Đã chi: {spent:,.0f} đ<br>"
+                                    f"Còn lại: {remaining:,.0f} đ<br>"
+                                    f"Tiến độ: {percentage}%")
+                    item_widget.setToolTip(tooltip_text)
+                    
+                    self.budget_overview_list_layout.addWidget(item_widget)
+                
+                self.budget_overview_list_layout.addStretch(1) 
+        else:
+            if not self.budget_manager: logging.warning("UserOverviewTab: BudgetManager not available for budget overview list.")
+            if not self.user_id: logging.warning("UserOverviewTab: User ID not available for budget overview list.")
+            if not self.category_manager: logging.warning("UserOverviewTab: CategoryManager not available for budget overview list.")
             
-            item_widget.setToolTip(
-                f"<b>{category_name}</b><br>"
-                f"Ngân sách: {limit:,.0f}đ<br>"
-                f"Đã chi: {current_amount_spent:,.0f}đ ({progress_percentage:.1f}%)<br>"
-                f"Còn lại: {remaining:,.0f}đ"
-            )
-            self.budget_overview_list_layout.addWidget(item_widget)
-
-        self.budget_overview_list_layout.addStretch(1) # Push items to the top
+            unavailable_label = QLabel("Không thể tải danh sách ngân sách.")
+            unavailable_label.setAlignment(Qt.AlignCenter)
+            unavailable_label.setStyleSheet("padding: 10px; color: grey;")
+            self.budget_overview_list_layout.addWidget(unavailable_label)
@@ -1,21 +1,64 @@
 # Copy nội dung từ user_report.py sang user_report_tab.py
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QFrame, 
                             QTabWidget, QPushButton, QComboBox, QDateEdit, QFileDialog,
-                            QCheckBox, QGroupBox, QMessageBox, QDialog, QRadioButton)
+                            QCheckBox, QGroupBox, QMessageBox, QDialog, QRadioButton,
+                            QProgressDialog)
 from PyQt5.QtGui import QFont, QColor, QIcon, QPixmap
 from PyQt5.QtCore import Qt, QDate, pyqtSignal, QTimer
 from PyQt5.QtPrintSupport import QPrinter, QPrintDialog
-import matplotlib
-matplotlib.use('Agg')
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-from matplotlib.backends.backend_pdf import PdfPages
-import matplotlib.pyplot as plt
-from matplotlib.figure import Figure
 import datetime
 import os
 import tempfile
+from collections import OrderedDict
+# matplotlib is loaded on first use (see utils.lazy_modules), not at module import
+from utils.lazy_modules import figure_classes
+from utils.background_task import run_in_process
+from utils.report_export import (CHARTS, GRANULARITY, draw_category_pie, group_totals_by_name, monthly_reports,
+                                 partial_paths, period_labels, period_range, period_reports, period_title,
+                                 run_export_job, set_income_expense_values, setup_income_expense_axes,
+                                 setup_trend_axes, type_filter, update_trend)
+from data_manager.repository import normalize_datetime
+
+
+def start_report_export(parent, job, title="Xuất báo cáo"):
+    """Run a report export job (see utils.report_export) in a worker process
+
+    Pages are streamed to disk by the worker; a non-modal progress dialog follows
+    its progress and cancelling it terminates the worker and removes the partial files
+    (the PDF's .part file, or every PNG of the set).
+    """
+    pages = len(job['reports']) * len(job.get('charts') or CHARTS)
+    progress = QProgressDialog("Đang chuẩn bị xuất báo cáo...", "Hủy", 0, pages, parent)
+    progress.setWindowTitle(title)
+    progress.setWindowModality(Qt.NonModal)
+    progress.setMinimumDuration(0)
+    progress.setAutoClose(False)
+    progress.setAutoReset(False)
+    progress.setValue(0)
+
+    def on_progress(done, total, message):
+        progress.setMaximum(total)
+        progress.setValue(done)
+        progress.setLabelText(message)
+
+    def on_finished(files):
+        progress.close()
+        location = files[0] if len(files) == 1 else f"{len(files)} file trong {os.path.dirname(files[0])}" if files else "(không có file)"
+        QMessageBox.information(parent, title, f"Báo cáo đã được xuất thành công đến:\n{location}")
+
+    def on_failed(message):
+        progress.close()
+        QMessageBox.critical(parent, "Lỗi xuất báo cáo", f"Không thể xuất báo cáo: {message}")
+
+    task = run_in_process(run_export_job, job, on_progress=on_progress, on_finished=on_finished,
+                          on_failed=on_failed, parent=parent, cleanup_paths=partial_paths(job))
+    progress.canceled.connect(task.cancel)
+    progress.show()
+    return task
+
 
 class UserReport(QWidget):
+    REPORT_CACHE_SIZE = 16 # Aggregated periods kept in report_cache
     
     def __init__(self, user_manager, transaction_manager, category_manager, parent=None):
         super().__init__(parent)
@@ -25,15 +68,27 @@ class UserReport(QWidget):
         self.current_month = datetime.datetime.now().month
         self.current_year = datetime.datetime.now().year
         self.selected_period = "month"  # 'month', 'quarter', 'year'
+        self.export_task = None # ProcessTask of the running export, if any
 
         # Timer for debouncing report generation
         self.report_generation_timer = QTimer(self)
         self.report_generation_timer.setSingleShot(True)
         self.report_generation_timer.timeout.connect(self.generate_report)
+        # Set by apply_changes while hidden; the report is regenerated on the next showEvent
+        self.report_stale = False
+        # Chart layer: aggregated report data per (user, period, dates, store signature),
+        # persistent artists per chart, last rendered data/layout per chart and the
+        # canvases that still need a draw once they become visible
+        self.report_cache = OrderedDict()
+        self.chart_artists = {}
+        self.chart_keys = {}
+        self.layout_state = {}
+        self.dirty_charts = set()
 
         self.init_ui()
         
     def init_ui(self):
+        Figure, FigureCanvas = figure_classes()
         layout = QVBoxLayout(self)
         layout.setContentsMargins(30, 20, 30, 20)
         layout.setSpacing(15)
@@ -424,6 +479,18 @@ class UserReport(QWidget):
         self.figure2 = figure2
         self.figure3 = figure3
         self.figure4 = figure4
+        # name -> (figure, canvas, tight_layout pad)
+        self.charts = {
+            'income_expense': (figure1, self.income_expense_canvas, 2),
+            'trend': (figure2, self.trend_canvas, None),
+            'income_category': (figure3, self.income_cat_canvas, None),
+            'expense_category': (figure4, self.expense_cat_canvas, None),
+        }
+        for name, (figure, canvas, pad) in self.charts.items():
+            # A resized canvas needs a new layout; Qt redraws it afterwards
+            canvas.mpl_connect('resize_event', lambda event, n=name: self.update_chart_layout(n))
+        # Canvases on other tabs are drawn when their tab is shown
+        tab_widget.currentChanged.connect(self.draw_visible_charts)
         
         # Initially generate report for the current period
         self.schedule_report_generation()
@@ -513,6 +580,37 @@ class UserReport(QWidget):
             self.date_selector.setDisplayFormat("yyyy")
         self.schedule_report_generation()
             
+    def apply_changes(self, events):
+        """Regenerate the report only when a transaction ChangeEvent falls in the shown period
+
+        A hidden tab just marks itself stale and regenerates on its next showEvent.
+        """
+        if any(event.entity == 'transaction' for event in events):
+            # Cached periods other than the shown one may contain the changed transactions
+            self.report_cache.clear()
+        user = self.user_manager.get_current_user()
+        user_id = user.get('id') or user.get('user_id') if user else None
+        start_date, end_date = self.get_date_range()
+        for event in events:
+            if event.entity != 'transaction' or event.user_id != user_id:
+                continue
+            dates = [normalize_datetime(t.get('date')) for t in event.records()]
+            if any(d is not None and start_date <= d.date() <= end_date for d in dates):
+                break
+        else:
+            return
+        if self.isVisible():
+            self.schedule_report_generation()
+        else:
+            self.report_stale = True
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if self.report_stale:
+            self.report_stale = False
+            self.schedule_report_generation()
+        self.draw_visible_charts()
+
     def schedule_report_generation(self):
         """Schedules a report generation to avoid rapid updates."""
         self.report_generation_timer.start(250) # 250ms delay
@@ -525,70 +623,97 @@ class UserReport(QWidget):
             user = self.user_manager.get_current_user()
             user_id = user.get('id') or user.get('user_id') if user else None
             
-            # Get transactions within range, chỉ lấy của user hiện tại
-            all_transactions = self.transaction_manager.get_transactions_in_range(start_date, end_date, user_id=user_id)
-            
-            # Áp dụng filter theo loại giao dịch
-            transaction_type_index = self.type_combo.currentIndex()
-            if transaction_type_index == 1:  # Thu nhập
-                transactions = [t for t in all_transactions if t.get('type') == 'income']
-            elif transaction_type_index == 2:  # Chi tiêu
-                transactions = [t for t in all_transactions if t.get('type') == 'expense']
-            else:  # Tất cả
-                transactions = all_transactions
+            # Tổng hợp được lưu đệm theo kỳ báo cáo; đổi bộ lọc loại giao dịch không tính lại
+            report_data = self.get_report_data(user_id, start_date, end_date)
             
             # Update summary
-            self.update_summary(transactions)
+            self.update_summary(report_data)
             
-            # Update charts
-            self.update_income_expense_chart(transactions)
-            self.update_trend_chart(start_date, end_date)
-            self.update_category_charts(transactions)
+            # Update charts: artists are updated in place and only changed charts are marked dirty
+            self.update_income_expense_chart(report_data)
+            self.update_trend_chart(report_data)
+            self.update_category_charts(report_data)
+            self.draw_visible_charts()
             
         except Exception as e:
             print(f"Error generating report: {e}")
             
+    def get_report_data(self, user_id, start_date, end_date):
+        """Aggregated report data for the period
+
+        Cached until the transaction store signature changes or apply_changes receives a transaction event.
+        """
+        key = (user_id, self.selected_period, start_date, end_date, self.transaction_manager.repository.signature())
+        report_data = self.report_cache.get(key)
+        if report_data is not None:
+            self.report_cache.move_to_end(key)
+            return report_data
+        # Tổng hợp một lần cho toàn bộ báo cáo: tổng thu/chi, xu hướng theo khoảng và theo danh mục
+        granularity = GRANULARITY.get(self.selected_period)
+        report_data = self.transaction_manager.aggregate(
+            user_id, start_date, end_date, granularity=granularity, group_by='category')
+        self.report_cache[key] = report_data
+        while len(self.report_cache) > self.REPORT_CACHE_SIZE:
+            self.report_cache.popitem(last=False)
+        return report_data
+
+    def render_chart(self, name, key, draw, layout_token=None):
+        """Run draw() only if the chart's data key changed, then mark its canvas for drawing
+
+        Args:
+            name: Key of self.charts
+            key: Hashable summary of everything the chart shows
+            draw: Callable updating the chart's artists
+            layout_token: Anything that changes the space labels need; tight_layout only
+                runs again when this or the canvas size changes
+        """
+        if self.chart_keys.get(name) == key:
+            return
+        draw()
+        self.chart_keys[name] = key
+        self.update_chart_layout(name, layout_token)
+        self.dirty_charts.add(name)
+
+    def update_chart_layout(self, name, layout_token=None):
+        """tight_layout the chart unless size and layout token are the same as last time"""
+        figure, canvas, pad = self.charts[name]
+        if layout_token is None:
+            layout_token = self.layout_state.get(name, (None, None))[1]
+        state = (canvas.get_width_height(), layout_token)
+        if self.layout_state.get(name) == state or not figure.axes:
+            return
+        self.layout_state[name] = state
+        if pad is None:
+            figure.tight_layout()
+        else:
+            figure.tight_layout(pad=pad)
+
+    def draw_visible_charts(self, *args):
+        """Draw dirty canvases that are on screen; hidden ones wait for their tab"""
+        for name in list(self.dirty_charts):
+            canvas = self.charts[name][1]
+            if canvas.isVisible():
+                canvas.draw_idle()
+                self.dirty_charts.discard(name)
+
     def get_date_range(self):
         """Get date range based on selected period and date"""
         selected_date = self.date_selector.date()
-        year = selected_date.year()
-        month = selected_date.month() if self.selected_period != "year" else 1
+        return period_range(self.selected_period, selected_date.year(), selected_date.month())
         
-        if self.selected_period == "month":
-            # First and last day of month
-            start_date = datetime.date(year, month, 1)
-            
-            if month == 12:
-                next_month = datetime.date(year + 1, 1, 1)
-            else:
-                next_month = datetime.date(year, month + 1, 1)
-                
-            end_date = next_month - datetime.timedelta(days=1)
-            
-        elif self.selected_period == "quarter":
-            # Determine quarter
-            quarter = (month - 1) // 3 + 1
-            start_month = (quarter - 1) * 3 + 1
-            
-            start_date = datetime.date(year, start_month, 1)
-            
-            if start_month + 3 > 12:
-                next_quarter = datetime.date(year + 1, 1, 1)
-            else:
-                next_quarter = datetime.date(year, start_month + 3, 1)
-                
-            end_date = next_quarter - datetime.timedelta(days=1)
-            
-        else:  # year
-            start_date = datetime.date(year, 1, 1)
-            end_date = datetime.date(year, 12, 31)
-            
-        return start_date, end_date
-        
-    def update_summary(self, transactions):
-        """Update summary cards with transaction data"""
-        income_total = sum(t.get('amount', 0) for t in transactions if t.get('type') == 'income')
-        expense_total = sum(t.get('amount', 0) for t in transactions if t.get('type') == 'expense')
+    def get_type_filter(self):
+        """Return (show_income, show_expense) based on the transaction type filter"""
+        return type_filter(self.type_combo.currentIndex())
+
+    def get_filtered_totals(self, report_data):
+        """Return (income_total, expense_total) honoring the transaction type filter"""
+        show_income, show_expense = self.get_type_filter()
+        totals = report_data['totals']
+        return (totals['income'] if show_income else 0), (totals['expense'] if show_expense else 0)
+
+    def update_summary(self, report_data):
+        """Update summary cards with aggregated report data"""
+        income_total, expense_total = self.get_filtered_totals(report_data)
         balance = income_total - expense_total
         
         # Calculate savings rate
@@ -603,45 +728,25 @@ class UserReport(QWidget):
           # Add financial insights based on data
         self.update_financial_insights(income_total, expense_total, balance, savings_rate)
     
-    def update_income_expense_chart(self, transactions):
+    def update_income_expense_chart(self, report_data):
         """Update the income vs expense bar chart."""
         try:
-            self.figure1.clear()
+            values = list(self.get_filtered_totals(report_data))
+            self.render_chart('income_expense', tuple(values),
+                              lambda: self.draw_income_expense_chart(values),
+                              layout_token=len(f"{int(max(values)):,}"))
+        except Exception as e:
+            print(f"Error updating income/expense chart: {e}")
+
+    def draw_income_expense_chart(self, values):
+        artists = self.chart_artists.get('income_expense')
+        if artists is None:
+            # Built once; later updates only move bars and labels
             ax = self.figure1.add_subplot(111)
             self.figure1.patch.set_facecolor('white')
             ax.set_facecolor('white')
-
-            income_total = sum(t.get('amount', 0) for t in transactions if t.get('type') == 'income')
-            expense_total = sum(t.get('amount', 0) for t in transactions if t.get('type') == 'expense')
-
-            labels = ['Thu nhập', 'Chi tiêu']
-            values = [income_total, expense_total]
-            colors = ['#10b981', '#ef4444']
-
-            bars = ax.bar(labels, values, color=colors, width=0.5)
-
-            ax.set_ylabel('Số tiền (VNĐ)', fontdict={'fontsize': 12})
-            
-            # Format y-axis
-            import matplotlib.ticker as ticker
-            formatter = ticker.FuncFormatter(lambda x, p: f'{int(x):,}đ')
-            ax.yaxis.set_major_formatter(formatter)
-            ax.grid(True, axis='y', linestyle='--', alpha=0.7)
-            ax.spines['top'].set_visible(False)
-            ax.spines['right'].set_visible(False)
-            ax.spines['left'].set_color('#d1d5db')
-            ax.spines['bottom'].set_color('#d1d5db')
-
-            # Add value labels on top of bars
-            for bar in bars:
-                yval = bar.get_height()
-                ax.text(bar.get_x() + bar.get_width()/2.0, yval, f'{int(yval):,}đ', va='bottom', ha='center', fontsize=11, weight='bold')
-
-            self.figure1.tight_layout(pad=2)
-            self.income_expense_canvas.draw()
-
-        except Exception as e:
-            print(f"Error updating income/expense chart: {e}")
+            artists = self.chart_artists['income_expense'] = setup_income_expense_axes(ax)
+        set_income_expense_values(artists, values)
 
     def update_financial_insights(self, income_total, expense_total, balance, savings_rate):
         """Show smart financial insights based on the current data"""
@@ -817,6 +922,19 @@ class UserReport(QWidget):
         
         layout.addWidget(content_group)
         
+        # Scope options: the selected period, or one report per month of the selected year
+        scope_group = QGroupBox("Phạm vi")
+        scope_layout = QVBoxLayout(scope_group)
+        
+        current_period_radio = QRadioButton(f"Kỳ đang chọn ({self.get_period_text(*self.get_date_range())})")
+        current_period_radio.setChecked(True)
+        scope_layout.addWidget(current_period_radio)
+        
+        monthly_radio = QRadioButton(f"Từng tháng trong năm {self.date_selector.date().year()}")
+        scope_layout.addWidget(monthly_radio)
+        
+        layout.addWidget(scope_group)
+        
         # Buttons
         button_layout = QHBoxLayout()
         
@@ -828,7 +946,8 @@ class UserReport(QWidget):
         export_btn.setStyleSheet("background-color: #10b981; color: white;")
         export_btn.clicked.connect(lambda: self.export_report(
             pdf=pdf_radio.isChecked(),
-            full_report=full_radio.isChecked()
+            full_report=full_radio.isChecked(),
+            monthly=monthly_radio.isChecked()
         ) or dialog.accept())
         button_layout.addWidget(export_btn)
         
@@ -836,330 +955,118 @@ class UserReport(QWidget):
         
         dialog.exec_()
     
-    def export_report(self, pdf=True, full_report=True):
-        """Export the report to PDF or PNG"""
+    def export_report(self, pdf=True, full_report=True, monthly=False):
+        """Export the report to PDF or PNG in a worker process (see utils.report_export)
+        
+        The worker rebuilds the figures from the transaction store, so the window stays
+        responsive and batch exports (every month of the year) stream page by page to disk.
+        """
         try:
             if pdf:
                 file_path, _ = QFileDialog.getSaveFileName(
                     self, "Lưu báo cáo PDF", "", "PDF Files (*.pdf)")
-                
-                if not file_path:
-                    return
-                
-                if not file_path.endswith(".pdf"):
+                if file_path and not file_path.endswith(".pdf"):
                     file_path += ".pdf"
-                
-                with PdfPages(file_path) as pdf_pages:
-                    # Get date range for title
-                    start_date, end_date = self.get_date_range()
-                    period_text = self.get_period_text(start_date, end_date)
-                    
-                    # Create figure for summary
-                    fig, ax = plt.subplots(figsize=(8, 6))
-                    ax.axis('off')
-                    
-                    # Add title and summary
-                    ax.text(0.5, 0.95, f"Báo cáo tài chính - {period_text}", 
-                           fontsize=16, ha='center', weight='bold')
-                    
-                    # Get data from summary cards
-                    income = self.income_card.value_label.text()
-                    expense = self.expense_card.value_label.text()
-                    balance = self.balance_card.value_label.text()
-                    savings = self.savings_rate_card.value_label.text()
-                    
-                    # Add summary text
-                    summary_text = f"""
-                    Thu nhập: {income}
-                    Chi tiêu: {expense}
-                    Chênh lệch: {balance}
-                    Tỷ lệ tiết kiệm: {savings}
-                    """
-                    
-                    ax.text(0.5, 0.8, summary_text, fontsize=12, ha='center')
-                    
-                    # Save the summary page
-                    pdf_pages.savefig(fig)
-                    plt.close(fig)
-                    
-                    if full_report:
-                        # Export all charts from each tab
-                        # Income vs Expense chart
-                        pdf_pages.savefig(self.figure1.figure)
-                        
-                        # Trend chart
-                        pdf_pages.savefig(self.figure2.figure)
-                        
-                        # Category charts
-                        pdf_pages.savefig(self.figure3.figure)
-                        pdf_pages.savefig(self.figure4.figure)
-                    else:
-                        # Only export current tab
-                        current_tab = self.tab_widget.currentIndex()
-                        if current_tab == 0:  # Overview
-                            pdf_pages.savefig(self.figure1.figure)
-                        elif current_tab == 1:  # Trend
-                            pdf_pages.savefig(self.figure2.figure)
-                        elif current_tab == 2:  # Category
-                            pdf_pages.savefig(self.figure3.figure)
-                            pdf_pages.savefig(self.figure4.figure)
-                
-                QMessageBox.information(self, "Xuất báo cáo", 
-                                      f"Báo cáo đã được xuất thành công đến:\n{file_path}")
             else:
-                # Export as PNG
                 file_path, _ = QFileDialog.getSaveFileName(
                     self, "Lưu ảnh báo cáo", "", "PNG Files (*.png)")
-                
-                if not file_path:
-                    return
-                
-                if not file_path.endswith(".png"):
+                if file_path and not file_path.endswith(".png"):
                     file_path += ".png"
-                
-                # Determine which figure to export based on current tab
-                current_tab = self.tab_widget.currentIndex()
-                figure_to_save = None
-                
-                if current_tab == 0:  # Overview
-                    figure_to_save = self.figure1.figure
-                elif current_tab == 1:  # Trend
-                    figure_to_save = self.figure2.figure
-                elif current_tab == 2:  # Category analysis
-                    # Ask which chart to export
-                    chart_dialog = QDialog(self)
-                    chart_dialog.setWindowTitle("Chọn biểu đồ")
-                    chart_dialog.setFixedWidth(300)
-                    chart_layout = QVBoxLayout(chart_dialog)
-                    
-                    income_radio = QRadioButton("Thu nhập theo danh mục")
-                    income_radio.setChecked(True)
-                    chart_layout.addWidget(income_radio)
-                    
-                    expense_radio = QRadioButton("Chi tiêu theo danh mục")
-                    chart_layout.addWidget(expense_radio)
-                    
-                    button_layout = QHBoxLayout()
-                    cancel_btn = QPushButton("Hủy")
-                    cancel_btn.clicked.connect(chart_dialog.reject)
-                    button_layout.addWidget(cancel_btn)
-                    
-                    ok_btn = QPushButton("OK")
-                    ok_btn.clicked.connect(chart_dialog.accept)
-                    button_layout.addWidget(ok_btn)
-                    
-                    chart_layout.addLayout(button_layout)
-                    
-                    result = chart_dialog.exec_()
-                    if result:
-                        if income_radio.isChecked():
-                            figure_to_save = self.figure3.figure
-                        else:
-                            figure_to_save = self.figure4.figure
-                    else:
-                        return
-                
-                if figure_to_save:
-                    figure_to_save.savefig(file_path, format='png', dpi=300, bbox_inches='tight')
-                    QMessageBox.information(self, "Xuất báo cáo", 
-                                          f"Ảnh báo cáo đã được lưu thành công đến:\n{file_path}")
+            if not file_path:
+                return
+            
+            user = self.user_manager.get_current_user()
+            user_id = user.get('id') or user.get('user_id') if user else None
+            selected_date = self.date_selector.date()
+            if monthly:
+                reports = monthly_reports(user_id, selected_date.year())
+            else:
+                reports = period_reports([(user_id, None)], self.selected_period,
+                                         selected_date.year(), selected_date.month())
+            
+            if full_report:
+                charts = list(CHARTS) if pdf else CHARTS[1:]
+            else:
+                # Only the charts of the current tab; the PDF keeps its summary page
+                charts = [['income_expense'], ['trend'], ['income_category', 'expense_category']][self.tab_widget.currentIndex()]
+                if pdf:
+                    charts = ['summary'] + charts
+            
+            job = {
+                'format': 'pdf' if pdf else 'png',
+                'path': file_path,
+                'dpi': 300,
+                'charts': charts,
+                'type_index': self.type_combo.currentIndex(),
+                'reports': reports,
+            }
+            self.export_task = start_report_export(self, job)
         
         except Exception as e:
             QMessageBox.critical(self, "Lỗi xuất báo cáo", f"Không thể xuất báo cáo: {str(e)}")
     
     def get_period_text(self, start_date, end_date):
         """Get text description of period for report title"""
-        if self.selected_period == "month":
-            return f"Tháng {start_date.month}/{start_date.year}"
-        elif self.selected_period == "quarter":
-            quarter = (start_date.month - 1) // 3 + 1
-            return f"Quý {quarter}/{start_date.year}"
-        else:
-            return f"Năm {start_date.year}"
+        return period_title(self.selected_period, start_date)
     
-    def update_trend_chart(self, start_date, end_date):
+    def update_trend_chart(self, report_data):
         """Update trend line chart"""
         try:
-            # Clear the figure
-            self.figure2.clear()
-            ax = self.figure2.add_subplot(111)
-            
-            # Determine time periods based on the selected period
-            periods = []
-            period_labels = []
-            
-            if self.selected_period == "month":
-                # Daily data for the month
-                current_date = start_date
-                while current_date <= end_date:
-                    periods.append(current_date)
-                    period_labels.append(current_date.strftime("%d/%m"))
-                    current_date += datetime.timedelta(days=1)
-                    
-            elif self.selected_period == "quarter":
-                # Weekly data for the quarter
-                current_date = start_date
-                while current_date <= end_date:
-                    periods.append(current_date)
-                    period_labels.append(f"T{current_date.isocalendar()[1]}")
-                    current_date += datetime.timedelta(days=7)
-                    
-            else:  # year
-                # Monthly data for the year
-                for month in range(1, 13):
-                    periods.append(datetime.date(start_date.year, month, 1))
-                    period_labels.append(f"{month}/{start_date.year}")
-            
-            # Get income and expense for each period
-            income_values = []
-            expense_values = []
-            
-            # Lấy user_id hiện tại
-            user = self.user_manager.get_current_user()
-            user_id = user.get('id') or user.get('user_id') if user else None
+            # Labels for the periods built by TransactionManager.aggregate
+            labels = period_labels(self.selected_period, report_data['periods'])
             
             # Kiểm tra loại giao dịch đang được chọn
             transaction_type_index = self.type_combo.currentIndex()
-            show_income = transaction_type_index in [0, 1]  # Tất cả hoặc Thu nhập
-            show_expense = transaction_type_index in [0, 2]  # Tất cả hoặc Chi tiêu
-            
-            for i, period_start in enumerate(periods):
-                # Determine period end
-                if i < len(periods) - 1:
-                    period_end = periods[i+1] - datetime.timedelta(days=1)
-                else:
-                    period_end = end_date
-                
-                # Get transactions for this period
-                period_transactions = self.transaction_manager.get_transactions_in_range(period_start, period_end, user_id=user_id)
-                
-                if show_income:
-                    income_total = sum(t.get('amount', 0) for t in period_transactions if t.get('type') == 'income')
-                    income_values.append(income_total)
-                
-                if show_expense:
-                    expense_total = sum(t.get('amount', 0) for t in period_transactions if t.get('type') == 'expense')
-                    expense_values.append(expense_total)
+            show_income, show_expense = self.get_type_filter()
             
-            # Plot the data based on selected transaction type
-            if show_income:
-                ax.plot(period_labels, income_values, label='Thu nhập', color='#10b981', marker='o')
-            
-            if show_expense:
-                ax.plot(period_labels, expense_values, label='Chi tiêu', color='#ef4444', marker='o')
-            
-            # Plot balance as area between curves only if showing both
-            if show_income and show_expense:
-                ax.fill_between(period_labels, income_values, expense_values, color='#bfdbfe', alpha=0.3)
-            
-            # Format and label
-            ax.set_xlabel('Thời gian')
-            ax.set_ylabel('Số tiền (VNĐ)')
-            
-            # Set title based on selected transaction type
-            if transaction_type_index == 0:
-                ax.set_title('Xu hướng thu nhập và chi tiêu theo thời gian')
-            elif transaction_type_index == 1:
-                ax.set_title('Xu hướng thu nhập theo thời gian')
-            else:
-                ax.set_title('Xu hướng chi tiêu theo thời gian')
-            
-            if self.selected_period in ["quarter", "year"]:
-                ax.tick_params(axis='x', rotation=45)
-            
-            # Format y-axis as currency
-            import matplotlib.ticker as ticker
-            formatter = ticker.FuncFormatter(lambda x, p: format(int(x), ',') + 'đ')
-            ax.yaxis.set_major_formatter(formatter)
-            
-            ax.grid(True, linestyle='--', alpha=0.7)
-            ax.legend()
-            
-            self.figure2.tight_layout()
-            self.trend_canvas.draw()
+            income_values = report_data['series']['income']
+            expense_values = report_data['series']['expense']
+            shown = (income_values if show_income else []) + (expense_values if show_expense else [])
+            key = (transaction_type_index, tuple(labels), tuple(income_values), tuple(expense_values))
+            self.render_chart('trend', key,
+                              lambda: self.draw_trend_chart(labels, income_values, expense_values, transaction_type_index),
+                              layout_token=(self.selected_period, len(f"{int(max(shown, default=0)):,}")))
             
         except Exception as e:
             print(f"Error updating trend chart: {e}")
-    
-    def update_category_charts(self, transactions):
+
+    def draw_trend_chart(self, period_labels, income_values, expense_values, transaction_type_index):
+        artists = self.chart_artists.get('trend')
+        if artists is None:
+            # Lines are created once and fed new data with set_data
+            artists = self.chart_artists['trend'] = setup_trend_axes(self.figure2.add_subplot(111))
+        update_trend(artists, period_labels, income_values, expense_values, transaction_type_index, self.selected_period)
+
+    def update_category_charts(self, report_data):
         """Update category pie charts"""
         try:
             # Kiểm tra loại giao dịch đang được chọn
-            transaction_type_index = self.type_combo.currentIndex()
-            show_income = transaction_type_index in [0, 1]  # Tất cả hoặc Thu nhập
-            show_expense = transaction_type_index in [0, 2]  # Tất cả hoặc Chi tiêu
+            show_income, show_expense = self.get_type_filter()
             
             # Income by category
-            self.figure3.clear()
-            ax1 = self.figure3.add_subplot(111)
-            
-            if show_income:
-                income_by_category = {}
-                for t in transactions:
-                    if t.get('type') == 'income':
-                        category_id = t.get('category_id', 'unknown')
-                        # Lấy tên danh mục nếu có
-                        if category_id != 'unknown':
-                            category = self.category_manager.get_category_by_id(category_id)
-                            category_name = category.get('name', 'Khác') if category else 'Khác'
-                        else:
-                            category_name = 'Khác'
-                        income_by_category[category_name] = income_by_category.get(category_name, 0) + t.get('amount', 0)
-                
-                if income_by_category:
-                    labels = list(income_by_category.keys())
-                    values = list(income_by_category.values())
-                    
-                    # Define colorful palette
-                    colors = ['#10b981', '#3b82f6', '#8b5cf6', '#ec4899', '#f97316', '#eab308', '#06b6d4']
-                    
-                    ax1.pie(values, labels=labels, autopct='%1.1f%%', shadow=False, startangle=90, colors=colors)
-                    ax1.axis('equal')
-                    ax1.set_title('Thu nhập theo danh mục')
-                else:
-                    ax1.text(0.5, 0.5, 'Không có dữ liệu thu nhập trong giai đoạn này', 
-                          ha='center', va='center', fontsize=12)
-            else:
-                ax1.text(0.5, 0.5, 'Đã lọc: không hiển thị thu nhập', 
-                      ha='center', va='center', fontsize=12)
-            
-            self.income_cat_canvas.draw()
+            income_by_category = group_totals_by_name(report_data['categories']['income'], self.category_manager) if show_income else None
+            self.render_chart('income_category', (show_income, tuple((income_by_category or {}).items())),
+                              lambda: self.draw_category_pie('income_category', income_by_category, 'income'),
+                              layout_token=tuple(income_by_category or ()))
             
             # Expense by category
-            self.figure4.clear()
-            ax2 = self.figure4.add_subplot(111)
-            
-            if show_expense:
-                expense_by_category = {}
-                for t in transactions:
-                    if t.get('type') == 'expense':
-                        category_id = t.get('category_id', 'unknown')
-                        # Lấy tên danh mục nếu có
-                        if category_id != 'unknown':
-                            category = self.category_manager.get_category_by_id(category_id)
-                            category_name = category.get('name', 'Khác') if category else 'Khác'
-                        else:
-                            category_name = 'Khác'
-                        expense_by_category[category_name] = expense_by_category.get(category_name, 0) + t.get('amount', 0)
-                
-                if expense_by_category:
-                    labels = list(expense_by_category.keys())
-                    values = list(expense_by_category.values())
-                    
-                    # Define colorful palette
-                    colors = ['#ef4444', '#f97316', '#eab308', '#84cc16', '#06b6d4', '#8b5cf6', '#ec4899']
-                    
-                    ax2.pie(values, labels=labels, autopct='%1.1f%%', shadow=False, startangle=90, colors=colors)
-                    ax2.axis('equal')
-                    ax2.set_title('Chi tiêu theo danh mục')
-                else:
-                    ax2.text(0.5, 0.5, 'Không có dữ liệu chi tiêu trong giai đoạn này', 
-                          ha='center', va='center', fontsize=12)
-            else:
-                ax2.text(0.5, 0.5, 'Đã lọc: không hiển thị chi tiêu', 
-                      ha='center', va='center', fontsize=12)
-            
-            self.expense_cat_canvas.draw()
+            expense_by_category = group_totals_by_name(report_data['categories']['expense'], self.category_manager) if show_expense else None
+            self.render_chart('expense_category', (show_expense, tuple((expense_by_category or {}).items())),
+                              lambda: self.draw_category_pie('expense_category', expense_by_category, 'expense'),
+                              layout_token=tuple(expense_by_category or ()))
             
         except Exception as e:
             print(f"Error updating category charts: {e}")
+
+    def draw_category_pie(self, name, totals_by_name, kind):
+        """Redraw one category pie (see report_export.draw_category_pie)
+
+        Wedge count and labels vary with the data, so the axes are kept and only cleared.
+        """
+        ax = self.chart_artists.get(name)
+        if ax is None:
+            ax = self.chart_artists[name] = self.charts[name][0].add_subplot(111)
+        else:
+            ax.cla()
+            ax.axis('on')
+        draw_category_pie(ax, totals_by_name, kind)
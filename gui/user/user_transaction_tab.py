@@ -1,18 +1,161 @@
 # UserTransactionTab.py
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
                             QLineEdit, QFrame, QComboBox, QDateEdit, QMessageBox, QCompleter,
-                            QTableWidget, QTableWidgetItem, QGroupBox, QHeaderView, QScrollArea,
+                            QTableView, QGroupBox, QHeaderView, QScrollArea,
                             QSizePolicy, QSpacerItem, QAbstractItemView) 
 from PyQt5.QtGui import QFont, QIcon, QPalette, QColor
-from PyQt5.QtCore import Qt, QDate, pyqtSignal, QTimer
+from PyQt5.QtCore import Qt, QDate, pyqtSignal, QTimer, QModelIndex
 import datetime
 import logging
 from utils.animated_widgets import pulse_widget, shake_widget
+from utils.paged_table_model import PagedTableModel
 # from data_manager.transaction_manager import TransactionManager 
 # from data_manager.category_manager import CategoryManager   
 # from data_manager.budget_manager import BudgetManager     
 
 
+class TransactionTableModel(PagedTableModel):
+    """Pages transactions from TransactionManager on demand.
+
+    Sorting and filtering are delegated to TransactionManager.get_transaction_page,
+    and cells are formatted lazily in data().
+    """
+    HEADERS = ["ID", "Ngày", "Mô tả", "Số tiền", "Loại", "Danh mục"]
+    SORT_FIELDS = ['transaction_id', 'date', 'description', 'amount', 'type', 'category_id']
+
+    def __init__(self, transaction_manager, category_manager, parent=None):
+        super().__init__(parent)
+        self.transaction_manager = transaction_manager
+        self.category_manager = category_manager
+        self.user_id = None
+        self.tx_type = None
+        self.search = None
+        self.sort_by = 'date'
+        self.descending = True
+        self._categories = {}
+
+    def set_query(self, user_id, tx_type=None, search=None):
+        self.user_id = user_id
+        self.tx_type = tx_type
+        self.search = search or None
+        self.reload()
+
+    def reload(self):
+        self._categories = {}
+        super().reload()
+
+    def fetch_page(self, offset, limit):
+        if not self.user_id:
+            return []
+        page = self.transaction_manager.get_transaction_page(
+            self.user_id, offset=offset, limit=limit, sort_by=self.sort_by,
+            descending=self.descending, tx_type=self.tx_type, search=self.search)
+        missing = {t.get('category_id') for t in page} - self._categories.keys()
+        self._categories.update(self.category_manager.get_categories_by_ids(missing))
+        return page
+
+    def transaction_at(self, row):
+        return self.row_at(row)
+
+    def row_of(self, transaction_id):
+        for row, tx in enumerate(self._rows):
+            if tx.get('transaction_id') == transaction_id:
+                return row
+        return None
+
+    def apply_change(self, event):
+        """Patch the fetched rows for one transaction ChangeEvent instead of reloading the query"""
+        if event.entity != 'transaction' or event.user_id != self.user_id:
+            return
+        matches = self.transaction_manager.matches_query
+        old_shown = event.old is not None and matches(event.old, self.tx_type, self.search)
+        new = event.record
+        if new is not None and not matches(new, self.tx_type, self.search):
+            new = None
+        if not old_shown and new is None:
+            return
+        position = None
+        if new is not None:
+            # Use the store's own position (including its order among equal keys) so the
+            # next fetchMore offset still lines up with the store
+            position = self.transaction_manager.get_transaction_position(
+                self.user_id, new, sort_by=self.sort_by, descending=self.descending,
+                tx_type=self.tx_type, search=self.search)
+            if position is None and not self._exhausted:
+                self.reload()
+                return
+        if old_shown:
+            row = self.row_of(event.old.get('transaction_id'))
+            if row is not None:
+                self.beginRemoveRows(QModelIndex(), row, row)
+                del self._rows[row]
+                self.endRemoveRows()
+        if new is None:
+            return
+        if position is None:
+            # Every row is fetched, so only the display order among equal keys is at stake
+            key = self.transaction_manager.sort_key(self.sort_by)
+            new_key = key(new)
+            position = len(self._rows)
+            for i, tx in enumerate(self._rows):
+                if (key(tx) < new_key) if self.descending else (key(tx) > new_key):
+                    position = i
+                    break
+        row = position
+        if row > len(self._rows) or (row == len(self._rows) and not self._exhausted):
+            return # Belongs to a page that has not been fetched yet
+        category_id = new.get('category_id')
+        if category_id not in self._categories:
+            self._categories.update(self.category_manager.get_categories_by_ids([category_id]))
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._rows.insert(row, new)
+        self.endInsertRows()
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        if not (0 <= column < len(self.SORT_FIELDS)):
+            return
+        self.sort_by = self.SORT_FIELDS[column]
+        self.descending = order == Qt.DescendingOrder
+        self.reload()
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self._rows):
+            return None
+        tx = self._rows[index.row()]
+        column = index.column()
+        if role == Qt.DisplayRole:
+            if column == 0:
+                return str(tx.get('transaction_id', ''))
+            if column == 1:
+                # Format date nicely
+                try:
+                    date_obj = datetime.datetime.fromisoformat(tx.get('date', '').replace('Z', '+00:00'))
+                    return date_obj.strftime("%d/%m/%Y")
+                except ValueError:
+                    return tx.get('date', 'N/A')
+            if column == 2:
+                return str(tx.get('description', ''))
+            if column == 3:
+                return f"{tx.get('amount', 0):,.0f} đ" # Format amount
+            if column == 4:
+                return "Thu nhập" if tx.get('type') == 'income' else "Chi tiêu"
+            if column == 5:
+                category_id = tx.get('category_id')
+                if not category_id:
+                    return "N/A"
+                category = self._categories.get(category_id)
+                if category:
+                    return f"{category.get('icon', '')} {category.get('name', 'Không rõ')}"
+                return "Không tìm thấy DM" # Category not found
+        elif role == Qt.TextAlignmentRole and column == 3:
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        elif role == Qt.ForegroundRole and column == 3:
+            return QColor("red") if tx.get('type') == 'expense' else QColor("green")
+        elif role == Qt.UserRole:
+            return tx
+        return None
+
+
 class UserTransactionTab(QWidget):
     transaction_added_or_updated = pyqtSignal() # Signal to indicate data change
 
@@ -169,16 +312,37 @@ class UserTransactionTab(QWidget):
         table_group = QGroupBox("Danh sách Giao dịch")
         table_group_layout = QVBoxLayout(table_group)
 
-        self.transactions_table = QTableWidget()
-        self.transactions_table.setColumnCount(6) # ID, Ngày, Mô tả, Số tiền, Loại, Danh mục
-        self.transactions_table.setHorizontalHeaderLabels(["ID", "Ngày", "Mô tả", "Số tiền", "Loại", "Danh mục"])
+        # Store-side filters for the table
+        filter_layout = QHBoxLayout()
+        self.filter_type_combo = QComboBox()
+        self.filter_type_combo.addItem("Tất cả", None)
+        self.filter_type_combo.addItem("Thu nhập", "income")
+        self.filter_type_combo.addItem("Chi tiêu", "expense")
+        self.filter_type_combo.setStyleSheet(self.get_combo_box_style())
+        self.filter_type_combo.currentIndexChanged.connect(self.load_transactions_to_table)
+        filter_layout.addWidget(self.filter_type_combo)
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("Tìm theo mô tả...")
+        self.search_input.setStyleSheet(self.get_line_edit_style())
+        # Debounce typing so each keystroke does not re-query the store
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(300)
+        self.search_timer.timeout.connect(self.load_transactions_to_table)
+        self.search_input.textChanged.connect(self.search_timer.start)
+        filter_layout.addWidget(self.search_input, 1)
+        table_group_layout.addLayout(filter_layout)
+
+        self.transaction_model = TransactionTableModel(self.transaction_manager, self.category_manager, self)
+        self.transactions_table = QTableView()
+        self.transactions_table.setModel(self.transaction_model)
         self.transactions_table.verticalHeader().setVisible(False)
         self.transactions_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
         self.transactions_table.setSelectionBehavior(QAbstractItemView.SelectRows)
         self.transactions_table.setSelectionMode(QAbstractItemView.SingleSelection)
         self.transactions_table.setShowGrid(True) # Show grid
         self.transactions_table.setStyleSheet("""
-            QTableWidget {
+            QTableView {
                 border: 1px solid #e2e8f0;
                 border-radius: 8px;
                 font-size: 10pt;
@@ -191,11 +355,11 @@ class UserTransactionTab(QWidget):
                 border-bottom: 1px solid #e2e8f0; /* Bottom border for separation */
                 font-weight: bold;
             }
-            QTableWidget::item {
+            QTableView::item {
                 padding: 6px;
                 border-bottom: 1px solid #f1f5f9; /* Lighter border for rows */
             }
-            QTableWidget::item:selected {
+            QTableView::item:selected {
                 background-color: #dbeafe; /* Light blue for selection */
                 color: #1e40af;
             }
@@ -208,8 +372,11 @@ class UserTransactionTab(QWidget):
         header.setSectionResizeMode(4, QHeaderView.ResizeToContents) # Loại
         header.setSectionResizeMode(5, QHeaderView.ResizeToContents) # Danh mục
         self.transactions_table.hideColumn(0) # Hide ID column by default
+        # Newest first; sorting is done by the store via TransactionTableModel.sort
+        header.setSortIndicator(1, Qt.DescendingOrder)
+        self.transactions_table.setSortingEnabled(True)
 
-        self.transactions_table.itemSelectionChanged.connect(self.on_table_selection_changed)
+        self.transactions_table.selectionModel().selectionChanged.connect(self.on_table_selection_changed)
         table_group_layout.addWidget(self.transactions_table)
 
         # Action Buttons for Table
@@ -322,56 +489,22 @@ class UserTransactionTab(QWidget):
 
 
     def load_transactions_to_table(self):
-        self.transactions_table.setRowCount(0) # Clear existing rows
         if not self.user_id:
             QMessageBox.warning(self, "Lỗi", "Không tìm thấy ID người dùng.")
             return
 
-        transactions = self.transaction_manager.get_transactions_by_user(self.user_id)
-        if not transactions:
-            # Optional: Show a message in the table or a label if no transactions
-            return
-
-        for row, tx in enumerate(sorted(transactions, key=lambda x: x.get('date', ''), reverse=True)):
-            self.transactions_table.insertRow(row)
-            category_name = "N/A"
-            category_id = tx.get('category_id')
-            if category_id:
-                category = self.category_manager.get_category_by_id(category_id)
-                if category:
-                    category_name = f"{category.get('icon', '')} {category.get('name', 'Không rõ')}"
-                else:
-                    category_name = "Không tìm thấy DM" # Category not found
-            
-            # Format date nicely
-            try:
-                date_obj = datetime.datetime.fromisoformat(tx.get('date', '').replace('Z', '+00:00'))
-                date_str = date_obj.strftime("%d/%m/%Y")
-            except ValueError:
-                date_str = tx.get('date', 'N/A')
-
+        # The model fetches pages from the store as the view scrolls
+        self.transaction_model.set_query(
+            self.user_id,
+            tx_type=self.filter_type_combo.currentData(),
+            search=self.search_input.text().strip())
 
-            self.transactions_table.setItem(row, 0, QTableWidgetItem(str(tx.get('transaction_id', ''))))
-            self.transactions_table.setItem(row, 1, QTableWidgetItem(date_str))
-            self.transactions_table.setItem(row, 2, QTableWidgetItem(str(tx.get('description', ''))))
-            
-            amount_item = QTableWidgetItem(f"{tx.get('amount', 0):,.0f} đ") # Format amount
-            amount_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-            if tx.get('type') == 'expense':
-                amount_item.setForeground(QColor("red"))
-            else:
-                amount_item.setForeground(QColor("green"))
-            self.transactions_table.setItem(row, 3, amount_item)
-            
-            type_display = "Thu nhập" if tx.get('type') == 'income' else "Chi tiêu"
-            self.transactions_table.setItem(row, 4, QTableWidgetItem(type_display))
-            self.transactions_table.setItem(row, 5, QTableWidgetItem(category_name))
-        
-        self.transactions_table.resizeColumnsToContents()
-        header = self.transactions_table.horizontalHeader()
-        header.setSectionResizeMode(2, QHeaderView.Stretch) # Mô tả
-        self.transactions_table.hideColumn(0) # Ensure ID column is hidden
 
+    def apply_changes(self, events):
+        """Patch the table from ChangeEvents published by TransactionManager (see UserDashboard)"""
+        for event in events:
+            if event.entity == 'transaction':
+                self.transaction_model.apply_change(event)
 
     def clear_form(self):
         self.current_edit_transaction_id = None
@@ -391,8 +524,7 @@ class UserTransactionTab(QWidget):
 
 
     def on_table_selection_changed(self):
-        selected_items = self.transactions_table.selectedItems()
-        is_item_selected = bool(selected_items)
+        is_item_selected = self.transactions_table.selectionModel().hasSelection()
         self.edit_btn.setEnabled(is_item_selected)
         self.delete_btn.setEnabled(is_item_selected)
 
@@ -460,7 +592,7 @@ class UserTransactionTab(QWidget):
                 QMessageBox.information(self, "Thành công", f"Đã thêm giao dịch mới: {new_tx.get('description')}.")
                 self.update_budget_on_transaction(new_tx)
             
-            self.load_transactions_to_table()
+            # The table is patched from the change event (apply_changes), no reload needed
             self.clear_form()
             # self.transaction_added_or_updated.emit() # Moved to update_budget_on_transaction
             pulse_widget(self.transactions_table)
@@ -474,8 +606,8 @@ class UserTransactionTab(QWidget):
         if not selected_rows:
             return
         
-        row = selected_rows[0].row()
-        transaction_id = self.transactions_table.item(row, 0).text() # Assuming ID is in hidden column 0
+        selected_tx = self.transaction_model.transaction_at(selected_rows[0].row())
+        transaction_id = selected_tx.get('transaction_id') if selected_tx else None
         
         transaction = self.transaction_manager.get_transaction_by_id(transaction_id) # Need this method in TransactionManager
 
@@ -527,9 +659,11 @@ class UserTransactionTab(QWidget):
         if not selected_rows:
             return
         
-        row = selected_rows[0].row()
-        transaction_id = self.transactions_table.item(row, 0).text()
-        description = self.transactions_table.item(row, 2).text()
+        selected_tx = self.transaction_model.transaction_at(selected_rows[0].row())
+        if not selected_tx:
+            return
+        transaction_id = selected_tx.get('transaction_id')
+        description = str(selected_tx.get('description', ''))
 
         reply = QMessageBox.question(self, "Xác nhận xóa", 
                                      f"Bạn có chắc chắn muốn xóa giao dịch '{description}' không?",
@@ -560,7 +694,6 @@ class UserTransactionTab(QWidget):
                             except Exception as e_budget:
                                 logging.error(f"UserTransactionTab: Error reverting budget for deleted transaction {transaction_id}: {e_budget}")
                         
-                        self.load_transactions_to_table()
                         self.clear_form() 
                     else:
                         QMessageBox.warning(self, "Lỗi", "Không thể xóa giao dịch từ dữ liệu.")
@@ -595,6 +728,8 @@ class UserTransactionTab(QWidget):
             new_year, new_month = new_tx_date.year, new_tx_date.month
 
             budget_changed = False
+            # Gom các thay đổi (hoàn chi phí cũ + áp dụng chi phí mới) để ghi budgets.json một lần
+            budget_deltas = []
 
             # Handling for transaction UPDATE
             if old_transaction_data:
@@ -609,18 +744,17 @@ class UserTransactionTab(QWidget):
                     
                     if old_type == 'expense':
                         logging.debug(f"UserTransactionTab (Update): Reverting old expense part. Cat='{old_category_id}', Amt={old_amount}")
-                        self.budget_manager.revert_expense_from_budget(
-                            self.user_id, old_category_id, old_year, old_month, old_amount
-                        )
+                        budget_deltas.append((self.user_id, old_category_id, old_year, old_month, -old_amount))
                         budget_changed = True
             
             # Apply new/updated transaction part
             if new_type == 'expense' and new_category_id and new_amount > 0:
                 logging.debug(f"UserTransactionTab (Add/Update): Applying new expense part. Cat='{new_category_id}', Amt={new_amount}")
-                self.budget_manager.apply_expense_to_budget(
-                    self.user_id, new_category_id, new_year, new_month, new_amount
-                )
+                budget_deltas.append((self.user_id, new_category_id, new_year, new_month, new_amount))
                 budget_changed = True
+
+            if budget_deltas:
+                self.budget_manager.apply_expense_deltas(budget_deltas)
             
             if budget_changed:
                 self.transaction_added_or_updated.emit()
@@ -4,13 +4,9 @@ import logging
 from datetime import datetime
 from PyQt5.QtWidgets import QApplication, QMessageBox
 from gui.auth.login_form import LoginForm
-from gui.admin.admin_dashboard import AdminDashboard
-from gui.user.user_dashboard import UserDashboard
-from utils.file_helper import load_json, save_json
-from data_manager.category_manager import CategoryManager
-from data_manager.transaction_manager import TransactionManager
-from data_manager.notification_manager import NotificationManager
-from data_manager.budget_manager import BudgetManager
+from data_manager.audit_log_manager import AuditLogManager
+# Dashboard và các manager chỉ dùng sau khi đăng nhập được import trong handle_admin_login /
+# handle_user_login để form đăng nhập hiện ra mà không phải chờ nạp chúng
 
 # Cấu hình logging
 logging.basicConfig(
@@ -30,28 +26,17 @@ class ApplicationManager:
         self.admin_dashboard = None
         self.user_dashboard = None
         self.current_user = None
+        self.audit_log_manager = AuditLogManager()
 
     def log_history(self, user_id, action):
-        """Ghi lại lịch sử hoạt động của người dùng
+        """Ghi lại lịch sử hoạt động của người dùng (đưa vào hàng đợi ghi nền, không chặn giao diện)
         
         Args:
             user_id: ID của người dùng
             action: Hành động được thực hiện (login/logout)
         """
         try:
-            history = load_json('data/login_history.json')
-        except Exception as e:
-            logger.warning(f"Không thể tải file lịch sử: {e}")
-            history = []
-        
-        history.append({
-            'user_id': user_id,
-            'action': action,
-            'timestamp': datetime.now().isoformat()
-        })
-        
-        try:
-            save_json('data/login_history.json', history)
+            self.audit_log_manager.add_log(user_id, action)
         except Exception as e:
             logger.error(f"Không thể lưu lịch sử: {e}")
 
@@ -63,6 +48,7 @@ class ApplicationManager:
             user_manager: Quản lý người dùng đã đăng nhập
         """
         try:
+            from gui.admin.admin_dashboard import AdminDashboard
             self.admin_dashboard = AdminDashboard(user_manager=user_manager)
             self.admin_dashboard.set_current_user(user)
             self.admin_dashboard.logout_signal.connect(self.handle_admin_logout)
@@ -81,6 +67,11 @@ class ApplicationManager:
             user_manager: Quản lý người dùng
         """
         try:
+            from gui.user.user_dashboard import UserDashboard
+            from data_manager.category_manager import CategoryManager
+            from data_manager.transaction_manager import TransactionManager
+            from data_manager.notification_manager import NotificationManager
+            from data_manager.budget_manager import BudgetManager
             category_manager = CategoryManager()
             transaction_manager = TransactionManager()
             notification_manager = NotificationManager()
@@ -158,6 +149,9 @@ class ApplicationManager:
             logger.error(f"Lỗi ứng dụng: {e}")
             QMessageBox.critical(None, "Lỗi", f"Lỗi ứng dụng: {str(e)}")
             return 1
+        finally:
+            # Ghi nốt các nhật ký đăng nhập/đăng xuất còn trong hàng đợi
+            self.audit_log_manager.close()
 
 def main():
     """Hàm chính khởi chạy ứng dụng"""
@@ -0,0 +1,190 @@
+"""
+Background Task Utilities
+=========================
+
+Module chạy các tác vụ nặng (băm mật khẩu, đọc dữ liệu...) trên QThreadPool để
+không chặn luồng giao diện. Kết quả được trả về luồng giao diện qua Qt signal.
+
+Các thành phần chính:
+- TaskSignals: Các signal finished(object) / failed(str) của một tác vụ
+- BackgroundTask: QRunnable gói một hàm Python bất kỳ
+- run_in_background: Tạo và đưa tác vụ vào pool, kết nối callback
+- password_pool: Pool riêng cho bcrypt để không chiếm hết pool chung
+- ProcessTask: Chạy một hàm trong tiến trình con (tác vụ nặng CPU như xuất báo cáo),
+  nhận tiến độ qua multiprocessing.Queue
+
+Cách sử dụng:
+    from utils.background_task import run_in_background, password_pool
+
+    run_in_background(user_manager.authenticate_user, identifier, password,
+                      on_finished=self.on_login_result,
+                      on_failed=self.on_login_error,
+                      pool=password_pool)
+"""
+
+import logging
+import multiprocessing
+import os
+import queue
+import traceback
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, QTimer, pyqtSignal
+
+logger = logging.getLogger(__name__)
+
+# Pool riêng cho bcrypt: mỗi lần băm chiếm trọn một lõi CPU trong vài trăm ms
+password_pool = QThreadPool()
+password_pool.setMaxThreadCount(max(1, os.cpu_count() or 1))
+
+# Giữ tham chiếu Python tới các tác vụ đang chạy để signals không bị thu hồi sớm
+_active_tasks = set()
+
+
+class TaskSignals(QObject):
+    """Signal của một tác vụ nền; được phát từ luồng worker, nhận ở luồng giao diện"""
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+
+class BackgroundTask(QRunnable):
+    """Chạy fn(*args, **kwargs) trên QThreadPool và phát kết quả qua signals"""
+
+    def __init__(self, fn, *args, **kwargs):
+        super().__init__()
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.signals = TaskSignals()
+
+    def run(self):
+        try:
+            result = self.fn(*self.args, **self.kwargs)
+        except Exception as e:
+            logger.error(f"Lỗi trong tác vụ nền {getattr(self.fn, '__name__', self.fn)}: {e}\n{traceback.format_exc()}")
+            self.signals.failed.emit(str(e))
+        else:
+            self.signals.finished.emit(result)
+        finally:
+            _active_tasks.discard(self)
+
+
+def run_in_background(fn, *args, on_finished=None, on_failed=None, pool=None, **kwargs):
+    """Đưa fn(*args, **kwargs) vào pool (mặc định QThreadPool.globalInstance())
+
+    Args:
+        fn: Hàm cần chạy ở luồng nền (không được chạm vào widget)
+        on_finished: Callback nhận kết quả, chạy trên luồng giao diện
+        on_failed: Callback nhận thông báo lỗi (str), chạy trên luồng giao diện
+        pool: QThreadPool sử dụng
+
+    Returns:
+        BackgroundTask: Tác vụ đã được đưa vào pool
+    """
+    task = BackgroundTask(fn, *args, **kwargs)
+    if on_finished is not None:
+        task.signals.finished.connect(on_finished)
+    if on_failed is not None:
+        task.signals.failed.connect(on_failed)
+    _active_tasks.add(task)
+    (pool or QThreadPool.globalInstance()).start(task)
+    return task
+
+
+class ProcessTask(QObject):
+    """Chạy target(*args, queue) trong một tiến trình con (spawn) và chuyển tiếp thông điệp
+
+    target phải là hàm cấp module (pickle được) và gửi vào queue các tuple:
+    ('progress', done, total, message), rồi ('done', kết quả) hoặc ('error', thông báo).
+    Queue được đọc bằng QTimer trên luồng giao diện nên các signal phát ở luồng giao diện.
+    """
+    progress = pyqtSignal(int, int, str)
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+    POLL_INTERVAL = 100 # ms
+
+    def __init__(self, target, *args, parent=None, cleanup_paths=None):
+        super().__init__(parent)
+        # spawn: tiến trình con không kế thừa trạng thái Qt của tiến trình giao diện
+        context = multiprocessing.get_context('spawn')
+        self.queue = context.Queue()
+        self.process = context.Process(target=target, args=args + (self.queue,), daemon=True)
+        self.cleanup_paths = list(cleanup_paths or [])
+        self.timer = QTimer(self)
+        self.timer.setInterval(self.POLL_INTERVAL)
+        self.timer.timeout.connect(self.poll)
+        self.done = False
+
+    def start(self):
+        _active_tasks.add(self)
+        self.process.start()
+        self.timer.start()
+
+    def poll(self):
+        """Đọc hết thông điệp đang chờ; phát failed nếu tiến trình chết mà không báo kết quả"""
+        while not self.done:
+            try:
+                self._handle(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        if not self.done and not self.process.is_alive():
+            # Kiểm tra lần cuối: thông điệp có thể tới ngay sau khi tiến trình thoát
+            try:
+                self._handle(self.queue.get(timeout=0.2))
+            except queue.Empty:
+                self._finish()
+                self._remove_partial_files()
+                self.failed.emit(f"Tiến trình kết thúc bất thường (mã {self.process.exitcode})")
+
+    def _handle(self, message):
+        kind = message[0]
+        if kind == 'progress':
+            self.progress.emit(message[1], message[2], message[3])
+        elif kind == 'done':
+            self._finish()
+            self.finished.emit(message[1])
+        elif kind == 'error':
+            self._finish()
+            self._remove_partial_files()
+            self.failed.emit(message[1])
+
+    def cancel(self):
+        """Dừng tiến trình con và xóa các file dở dang"""
+        if self.done:
+            return
+        self._finish()
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join(1)
+        self._remove_partial_files()
+        logger.info("Đã hủy tác vụ tiến trình con")
+
+    def _finish(self):
+        self.done = True
+        self.timer.stop()
+        _active_tasks.discard(self)
+
+    def _remove_partial_files(self):
+        for path in self.cleanup_paths:
+            try:
+                if os.path.exists(path):
+                    os.remove(path)
+            except OSError as e:
+                logger.warning(f"Không thể xóa file tạm {path}: {e}")
+
+
+def run_in_process(target, *args, on_progress=None, on_finished=None, on_failed=None, parent=None, cleanup_paths=None):
+    """Tạo và khởi động một ProcessTask, kết nối các callback
+
+    Returns:
+        ProcessTask: Tác vụ đã khởi động (gọi cancel() để hủy)
+    """
+    task = ProcessTask(target, *args, parent=parent, cleanup_paths=cleanup_paths)
+    if on_progress is not None:
+        task.progress.connect(on_progress)
+    if on_finished is not None:
+        task.finished.connect(on_finished)
+    if on_failed is not None:
+        task.failed.connect(on_failed)
+    task.start()
+    return task
@@ -0,0 +1,184 @@
+"""
+Batch Reports
+=============
+
+Tạo báo cáo tài chính hàng loạt không cần giao diện (không import PyQt5), ví dụ báo cáo
+cuối tháng cho toàn bộ người dùng chạy qua đêm. Mỗi cặp (người dùng, kỳ) là một tác vụ
+trên ProcessPoolExecutor; mỗi tiến trình worker chỉ đọc dữ liệu một lần và dùng lại cho
+mọi tác vụ của nó. Sau khi chạy xong, một file summary.csv tổng hợp thu/chi của mọi báo cáo.
+
+Cách sử dụng:
+    python -m utils.batch_reports                              # Tháng trước, mọi người dùng
+    python -m utils.batch_reports --period month --year 2024 --month 3 --out reports
+    python -m utils.batch_reports --users u001 u002 --all-months --year 2024
+    python -m utils.batch_reports --format png --workers 4
+    python -m utils.batch_reports --summary-only               # Chỉ ghi summary.csv
+"""
+
+import argparse
+import csv
+import datetime
+import logging
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from utils.report_export import (build_report, monthly_reports, period_range, period_reports,
+                                 summarize, write_pdf, write_pngs)
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_FIELDS = ['user_id', 'user_name', 'period', 'start_date', 'end_date',
+                  'income', 'expense', 'balance', 'savings_rate', 'files', 'error']
+
+# Manager của tiến trình worker, tạo một lần trong _init_worker
+_managers = None
+
+
+def _init_worker():
+    """Tạo TransactionManager/CategoryManager một lần cho mỗi tiến trình worker"""
+    global _managers
+    from data_manager.category_manager import CategoryManager
+    from data_manager.transaction_manager import TransactionManager
+    _managers = (TransactionManager(), CategoryManager())
+
+
+def report_file_name(spec):
+    """Tên file (không có đuôi) của một báo cáo, ví dụ 'u001_2024-03'"""
+    start_date, _ = period_range(spec['period'], spec['year'], spec.get('month', 1))
+    if spec['period'] == 'year':
+        tag = str(start_date.year)
+    elif spec['period'] == 'quarter':
+        tag = f"{start_date.year}-Q{(start_date.month - 1) // 3 + 1}"
+    else:
+        tag = f"{start_date.year}-{start_date.month:02d}"
+    return f"{spec['user_id']}_{tag}"
+
+
+def run_report(spec, out_dir, file_format='pdf', dpi=300, type_index=0, summary_only=False):
+    """Tổng hợp và ghi một báo cáo (chạy trong tiến trình worker)
+
+    Returns:
+        dict: Một dòng của summary.csv (xem SUMMARY_FIELDS)
+    """
+    if _managers is None:
+        _init_worker()
+    transaction_manager, category_manager = _managers
+    start_date, end_date = period_range(spec['period'], spec['year'], spec.get('month', 1))
+    row = {'user_id': spec['user_id'], 'user_name': spec.get('user_name') or '', 'period': spec['period'],
+           'start_date': start_date.isoformat(), 'end_date': end_date.isoformat(), 'files': '', 'error': ''}
+    try:
+        report = build_report(spec, transaction_manager, category_manager, type_index)
+        row.update(summarize(report))
+        if not summary_only:
+            if file_format == 'pdf':
+                files = [write_pdf(os.path.join(out_dir, report_file_name(spec) + '.pdf'), [report])]
+            else:
+                files = write_pngs(os.path.join(out_dir, 'report.png'), spec, report, dpi=dpi)
+            row['files'] = ';'.join(os.path.basename(f) for f in files)
+    except Exception as e:
+        logger.error(f"Lỗi tạo báo cáo {report_file_name(spec)}: {e}")
+        row['error'] = str(e)
+    return row
+
+
+def list_users(user_ids=None):
+    """Các cặp (user_id, tên hiển thị) cần tạo báo cáo: người dùng chỉ định hoặc mọi tài khoản 'user'"""
+    from data_manager.user_manager import UserManager
+    users = UserManager().load_users()
+    if user_ids:
+        wanted = set(user_ids)
+        users = [u for u in users if u.get('user_id') in wanted]
+        missing = wanted - {u.get('user_id') for u in users}
+        if missing:
+            logger.warning(f"Không tìm thấy người dùng: {', '.join(sorted(missing))}")
+    else:
+        users = [u for u in users if u.get('role', 'user') == 'user']
+    return [(u['user_id'], u.get('full_name') or u.get('username') or u['user_id'])
+            for u in users if u.get('user_id')]
+
+
+def build_specs(users, period, year, month, all_months=False):
+    """Danh sách báo cáo cần tạo cho các người dùng"""
+    if all_months:
+        return [spec for user_id, name in users for spec in monthly_reports(user_id, year, name)]
+    return period_reports(users, period, year, month)
+
+
+def run_batch(specs, out_dir, file_format='pdf', dpi=300, type_index=0, workers=None, summary_only=False):
+    """Chạy song song các báo cáo trên một process pool và ghi summary.csv
+
+    Returns:
+        list: Các dòng summary theo thứ tự của specs
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    rows = [None] * len(specs)
+    started = time.perf_counter()
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker) as pool:
+        futures = {pool.submit(run_report, spec, out_dir, file_format, dpi, type_index, summary_only): i
+                   for i, spec in enumerate(specs)}
+        for done, future in enumerate(as_completed(futures), 1):
+            index = futures[future]
+            rows[index] = future.result()
+            status = f"lỗi: {rows[index]['error']}" if rows[index]['error'] else 'xong'
+            print(f"[{done}/{len(specs)}] {report_file_name(specs[index])} {status}", flush=True)
+
+    summary_path = os.path.join(out_dir, 'summary.csv')
+    with open(summary_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=SUMMARY_FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+    failed = sum(1 for row in rows if row['error'])
+    logger.info(f"Đã tạo {len(rows) - failed}/{len(rows)} báo cáo trong {time.perf_counter() - started:.1f}s "
+                f"với {workers} tiến trình, tổng hợp tại {summary_path}")
+    return rows
+
+
+def previous_month(today=None):
+    """(năm, tháng) của tháng trước, mặc định cho báo cáo cuối tháng"""
+    first_day = (today or datetime.date.today()).replace(day=1)
+    last_month = first_day - datetime.timedelta(days=1)
+    return last_month.year, last_month.month
+
+
+def parse_args(argv=None):
+    default_year, default_month = previous_month()
+    parser = argparse.ArgumentParser(prog='python -m utils.batch_reports',
+                                     description='Tạo báo cáo tài chính hàng loạt không cần giao diện')
+    parser.add_argument('--users', nargs='*', help='ID người dùng (mặc định: mọi tài khoản user)')
+    parser.add_argument('--period', choices=['month', 'quarter', 'year'], default='month')
+    parser.add_argument('--year', type=int, default=default_year)
+    parser.add_argument('--month', type=int, default=default_month, help='Tháng thuộc kỳ báo cáo (1-12)')
+    parser.add_argument('--all-months', action='store_true', help='Một báo cáo cho mỗi tháng của năm')
+    parser.add_argument('--format', choices=['pdf', 'png'], default='pdf')
+    parser.add_argument('--dpi', type=int, default=300, help='Độ phân giải PNG')
+    parser.add_argument('--type', choices=['all', 'income', 'expense'], default='all',
+                        help='Loại giao dịch đưa vào báo cáo')
+    parser.add_argument('--out', default='reports', help='Thư mục đích')
+    parser.add_argument('--workers', type=int, default=None, help='Số tiến trình (mặc định: số lõi CPU)')
+    parser.add_argument('--summary-only', action='store_true', help='Chỉ ghi summary.csv, không vẽ biểu đồ')
+    args = parser.parse_args(argv)
+    if not 1 <= args.month <= 12:
+        parser.error('--month phải trong khoảng 1-12')
+    return args
+
+
+def main(argv=None):
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    args = parse_args(argv)
+    users = list_users(args.users)
+    if not users:
+        print("Không có người dùng nào để tạo báo cáo")
+        return 1
+    specs = build_specs(users, args.period, args.year, args.month, args.all_months)
+    rows = run_batch(specs, args.out, args.format, args.dpi, ['all', 'income', 'expense'].index(args.type),
+                     args.workers, args.summary_only)
+    return 1 if any(row['error'] for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
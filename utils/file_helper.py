@@ -4,72 +4,334 @@ import json
 import os
 import re
 import logging
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
 from datetime import datetime
 
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
 # Cấu hình logging
 logger = logging.getLogger(__name__)
 
+# Quyền mặc định cho file mới (như open(..., 'w')): mkstemp luôn tạo file 0600
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+NEW_FILE_MODE = 0o666 & ~_UMASK
+
+class RecordStore:
+    """Bộ nhớ đệm dùng chung cho toàn tiến trình, giữ dữ liệu các file JSON đã phân tích
+
+    Mỗi file được đọc và phân tích một lần; các lần đọc sau chỉ so sánh mtime/size
+    của file với lần đọc trước và trả về dữ liệu trong bộ nhớ nếu file không đổi.
+    Khi lưu, dữ liệu được ghi xuống đĩa rồi cập nhật ngay vào bộ nhớ (write-through).
+
+    Dữ liệu trả về là bản sao của list gốc cùng bản sao của từng bản ghi (dict), nên
+    append/xóa phần tử hay sửa trường của bản ghi không ảnh hưởng tới bộ nhớ đệm cho tới
+    khi được lưu thành công bằng save_json. Giá trị lồng bên trong bản ghi (list/dict con)
+    vẫn dùng chung: cần gán giá trị mới thay vì sửa tại chỗ.
+
+    Việc ghi là nguyên tử: dữ liệu được ghi vào file tạm cùng thư mục, flush + fsync
+    rồi đổi tên đè lên file đích (os.replace), nên người đọc không bao giờ thấy file
+    ghi dở. Có thể giữ thêm các thế hệ sao lưu <file>.bak.1 (mới nhất) ... <file>.bak.N;
+    khi file chính bị hỏng, load() khôi phục từ thế hệ sao lưu hợp lệ gần nhất.
+    """
+
+    def __init__(self):
+        self._entries = {}  # đường dẫn tuyệt đối -> (signature, data)
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _key(file_path):
+        return os.path.abspath(file_path)
+
+    @staticmethod
+    def _signature(path):
+        """Trả về (mtime_ns, size) của file, hoặc None nếu file không tồn tại"""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    @staticmethod
+    def backup_path(file_path, generation):
+        """Đường dẫn file sao lưu thế hệ thứ generation (1 là mới nhất)"""
+        return f"{file_path}.bak.{generation}"
+
+    @staticmethod
+    def _copy(data):
+        if isinstance(data, list):
+            return [dict(item) if isinstance(item, dict) else item for item in data]
+        if isinstance(data, dict):
+            return dict(data)
+        return data
+
+    def load(self, file_path):
+        """Đọc dữ liệu của file, chỉ phân tích lại khi file đã thay đổi trên đĩa
+
+        Raises:
+            FileNotFoundError: Nếu file không tồn tại
+            json.JSONDecodeError: Nếu nội dung file không hợp lệ
+        """
+        key = self._key(file_path)
+        with self._lock:
+            signature = self._signature(key)
+            if signature is None:
+                self._entries.pop(key, None)
+                raise FileNotFoundError(file_path)
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == signature:
+                return self._copy(entry[1])
+            try:
+                with open(key, 'r', encoding='utf-8') as file:
+                    data = json.load(file)
+            except (json.JSONDecodeError, UnicodeDecodeError) as e:
+                # Không lưu vào bộ nhớ đệm: file chính vẫn hỏng cho tới lần lưu kế tiếp
+                self._entries.pop(key, None)
+                return self._copy(self._recover(key, e))
+            self._entries[key] = (signature, data)
+            logger.debug(f"Đã nạp lại file vào bộ nhớ đệm: {key}")
+            return self._copy(data)
+
+    def _recover(self, key, error):
+        """Đọc thế hệ sao lưu hợp lệ gần nhất khi file chính bị hỏng
+
+        Raises:
+            json.JSONDecodeError: Lỗi ban đầu nếu không có bản sao lưu nào đọc được
+        """
+        generation = 1
+        while os.path.exists(self.backup_path(key, generation)):
+            backup = self.backup_path(key, generation)
+            try:
+                with open(backup, 'r', encoding='utf-8') as file:
+                    data = json.load(file)
+            except (ValueError, OSError) as e:
+                logger.warning(f"Bản sao lưu {backup} cũng không đọc được: {e}")
+                generation += 1
+                continue
+            logger.error(f"File {key} bị hỏng ({error}), đã khôi phục dữ liệu từ {backup}")
+            return data
+        if isinstance(error, json.JSONDecodeError):
+            raise error
+        raise json.JSONDecodeError(str(error), '', 0)
+
+    def _is_valid(self, key):
+        """File hiện tại có phải JSON hợp lệ không (dựa vào bộ nhớ đệm nếu có thể)"""
+        signature = self._signature(key)
+        if signature is None:
+            return False
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == signature:
+            return True
+        try:
+            with open(key, 'r', encoding='utf-8') as file:
+                json.load(file)
+            return True
+        except (ValueError, OSError):
+            return False
+
+    def _rotate_backups(self, key, generations):
+        """Dịch các thế hệ sao lưu (.bak.1 -> .bak.2 ...) và sao lưu file hiện tại vào .bak.1"""
+        if not self._is_valid(key):
+            return
+        for generation in range(generations, 1, -1):
+            older = self.backup_path(key, generation - 1)
+            if os.path.exists(older):
+                os.replace(older, self.backup_path(key, generation))
+        newest = self.backup_path(key, 1)
+        if os.path.exists(newest):
+            os.remove(newest)
+        try:
+            # Liên kết cứng giữ nguyên nội dung cũ vì file chính sẽ được thay bằng inode mới
+            os.link(key, newest)
+        except OSError:
+            shutil.copy2(key, newest)
+
+    @staticmethod
+    def _fsync_dir(directory):
+        """Đồng bộ thư mục để thao tác đổi tên được ghi bền vững (chỉ trên POSIX)"""
+        if os.name != 'posix':
+            return
+        try:
+            fd = os.open(directory, os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+    def save(self, file_path, data, backups=0):
+        """Ghi nguyên tử dữ liệu xuống file và cập nhật bộ nhớ đệm
+
+        Args:
+            backups (int): Số thế hệ sao lưu .bak.N cần giữ (0 = không sao lưu)
+        """
+        key = self._key(file_path)
+        directory = os.path.dirname(key)
+        with self._lock:
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(key)}.", suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as file:
+                    json.dump(data, file, ensure_ascii=False, indent=2)
+                    file.flush()
+                    os.fsync(file.fileno())
+                if os.path.exists(key):
+                    shutil.copymode(key, tmp_path)
+                else:
+                    os.chmod(tmp_path, NEW_FILE_MODE)
+                if backups > 0 and os.path.exists(key):
+                    self._rotate_backups(key, backups)
+                os.replace(tmp_path, key)
+            except Exception:
+                self._entries.pop(key, None)
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+            self._fsync_dir(directory)
+            self._entries[key] = (self._signature(key), self._copy(data))
+
+    def invalidate(self, file_path=None):
+        """Xóa bộ nhớ đệm của một file, hoặc của tất cả file nếu không truyền đường dẫn"""
+        with self._lock:
+            if file_path is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(self._key(file_path), None)
+
+
+record_store = RecordStore()
+
 def load_json(file_path):
-    """Đọc dữ liệu từ file JSON
+    """Đọc dữ liệu từ file JSON (qua bộ nhớ đệm record_store)
     
     Args:
         file_path (str): Đường dẫn đến file JSON cần đọc
         
+    Nếu file bị hỏng, dữ liệu được khôi phục từ bản sao lưu .bak.N hợp lệ gần nhất.
+    
     Returns:
         list/dict: Dữ liệu đọc được từ file JSON, trả về list rỗng nếu có lỗi
+            và không có bản sao lưu nào dùng được
     """
     try:
         if os.path.exists(file_path):
-            with open(file_path, 'r', encoding='utf-8') as file:
-                return json.load(file)
+            return record_store.load(file_path)
         logger.warning(f"File không tồn tại: {file_path}")
         return []
     except (json.JSONDecodeError, FileNotFoundError) as e:
         logger.error(f"Lỗi khi đọc file {file_path}: {e}")
         return []
 
-def save_json(file_path, data):
-    """Lưu dữ liệu vào file JSON
+def save_json(file_path, data, backups=0):
+    """Lưu dữ liệu vào file JSON (ghi nguyên tử xuống đĩa và cập nhật record_store)
     
     Args:
         file_path (str): Đường dẫn đến file JSON cần lưu
         data (list/dict): Dữ liệu cần lưu
+        backups (int, optional): Số thế hệ sao lưu .bak.N cần giữ (mặc định không sao lưu);
+            repository của dữ liệu người dùng truyền database.backup_generations trong config.json
         
     Returns:
         bool: True nếu lưu thành công, False nếu có lỗi
     """
     try:
         # Tạo thư mục nếu chưa tồn tại
-        os.makedirs(os.path.dirname(file_path), exist_ok=True)
-        
-        with open(file_path, 'w', encoding='utf-8') as file:
-            json.dump(data, file, ensure_ascii=False, indent=2)
+        os.makedirs(os.path.dirname(os.path.abspath(file_path)), exist_ok=True)
+        record_store.save(file_path, data, backups=backups)
         logger.debug(f"Đã lưu dữ liệu vào file: {file_path}")
         return True
     except Exception as e:
         logger.error(f"Lỗi khi lưu file {file_path}: {e}")
         return False
 
-def generate_id(prefix=None, data_list=None, id_field=None):
-    """Tạo ID tự động dựa trên prefix, danh sách hiện có và trường id tùy chọn
+def append_jsonl(file_path, records):
+    """Ghi thêm các bản ghi vào cuối file JSON-lines (mỗi dòng một đối tượng JSON)
     
     Args:
-        prefix (str, optional): Tiền tố cho ID (mặc định: "id")
-        data_list (list, optional): Danh sách dữ liệu để tìm ID lớn nhất
-        id_field (str, optional): Tên trường chứa ID trong dữ liệu
+        file_path (str): Đường dẫn đến file JSON-lines
+        records (list): Danh sách bản ghi cần ghi thêm
         
     Returns:
-        str: ID mới được tạo theo định dạng prefix_XXX
+        bool: True nếu ghi thành công, False nếu có lỗi
     """
-    if data_list is None:
-        data_list = []
-    if not prefix:
-        prefix = "id"
-    if not data_list:
-        return f"{prefix}_001"
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(file_path)), exist_ok=True)
+        lines = ''.join(json.dumps(record, ensure_ascii=False) + '\n' for record in records)
+        with open(file_path, 'a', encoding='utf-8') as file:
+            file.write(lines)
+            file.flush()
+        return True
+    except Exception as e:
+        logger.error(f"Lỗi khi ghi thêm vào file {file_path}: {e}")
+        return False
+
+def read_jsonl(file_path, offset=0):
+    """Đọc các bản ghi từ file JSON-lines bắt đầu tại vị trí byte offset
+    
+    Dòng cuối chưa ghi xong (không có ký tự xuống dòng) sẽ được bỏ qua và đọc lại
+    ở lần sau; các dòng hỏng được ghi log và bỏ qua.
     
+    Args:
+        file_path (str): Đường dẫn đến file JSON-lines
+        offset (int): Vị trí byte bắt đầu đọc
+        
+    Returns:
+        tuple: (danh sách bản ghi, vị trí byte đã đọc tới)
+    """
+    records = []
+    try:
+        with open(file_path, 'rb') as file:
+            file.seek(offset)
+            chunk = file.read()
+    except FileNotFoundError:
+        return records, 0
+    except Exception as e:
+        logger.error(f"Lỗi khi đọc file {file_path}: {e}")
+        return records, offset
+
+    end = chunk.rfind(b'\n') + 1
+    for line in chunk[:end].splitlines():
+        if not line.strip():
+            continue
+        try:
+            records.append(json.loads(line.decode('utf-8')))
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            logger.warning(f"Bỏ qua dòng không hợp lệ trong {file_path}: {e}")
+    return records, offset + end
+
+def get_config_value(section, key, default=None):
+    """Lấy giá trị cấu hình từ data/config.json
+    
+    Args:
+        section (str): Tên nhóm cấu hình (vd: 'database', 'security')
+        key (str): Tên khóa cấu hình trong nhóm
+        default: Giá trị mặc định nếu không tìm thấy
+        
+    Returns:
+        Giá trị cấu hình hoặc default
+    """
+    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    config_path = os.path.join(base_dir, 'data', 'config.json')
+    if not os.path.exists(config_path):
+        return default
+    config = load_json(config_path)
+    if not isinstance(config, dict):
+        return default
+    return config.get(section, {}).get(key, default)
+
+def _max_id_number(prefix, data_list, id_field=None):
+    """Tìm số thứ tự lớn nhất của các ID dạng prefix_XXX trong danh sách (duyệt toàn bộ)"""
     max_num = 0
-    for item in data_list:
+    for item in data_list or []:
         id_val = None
         if id_field and id_field in item and item[id_field] is not None and str(item[id_field]).startswith(prefix):
             id_val = item[id_field]
@@ -88,7 +350,111 @@ def generate_id(prefix=None, data_list=None, id_field=None):
                 max_num = max(max_num, num)
             except (ValueError, IndexError):
                 continue
-    new_id = f"{prefix}_{max_num + 1:03d}"
+    return max_num
+
+
+@contextmanager
+def _exclusive_file_lock(lock_path):
+    """Khóa độc quyền giữa các tiến trình bằng một file khóa (flock trên POSIX, msvcrt trên Windows)"""
+    with open(lock_path, 'a+b') as handle:
+        if fcntl is not None:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+        else:
+            handle.seek(0)
+            msvcrt.locking(handle.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+            else:
+                handle.seek(0)
+                msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class IdAllocator:
+    """Cấp phát ID tuần tự theo tiền tố (prefix_001, prefix_002, ...) trong thời gian O(1)
+
+    Số thứ tự đã cấp của mỗi tiền tố được lưu trong data/sequences.json. Lần đầu gặp
+    một tiền tố, số thứ tự được khôi phục một lần từ dữ liệu hiện có (seed). Mỗi lần
+    cấp phát đọc và ghi file sequences dưới khóa file, nên an toàn khi nhiều tiến trình
+    cùng cấp phát.
+    """
+
+    def __init__(self, file_path=None):
+        if file_path is None:
+            base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+            file_path = os.path.join(base_dir, 'data', 'sequences.json')
+        self.file_path = os.path.abspath(file_path)
+        self.lock_path = self.file_path + '.lock'
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def format_id(prefix, number):
+        return f"{prefix}_{number:03d}"
+
+    def _read_sequences(self):
+        # Đọc trực tiếp (không qua record_store) vì tiến trình khác có thể vừa ghi
+        # mà mtime/size không đổi
+        try:
+            with open(self.file_path, 'r', encoding='utf-8') as file:
+                sequences = json.load(file)
+            return sequences if isinstance(sequences, dict) else {}
+        except FileNotFoundError:
+            return {}
+        except (ValueError, OSError) as e:
+            logger.warning(f"Không đọc được {self.file_path}, sẽ khôi phục số thứ tự từ dữ liệu: {e}")
+            return {}
+
+    def reserve(self, prefix, count, seed=None, id_field=None):
+        """Giữ trước một khối count ID liên tiếp, dùng cho thêm hàng loạt
+
+        Args:
+            prefix (str): Tiền tố ID
+            count (int): Số ID cần cấp
+            seed: Danh sách bản ghi hiện có, hoặc hàm trả về danh sách đó; chỉ được dùng
+                khi tiền tố chưa có trong sequences.json
+            id_field (str, optional): Tên trường chứa ID trong bản ghi seed
+
+        Returns:
+            list: Các ID đã cấp theo thứ tự tăng dần
+        """
+        if count <= 0:
+            return []
+        os.makedirs(os.path.dirname(self.file_path), exist_ok=True)
+        with self._lock, _exclusive_file_lock(self.lock_path):
+            sequences = self._read_sequences()
+            last = sequences.get(prefix)
+            if not isinstance(last, int):
+                records = seed() if callable(seed) else seed
+                last = _max_id_number(prefix, records, id_field)
+                logger.info(f"Khôi phục số thứ tự ID '{prefix}' từ dữ liệu hiện có: {last}")
+            sequences[prefix] = last + count
+            record_store.save(self.file_path, sequences)
+        return [self.format_id(prefix, number) for number in range(last + 1, last + count + 1)]
+
+    def next_id(self, prefix, seed=None, id_field=None):
+        """Cấp một ID mới cho tiền tố (xem reserve)"""
+        return self.reserve(prefix, 1, seed=seed, id_field=id_field)[0]
+
+
+id_allocator = IdAllocator()
+
+def generate_id(prefix=None, data_list=None, id_field=None):
+    """Tạo ID tự động theo prefix bằng bộ cấp phát id_allocator
+    
+    Args:
+        prefix (str, optional): Tiền tố cho ID (mặc định: "id")
+        data_list (list, optional): Danh sách dữ liệu hiện có, chỉ dùng để khôi phục
+            số thứ tự khi prefix chưa được cấp phát lần nào
+        id_field (str, optional): Tên trường chứa ID trong dữ liệu
+        
+    Returns:
+        str: ID mới được tạo theo định dạng prefix_XXX
+    """
+    if not prefix:
+        prefix = "id"
+    new_id = id_allocator.next_id(prefix, seed=data_list, id_field=id_field)
     logger.debug(f"Đã tạo ID mới: {new_id}")
     return new_id
 
@@ -0,0 +1,117 @@
+"""
+Import Benchmark
+================
+
+Đo thời gian import của từng module khi khởi động, mỗi module trong một tiến trình
+Python mới (dùng -X importtime) để kết quả không bị ảnh hưởng bởi module đã nạp trước.
+Đồng thời cho biết module đó có kéo theo matplotlib hay không.
+
+Cách sử dụng:
+    python -m utils.import_benchmark                      # Các module mặc định
+    python -m utils.import_benchmark main gui.auth.login_form
+    python -m utils.import_benchmark --repeat 5
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+
+# Các module ảnh hưởng tới thời gian khởi động, theo thứ tự được nạp khi chạy ứng dụng
+DEFAULT_MODULES = [
+    'PyQt5.QtWidgets',
+    'main',
+    'gui.auth.login_form',
+    'gui.admin.admin_dashboard',
+    'gui.user.user_dashboard',
+    'gui.user.user_overview_tab',
+    'gui.user.user_transaction_tab',
+    'gui.user.user_budget_tab',
+    'gui.user.user_report_tab',
+    'data_manager.user_manager',
+    'data_manager.transaction_manager',
+    'matplotlib',
+    'matplotlib.pyplot',
+]
+
+# Module nặng cần theo dõi xem có bị import sớm hay không
+HEAVY_MODULES = ['matplotlib', 'mplcursors']
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure_import(module, repeat=3):
+    """Đo thời gian import một module trong tiến trình mới
+
+    Args:
+        module: Tên module (dạng import được, ví dụ 'gui.user.user_report_tab')
+        repeat: Số lần đo, lấy lần nhanh nhất
+
+    Returns:
+        dict: {'module', 'self_ms', 'cumulative_ms', 'heavy' (module nặng đã bị nạp), 'error'}
+    """
+    code = f"import sys, {module}; print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    env = dict(os.environ)
+    env['PYTHONPATH'] = BASE_DIR + os.pathsep + env.get('PYTHONPATH', '')
+    env.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    best = None
+    # Chạy trong thư mục tạm: một số module (main) tạo file log ở thư mục hiện tại
+    with tempfile.TemporaryDirectory() as work_dir:
+        for _ in range(max(1, repeat)):
+            proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                                  cwd=work_dir, env=env, capture_output=True, text=True)
+            if proc.returncode != 0:
+                error = proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else f"exit {proc.returncode}"
+                return {'module': module, 'self_ms': None, 'cumulative_ms': None, 'heavy': '', 'error': error}
+            timing = _parse_importtime(proc.stderr, module)
+            if timing and (best is None or timing[1] < best[1]):
+                best = timing
+                heavy = proc.stdout.strip()
+    if best is None:
+        # Module đã được nạp bởi chính trình thông dịch (không có dòng importtime)
+        return {'module': module, 'self_ms': 0.0, 'cumulative_ms': 0.0, 'heavy': '', 'error': None}
+    return {'module': module, 'self_ms': best[0] / 1000, 'cumulative_ms': best[1] / 1000,
+            'heavy': heavy, 'error': None}
+
+
+def _parse_importtime(stderr, module):
+    """Lấy (self_us, cumulative_us) của module từ đầu ra -X importtime"""
+    result = None
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) != 3 or parts[2].strip() != module:
+            continue
+        try:
+            result = (int(parts[0]), int(parts[1]))
+        except ValueError:
+            continue
+    return result
+
+
+def run_benchmark(modules=None, repeat=3):
+    """Đo lần lượt các module và in bảng kết quả
+
+    Returns:
+        list: Kết quả measure_import cho từng module
+    """
+    results = [measure_import(module, repeat) for module in (modules or DEFAULT_MODULES)]
+    width = max(len(r['module']) for r in results)
+    print(f"{'Module':<{width}}  {'Tổng (ms)':>10}  {'Riêng (ms)':>10}  Module nặng đã nạp")
+    for r in results:
+        if r['error']:
+            print(f"{r['module']:<{width}}  {'lỗi':>10}  {'':>10}  {r['error']}")
+        else:
+            print(f"{r['module']:<{width}}  {r['cumulative_ms']:>10.1f}  {r['self_ms']:>10.1f}  {r['heavy'] or '-'}")
+    return results
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    repeat = 3
+    if '--repeat' in args:
+        i = args.index('--repeat')
+        repeat = int(args[i + 1])
+        del args[i:i + 2]
+    run_benchmark(args or None, repeat)
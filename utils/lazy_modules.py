@@ -0,0 +1,80 @@
+"""
+Lazy Modules
+============
+
+Module nạp trễ matplotlib: chỉ import khi một biểu đồ thực sự được tạo (mở tab báo cáo,
+ngân sách, tổng quan admin) thay vì lúc khởi động, để cửa sổ đăng nhập hiện ngay.
+Mỗi hàm chỉ import một lần, các lần gọi sau trả về đối tượng đã nạp.
+
+Các thành phần chính:
+- matplotlib_available: Kiểm tra đã cài matplotlib hay chưa (không import)
+- load_matplotlib: Import matplotlib và chọn backend Agg cho pyplot
+- figure_classes: (Figure, FigureCanvasQTAgg) để nhúng biểu đồ vào Qt
+- load_pyplot, load_ticker, load_pdf_pages: Các module con dùng khi vẽ/xuất báo cáo
+
+Cách sử dụng:
+    from utils.lazy_modules import figure_classes
+
+    Figure, FigureCanvas = figure_classes()
+    self.figure = Figure(figsize=(5, 4))
+    self.canvas = FigureCanvas(self.figure)
+"""
+
+import importlib.util
+import logging
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=None)
+def matplotlib_available():
+    """True nếu matplotlib đã được cài đặt (chỉ tìm module, không import)"""
+    return importlib.util.find_spec('matplotlib') is not None
+
+
+@lru_cache(maxsize=None)
+def load_matplotlib():
+    """Import matplotlib một lần và chọn backend Agg
+
+    pyplot chỉ dùng để vẽ ra file khi xuất báo cáo; biểu đồ trên giao diện dùng
+    FigureCanvasQTAgg trực tiếp nên không phụ thuộc backend của pyplot.
+
+    Raises:
+        ImportError: Nếu chưa cài matplotlib
+    """
+    import matplotlib
+    matplotlib.use('Agg')
+    logger.debug(f"Đã nạp matplotlib {matplotlib.__version__}")
+    return matplotlib
+
+
+@lru_cache(maxsize=None)
+def figure_classes():
+    """Trả về (Figure, FigureCanvasQTAgg)"""
+    load_matplotlib()
+    from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg
+    from matplotlib.figure import Figure
+    return Figure, FigureCanvasQTAgg
+
+
+@lru_cache(maxsize=None)
+def load_pyplot():
+    load_matplotlib()
+    import matplotlib.pyplot as plt
+    return plt
+
+
+@lru_cache(maxsize=None)
+def load_ticker():
+    load_matplotlib()
+    import matplotlib.ticker as ticker
+    return ticker
+
+
+@lru_cache(maxsize=None)
+def load_pdf_pages():
+    """Trả về lớp PdfPages của backend PDF"""
+    load_matplotlib()
+    from matplotlib.backends.backend_pdf import PdfPages
+    return PdfPages
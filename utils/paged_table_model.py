@@ -0,0 +1,74 @@
+"""
+Paged Table Model
+=================
+
+Model bảng cho QTableView chỉ giữ các dòng đã tải: view xin thêm trang qua
+canFetchMore/fetchMore khi cuộn, nên bảng lớn (giao dịch, nhật ký) không phải
+đọc và định dạng toàn bộ dữ liệu một lần.
+
+Lớp con khai báo HEADERS và cài đặt:
+- fetch_page(offset, limit): Trả về list các bản ghi của trang (ít hơn limit nghĩa là hết dữ liệu)
+- data(index, role): Định dạng ô từ self._rows
+
+Cách sử dụng:
+    class AuditLogTableModel(PagedTableModel):
+        HEADERS = ["Thời gian", "Người dùng", "Hành động"]
+
+        def fetch_page(self, offset, limit):
+            return self.audit_log_manager.get_logs_page(offset=offset, limit=limit)
+"""
+
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex
+
+
+class PagedTableModel(QAbstractTableModel):
+    """Model bảng tải dữ liệu theo trang khi cuộn
+
+    Lớp con cài đặt fetch_page(offset, limit) trả về tối đa limit bản ghi bắt đầu từ vị trí
+    offset của truy vấn hiện tại, và data() để định dạng ô từ self._rows.
+    """
+    HEADERS = []
+    PAGE_SIZE = 200
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._rows = []
+        self._exhausted = True # Chưa có truy vấn cho tới lần reload() đầu tiên
+
+    def reload(self):
+        """Bỏ các dòng đã tải và tải trang đầu của truy vấn hiện tại"""
+        self.beginResetModel()
+        self._rows = []
+        self._exhausted = False
+        self.endResetModel()
+        self.fetchMore(QModelIndex())
+
+    def row_at(self, row):
+        return self._rows[row] if 0 <= row < len(self._rows) else None
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def canFetchMore(self, parent):
+        return not parent.isValid() and not self._exhausted
+
+    def fetchMore(self, parent):
+        if parent.isValid() or self._exhausted:
+            return
+        page = self.fetch_page(len(self._rows), self.PAGE_SIZE)
+        # Trang thiếu nghĩa là truy vấn đã hết dòng, không cần đếm toàn bộ để cuộn
+        self._exhausted = len(page) < self.PAGE_SIZE
+        if not page:
+            return
+        start = len(self._rows)
+        self.beginInsertRows(QModelIndex(), start, start + len(page) - 1)
+        self._rows.extend(page)
+        self.endInsertRows()
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal and 0 <= section < len(self.HEADERS):
+            return self.HEADERS[section]
+        return None
@@ -0,0 +1,433 @@
+"""
+Report Export
+=============
+
+Xuất báo cáo tài chính ra PDF nhiều trang hoặc ảnh PNG mà không cần Qt, để chạy trong
+một tiến trình riêng (không chặn giao diện) hoặc từ dòng lệnh. Mỗi trang được vẽ, ghi
+xuống đĩa rồi giải phóng ngay (PdfPages ghi từng trang), nên bộ nhớ không tăng theo số
+báo cáo trong một lô.
+
+Các thành phần chính:
+- period_range / period_title / period_labels: Khoảng ngày, tiêu đề và nhãn trục của một kỳ
+- period_reports / monthly_reports: Tạo danh sách báo cáo cho một lô (mọi tháng, mọi người dùng)
+- build_report: Tổng hợp dữ liệu một báo cáo từ TransactionManager/CategoryManager
+- summarize: Thu, chi, chênh lệch và tỷ lệ tiết kiệm của một báo cáo
+- setup_income_expense_axes / set_income_expense_values, setup_trend_axes / update_trend,
+  draw_category_pie: Vẽ từng biểu đồ trên một Axes; tab báo cáo dùng chung để biểu đồ trên
+  màn hình và biểu đồ xuất ra giống nhau
+- iter_report_figures: Vẽ lần lượt các trang của một báo cáo
+- write_pdf / write_pngs: Ghi các trang đã vẽ ra PDF (ghi nguyên tử) hoặc PNG
+- export_reports: Chạy một job xuất, gọi progress(done, total, message) sau mỗi trang
+- run_export_job: Điểm vào cho tiến trình con, gửi tiến độ qua multiprocessing.Queue
+
+Job xuất là một dict:
+    {
+        'format': 'pdf' hoặc 'png',
+        'path': File PDF đích, hoặc đường dẫn gốc cho các file PNG,
+        'charts': Tên các trang trong CHARTS (mặc định tất cả),
+        'type_index': 0 = thu và chi, 1 = chỉ thu, 2 = chỉ chi,
+        'dpi': Độ phân giải PNG (mặc định 300),
+        'reports': [{'user_id', 'user_name', 'period', 'year', 'month'}, ...]
+    }
+"""
+
+import datetime
+import logging
+import os
+import traceback
+
+from utils.lazy_modules import load_matplotlib, load_pdf_pages, load_ticker
+
+logger = logging.getLogger(__name__)
+
+# Các trang của một báo cáo theo thứ tự xuất
+CHARTS = ['summary', 'income_expense', 'trend', 'income_category', 'expense_category']
+
+# Độ chi tiết của đường xu hướng theo loại kỳ (xem TransactionManager.aggregate)
+GRANULARITY = {'month': 'day', 'quarter': 'week', 'year': 'month'}
+
+INCOME_COLOR = '#10b981'
+EXPENSE_COLOR = '#ef4444'
+BALANCE_FILL_COLOR = '#bfdbfe'
+INCOME_COLORS = ['#10b981', '#3b82f6', '#8b5cf6', '#ec4899', '#f97316', '#eab308', '#06b6d4']
+EXPENSE_COLORS = ['#ef4444', '#f97316', '#eab308', '#84cc16', '#06b6d4', '#8b5cf6', '#ec4899']
+# Biểu đồ tròn theo danh mục: (màu, tiêu đề, chữ khi không có dữ liệu, chữ khi bị bộ lọc ẩn)
+CATEGORY_PIES = {
+    'income': (INCOME_COLORS, 'Thu nhập theo danh mục',
+               'Không có dữ liệu thu nhập trong giai đoạn này', 'Đã lọc: không hiển thị thu nhập'),
+    'expense': (EXPENSE_COLORS, 'Chi tiêu theo danh mục',
+                'Không có dữ liệu chi tiêu trong giai đoạn này', 'Đã lọc: không hiển thị chi tiêu'),
+}
+TREND_TITLES = ['Xu hướng thu nhập và chi tiêu theo thời gian', 'Xu hướng thu nhập theo thời gian',
+                'Xu hướng chi tiêu theo thời gian']
+
+
+def period_range(period, year, month=1):
+    """Ngày đầu và ngày cuối của kỳ báo cáo
+
+    Args:
+        period: 'month', 'quarter' hoặc 'year'
+        year, month: Tháng bất kỳ thuộc kỳ (bỏ qua với 'year')
+
+    Returns:
+        tuple: (datetime.date, datetime.date)
+    """
+    if period == 'month':
+        start_month, months = month, 1
+    elif period == 'quarter':
+        start_month, months = (month - 1) // 3 * 3 + 1, 3
+    else:
+        start_month, months = 1, 12
+    start_date = datetime.date(year, start_month, 1)
+    end_code = year * 12 + start_month - 1 + months
+    end_date = datetime.date(end_code // 12, end_code % 12 + 1, 1) - datetime.timedelta(days=1)
+    return start_date, end_date
+
+
+def period_title(period, start_date):
+    """Tiêu đề của kỳ báo cáo, ví dụ 'Tháng 3/2024', 'Quý 1/2024', 'Năm 2024'"""
+    if period == 'month':
+        return f"Tháng {start_date.month}/{start_date.year}"
+    if period == 'quarter':
+        return f"Quý {(start_date.month - 1) // 3 + 1}/{start_date.year}"
+    return f"Năm {start_date.year}"
+
+
+def period_labels(period, periods):
+    """Nhãn trục thời gian cho các khoảng do TransactionManager.aggregate trả về"""
+    if period == 'month':
+        return [p.strftime("%d/%m") for p in periods] # Theo ngày
+    if period == 'quarter':
+        return [f"T{p.isocalendar()[1]}" for p in periods] # Theo tuần
+    return [f"{p.month}/{p.year}" for p in periods] # Theo tháng
+
+
+def period_reports(users, period, year, month=1):
+    """Một báo cáo cho mỗi người dùng trong cùng một kỳ
+
+    Args:
+        users: Các cặp (user_id, tên hiển thị)
+    """
+    return [{'user_id': user_id, 'user_name': name, 'period': period, 'year': year, 'month': month}
+            for user_id, name in users]
+
+
+def monthly_reports(user_id, year, user_name=None):
+    """Mười hai báo cáo tháng của một năm cho một người dùng"""
+    return [{'user_id': user_id, 'user_name': user_name, 'period': 'month', 'year': year, 'month': month}
+            for month in range(1, 13)]
+
+
+def type_filter(type_index):
+    """(hiện thu nhập, hiện chi tiêu) theo chỉ số bộ lọc loại giao dịch"""
+    return type_index in (0, 1), type_index in (0, 2)
+
+
+def group_totals_by_name(totals_by_id, category_manager):
+    """Gộp tổng theo danh mục thành tổng theo tên hiển thị"""
+    totals_by_name = {}
+    categories = category_manager.get_categories_by_ids(totals_by_id)
+    for category_id, amount in totals_by_id.items():
+        category = categories.get(category_id)
+        category_name = category.get('name', 'Khác') if category else 'Khác'
+        totals_by_name[category_name] = totals_by_name.get(category_name, 0) + amount
+    return totals_by_name
+
+
+def build_report(spec, transaction_manager, category_manager, type_index=0):
+    """Tổng hợp dữ liệu của một báo cáo (chỉ gồm số liệu và chuỗi, dễ truyền giữa tiến trình)
+
+    Args:
+        spec: {'user_id', 'user_name', 'period', 'year', 'month'}
+        type_index: Bộ lọc loại giao dịch (xem type_filter)
+
+    Returns:
+        dict: title, income, expense, labels, series, income_categories, expense_categories
+    """
+    period = spec.get('period', 'month')
+    start_date, end_date = period_range(period, spec['year'], spec.get('month', 1))
+    data = transaction_manager.aggregate(spec['user_id'], start_date, end_date,
+                                         granularity=GRANULARITY.get(period), group_by='category')
+    show_income, show_expense = type_filter(type_index)
+    title = f"Báo cáo tài chính - {period_title(period, start_date)}"
+    if spec.get('user_name'):
+        title += f" - {spec['user_name']}"
+    return {
+        'title': title,
+        'period': period,
+        'type_index': type_index,
+        'income': data['totals']['income'] if show_income else 0,
+        'expense': data['totals']['expense'] if show_expense else 0,
+        'labels': period_labels(period, data['periods']),
+        'series': data['series'],
+        'income_categories': group_totals_by_name(data['categories']['income'], category_manager) if show_income else None,
+        'expense_categories': group_totals_by_name(data['categories']['expense'], category_manager) if show_expense else None,
+    }
+
+
+def _money(value):
+    return f"{value:,.0f}đ"
+
+
+def summarize(report):
+    """Số liệu tóm tắt của báo cáo: thu, chi, chênh lệch và tỷ lệ tiết kiệm (%)"""
+    income, expense = report['income'], report['expense']
+    balance = income - expense
+    return {
+        'income': income,
+        'expense': expense,
+        'balance': balance,
+        'savings_rate': balance / income * 100 if income > 0 else 0,
+    }
+
+
+def _draw_summary(figure, report):
+    ax = figure.add_subplot(111)
+    ax.axis('off')
+    ax.text(0.5, 0.95, report['title'], fontsize=16, ha='center', weight='bold')
+    summary = summarize(report)
+    summary_text = (f"Thu nhập: {_money(summary['income'])}\n"
+                    f"Chi tiêu: {_money(summary['expense'])}\n"
+                    f"Chênh lệch: {_money(summary['balance'])}\n"
+                    f"Tỷ lệ tiết kiệm: {summary['savings_rate']:.1f}%")
+    ax.text(0.5, 0.8, summary_text, fontsize=12, ha='center', va='top', linespacing=1.8)
+
+
+def money_formatter():
+    """Định dạng trục số tiền: 1,234,000đ"""
+    return load_ticker().FuncFormatter(lambda x, p: f'{int(x):,}đ')
+
+
+def setup_income_expense_axes(ax):
+    """Dựng biểu đồ cột thu nhập/chi tiêu (giá trị 0) trên ax
+
+    Returns:
+        dict: Các artist {'ax', 'bars', 'texts'} để cập nhật bằng set_income_expense_values
+    """
+    bars = ax.bar(['Thu nhập', 'Chi tiêu'], [0, 0], color=[INCOME_COLOR, EXPENSE_COLOR], width=0.5)
+    ax.set_ylabel('Số tiền (VNĐ)', fontdict={'fontsize': 12})
+    ax.yaxis.set_major_formatter(money_formatter())
+    ax.grid(True, axis='y', linestyle='--', alpha=0.7)
+    ax.spines['top'].set_visible(False)
+    ax.spines['right'].set_visible(False)
+    ax.spines['left'].set_color('#d1d5db')
+    ax.spines['bottom'].set_color('#d1d5db')
+    texts = [ax.text(bar.get_x() + bar.get_width() / 2.0, 0, '', va='bottom', ha='center', fontsize=11, weight='bold')
+             for bar in bars]
+    return {'ax': ax, 'bars': bars, 'texts': texts}
+
+
+def set_income_expense_values(artists, values):
+    """Đặt chiều cao cột và nhãn giá trị [thu nhập, chi tiêu]"""
+    for bar, text, value in zip(artists['bars'], artists['texts'], values):
+        bar.set_height(value)
+        text.set_position((bar.get_x() + bar.get_width() / 2.0, value))
+        text.set_text(f'{int(value):,}đ')
+    artists['ax'].relim()
+    artists['ax'].autoscale_view()
+
+
+def setup_trend_axes(ax):
+    """Dựng biểu đồ xu hướng (hai đường chưa có dữ liệu) trên ax
+
+    Returns:
+        dict: Các artist {'ax', 'income', 'expense', 'fill'} để cập nhật bằng update_trend
+    """
+    income_line, = ax.plot([], [], label='Thu nhập', color=INCOME_COLOR, marker='o')
+    expense_line, = ax.plot([], [], label='Chi tiêu', color=EXPENSE_COLOR, marker='o')
+    ax.set_xlabel('Thời gian')
+    ax.set_ylabel('Số tiền (VNĐ)')
+    ax.yaxis.set_major_formatter(money_formatter())
+    ax.grid(True, linestyle='--', alpha=0.7)
+    return {'ax': ax, 'income': income_line, 'expense': expense_line, 'fill': None}
+
+
+def update_trend(artists, labels, income_values, expense_values, type_index, period):
+    """Cập nhật biểu đồ xu hướng theo dữ liệu kỳ báo cáo và bộ lọc loại giao dịch (xem type_filter)"""
+    ax = artists['ax']
+    show_income, show_expense = type_filter(type_index)
+    x = list(range(len(labels)))
+    artists['income'].set_data(x, income_values)
+    artists['income'].set_visible(show_income)
+    artists['expense'].set_data(x, expense_values)
+    artists['expense'].set_visible(show_expense)
+    # Vùng chênh lệch giữa hai đường chỉ vẽ khi hiện cả thu và chi
+    if artists['fill'] is not None:
+        artists['fill'].remove()
+        artists['fill'] = None
+    if show_income and show_expense and x:
+        artists['fill'] = ax.fill_between(x, income_values, expense_values, color=BALANCE_FILL_COLOR, alpha=0.3)
+    ax.set_xticks(x)
+    ax.set_xticklabels(labels)
+    ax.tick_params(axis='x', rotation=45 if period in ('quarter', 'year') else 0)
+    ax.set_title(TREND_TITLES[type_index] if 0 <= type_index < len(TREND_TITLES) else TREND_TITLES[0])
+    ax.relim(visible_only=True)
+    ax.autoscale_view()
+    ax.legend(handles=[line for line in (artists['income'], artists['expense']) if line.get_visible()])
+
+
+def draw_category_pie(ax, totals_by_name, kind):
+    """Vẽ biểu đồ tròn theo danh mục trên ax
+
+    Args:
+        totals_by_name: Tổng theo tên danh mục, None nếu bộ lọc loại giao dịch ẩn biểu đồ này
+        kind: 'income' hoặc 'expense' (xem CATEGORY_PIES)
+    """
+    colors, title, empty_text, filtered_text = CATEGORY_PIES[kind]
+    if totals_by_name is None:
+        ax.text(0.5, 0.5, filtered_text, ha='center', va='center', fontsize=12)
+        ax.axis('off')
+    elif totals_by_name:
+        ax.pie(list(totals_by_name.values()), labels=list(totals_by_name.keys()), autopct='%1.1f%%',
+               startangle=90, colors=colors)
+        ax.axis('equal')
+        ax.set_title(title)
+    else:
+        ax.text(0.5, 0.5, empty_text, ha='center', va='center', fontsize=12)
+        ax.axis('off')
+
+
+def iter_report_figures(report, charts=None):
+    """Vẽ lần lượt từng trang của báo cáo
+
+    Yields:
+        tuple: (tên trang, matplotlib.figure.Figure); người gọi lưu xong thì bỏ tham chiếu
+    """
+    load_matplotlib()
+    from matplotlib.figure import Figure
+    for chart in charts or CHARTS:
+        figure = Figure(figsize=(8, 6) if chart == 'summary' else (8, 5))
+        figure.patch.set_facecolor('white')
+        if chart == 'summary':
+            _draw_summary(figure, report)
+        elif chart == 'income_expense':
+            artists = setup_income_expense_axes(figure.add_subplot(111))
+            artists['ax'].set_title('Thu nhập và chi tiêu')
+            set_income_expense_values(artists, [report['income'], report['expense']])
+        elif chart == 'trend':
+            update_trend(setup_trend_axes(figure.add_subplot(111)), report['labels'], report['series']['income'],
+                         report['series']['expense'], report['type_index'], report['period'])
+        elif chart == 'income_category':
+            draw_category_pie(figure.add_subplot(111), report['income_categories'], 'income')
+        elif chart == 'expense_category':
+            draw_category_pie(figure.add_subplot(111), report['expense_categories'], 'expense')
+        else:
+            raise ValueError(f"Trang báo cáo không hợp lệ: {chart}")
+        if chart != 'summary':
+            figure.tight_layout()
+        yield chart, figure
+
+
+def partial_paths(job):
+    """Các file một job có thể để lại nếu bị hủy giữa chừng: file .part của PDF, hoặc mọi file PNG của lô"""
+    if job.get('format', 'pdf') == 'pdf':
+        return [job['path'] + '.part']
+    charts = job.get('charts') or CHARTS
+    reports = job.get('reports') or []
+    single = len(reports) * len(charts) == 1
+    return [_png_path(job['path'], spec, chart, single) for spec in reports for chart in charts]
+
+
+def _png_path(base_path, spec, chart, single):
+    """Tên file PNG cho một trang: đúng base_path nếu chỉ có một ảnh"""
+    if single:
+        return base_path
+    root = base_path[:-4] if base_path.lower().endswith('.png') else base_path
+    parts = [root]
+    if spec.get('user_id'):
+        parts.append(str(spec['user_id']))
+    parts.append(f"{spec['year']}-{spec.get('month', 1):02d}" if spec.get('period', 'month') != 'year' else str(spec['year']))
+    parts.append(chart)
+    return '_'.join(parts) + '.png'
+
+
+def write_pdf(path, reports, charts=None, on_page=None):
+    """Ghi các báo cáo vào một file PDF, mỗi trang được giải phóng ngay sau khi ghi
+
+    Args:
+        path: File PDF đích; nội dung được ghi vào path + '.part' rồi mới đổi tên
+        reports: Các báo cáo của build_report (có thể là generator để tổng hợp dần)
+        on_page: Hàm on_page(report, chart) gọi sau mỗi trang
+    """
+    # Ghi vào file tạm rồi đổi tên: file đích không bao giờ là PDF dở dang
+    part_path = path + '.part'
+    with load_pdf_pages()(part_path) as pdf_pages:
+        for report in reports:
+            for chart, figure in iter_report_figures(report, charts):
+                pdf_pages.savefig(figure)
+                if on_page:
+                    on_page(report, chart)
+    os.replace(part_path, path)
+    return path
+
+
+def write_pngs(base_path, spec, report, charts=None, dpi=300, single=False, on_page=None):
+    """Ghi mỗi trang của một báo cáo thành một file PNG
+
+    Returns:
+        list: Các file đã ghi
+    """
+    written = []
+    for chart, figure in iter_report_figures(report, charts):
+        png_path = _png_path(base_path, spec, chart, single)
+        figure.savefig(png_path, format='png', dpi=dpi, bbox_inches='tight')
+        written.append(png_path)
+        if on_page:
+            on_page(report, chart)
+    return written
+
+
+def export_reports(job, progress=None, transaction_manager=None, category_manager=None):
+    """Chạy một job xuất báo cáo, ghi từng trang xuống đĩa ngay khi vẽ xong
+
+    Args:
+        job: Xem mô tả module
+        progress: Hàm progress(done, total, message) được gọi sau mỗi trang
+        transaction_manager, category_manager: Mặc định tạo mới (đọc thư mục data)
+
+    Returns:
+        list: Các file đã ghi
+    """
+    if transaction_manager is None:
+        from data_manager.transaction_manager import TransactionManager
+        transaction_manager = TransactionManager()
+    if category_manager is None:
+        from data_manager.category_manager import CategoryManager
+        category_manager = CategoryManager()
+    charts = job.get('charts') or CHARTS
+    reports = job.get('reports') or []
+    type_index = job.get('type_index', 0)
+    total = len(reports) * len(charts)
+    done = 0
+
+    def step(report, chart):
+        nonlocal done
+        done += 1
+        if progress:
+            progress(done, total, f"{report['title']}: {chart}")
+
+    if job.get('format', 'pdf') == 'pdf':
+        # Báo cáo được tổng hợp ngay trước khi vẽ, không giữ cả lô trong bộ nhớ
+        built = (build_report(spec, transaction_manager, category_manager, type_index) for spec in reports)
+        written = [write_pdf(job['path'], built, charts, on_page=step)]
+    else:
+        written = []
+        for spec in reports:
+            report = build_report(spec, transaction_manager, category_manager, type_index)
+            written += write_pngs(job['path'], spec, report, charts, dpi=job.get('dpi', 300),
+                                  single=total == 1, on_page=step)
+    logger.info(f"Đã xuất {len(written)} file báo cáo ({total} trang)")
+    return written
+
+
+def run_export_job(job, queue):
+    """Điểm vào của tiến trình xuất báo cáo
+
+    Gửi vào queue: ('progress', done, total, message), rồi ('done', [file]) hoặc ('error', thông báo)
+    """
+    try:
+        written = export_reports(job, progress=lambda done, total, message: queue.put(('progress', done, total, message)))
+        queue.put(('done', written))
+    except Exception as e:
+        logger.error(f"Lỗi xuất báo cáo: {e}\n{traceback.format_exc()}")
+        queue.put(('error', str(e)))